@@ -1,29 +1,45 @@
+import threading
+
 import streamlit as st
-import tempfile
-import os
-from pathlib import Path
-from src.parser import parse_cv
-from src.rag_pipeline import LLMGenerator
+from src.api_client import APIError, ServiceBusyError, get_api_client
+from src.cache import hash_bytes
+from src.metrics import REGISTRY, recent_requests, start_metrics_server
+from src.report import build_report, report_json, report_pdf
 from config.settings import (
-    UPLOADS_DIR, 
-    TEMP_DIR, 
-    FILE_CONFIG, 
+    FILE_CONFIG,
     ATS_SCORING,
-    STREAMLIT_CONFIG
+    STREAMLIT_CONFIG,
+    WARM_UP_ON_STARTUP
 )
+# The parser, scheduler and LLM pipeline (langchain, the Ollama client) are
+# imported where they are first used, so page views and reruns before the
+# first analysis do not pay for them.
 
 # --- PAGE CONFIGURATION ---
-st.set_page_config(
-    page_title="Smart CV Analyzer Pro",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+st.set_page_config(**STREAMLIT_CONFIG)
+
+# Prometheus metrics on SMART_CV_METRICS_PORT, if set (started once per process)
+start_metrics_server()
+
 
-# Configure Streamlit settings
-for key, value in STREAMLIT_CONFIG.items():
-    if hasattr(st, key):
-        setattr(st, key, value)
+@st.cache_resource(show_spinner=False)
+def start_background_warm_up() -> threading.Thread:
+    """
+    Imports the LLM pipeline and loads the model into Ollama on a background
+    thread, once per process, so neither holds up the first render.
+    """
+    def warm_up():
+        from src.rag_pipeline import warm_up_on_startup
+        warm_up_on_startup()
+
+    thread = threading.Thread(target=warm_up, name="smart-cv-app-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+# Load the model while the user picks a file; in thin-client mode the API does this instead
+if WARM_UP_ON_STARTUP and get_api_client() is None:
+    start_background_warm_up()
 
 # --- CUSTOM CSS ---
 def load_css():
@@ -62,6 +78,210 @@ def load_css():
 
 load_css()
 
+# --- SESSION STATE ---
+def stored_analyses() -> dict:
+    """Finished analyses of this session: file hash -> report (see src/report.py)."""
+    return st.session_state.setdefault("analyses", {})
+
+
+def uploaded_file_hash(uploaded_file) -> str:
+    """SHA-256 of an uploaded file, computed once per upload rather than on every rerun."""
+    hashes = st.session_state.setdefault("file_hashes", {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = hash_bytes(uploaded_file.getvalue())
+    return hashes[uploaded_file.file_id]
+
+
+# --- RESULT RENDERING ---
+def render_score_cards(score: int):
+    """Renders the ATS score and quality assessment cards."""
+    col1, col2, col3 = st.columns(3)
+    excellent, good = ATS_SCORING["excellent_threshold"], ATS_SCORING["good_threshold"]
+    
+    with col1:
+        st.markdown(f"""
+        <div class="score-card">
+            <h3>ATS Score</h3>
+            <h1 style="font-size: 3rem; margin: 0;">{score}/{ATS_SCORING["max_score"]}</h1>
+            <p>{"🎉 Excellent" if score >= excellent else "✅ Good" if score >= good else "⚠️ Needs Work"}</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col2:
+        score_quality = "High" if score >= excellent else "Medium" if score >= good else "Low"
+        st.markdown(f"""
+        <div style="background: linear-gradient(135deg, #a1c4fd 0%, #c2e9fb 100%); color: white; padding: 2rem; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+            <h3>📋 Quality Assessment</h3>
+            <p style="font-size: 1.2rem; margin: 0.5rem 0;">{score_quality}</p>
+            <p>Overall CV Quality</p>
+        </div>
+        """, unsafe_allow_html=True)
+    
+    with col3:
+        st.markdown("""
+        <div style="background: linear-gradient(135deg, #ff9a9e 0%, #fecfef 100%); color: white; padding: 2rem; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
+            <h3>👁️ Human Review</h3>
+            <p>Recruiter Appeal</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
+def render_rule_breakdown(rule_score: dict):
+    """Renders the per-criterion points of the rule-based ATS check."""
+    with st.expander("📏 ATS rule check", expanded=True):
+        for criterion in rule_score["criteria"].values():
+            st.progress(
+                criterion["points"] / criterion["max_points"],
+                text=f"{criterion['label']}: {criterion['points']:g}/{criterion['max_points']}",
+            )
+            for item in criterion["missing"]:
+                if item["points_lost"] >= 0.5:
+                    st.caption(f"• {item['advice']} (−{item['points_lost']:g})")
+
+
+@st.fragment
+def render_stored_report(file_hash: str):
+    """
+    Renders a stored analysis with its export buttons. As a fragment, its
+    own widgets (tabs, downloads) rerun only this function.
+    """
+    report = stored_analyses()[file_hash]
+    analysis_result = report["analysis"]
+
+    render_score_cards(analysis_result["score"])
+    if analysis_result.get("rule_score"):
+        render_rule_breakdown(analysis_result["rule_score"])
+    st.markdown("---")
+    st.subheader("📋 Executive Summary")
+    st.info(analysis_result["summary"])
+    render_analysis_details(analysis_result)
+
+    st.caption(f"Analyzed {report['generated_at']} in {report['mode']} mode.")
+    stem = report["file_name"].rsplit(".", 1)[0]
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button(
+            "⬇️ Export JSON", report_json(report), file_name=f"{stem}_analysis.json",
+            mime="application/json", use_container_width=True,
+        )
+    with col2:
+        st.download_button(
+            "⬇️ Export PDF report", report_pdf(report), file_name=f"{stem}_analysis.pdf",
+            mime="application/pdf", use_container_width=True,
+        )
+
+
+def render_debug_panel():
+    """Shows per-stage timings, token counts and raw metrics of recent requests."""
+    records = [record for record in recent_requests() if record["kind"] in ("parse", "analysis", "stream")]
+    if not records:
+        st.caption("No requests recorded yet.")
+        return
+    for record in reversed(records[-5:]):
+        title = f"{record['kind']} · {record.get('mode') or record.get('format', '')} · {record['seconds']:.2f}s"
+        st.markdown(f"**{title}** ({record['outcome']}, cache {record.get('cache', 'n/a')})")
+        for stage in record["stages"]:
+            st.caption(f"{stage['stage']}: {stage['seconds'] * 1000:.0f} ms")
+        for call in record["llm_calls"]:
+            st.caption(
+                f"{call['chain']}: {call['seconds']:.2f}s, prompt {call.get('prompt_eval_count', '?')} tok "
+                f"in {call.get('prompt_eval_seconds', 0):.2f}s, eval {call.get('eval_count', '?')} tok "
+                f"({call.get('eval_tokens_per_second', '?')} tok/s)"
+            )
+    with st.expander("Latest request record"):
+        st.json(records[-1])
+    with st.expander("Prometheus metrics"):
+        st.code(REGISTRY.render(), language="text")
+
+
+def render_model_settings():
+    """Shows the model settings form of the in-process generator."""
+    api_client = get_api_client()
+    if api_client is not None:
+        st.caption(f"Analyses run on the API at {api_client.base_url}; model settings are configured there.")
+        return
+    from src.rag_pipeline import get_llm_generator
+
+    llm_generator = get_llm_generator()
+    if llm_generator.task_models:
+        st.caption("Per-task models: " + ", ".join(
+            f"{task} → {name}" for task, name in llm_generator.task_models.items()
+        ))
+    with st.form("model_settings"):
+        model_name = st.text_input("Ollama model", value=llm_generator.model)
+        temperature = st.slider(
+            "Temperature", 0.0, 1.0, float(llm_generator.model_params["temperature"]), 0.05
+        )
+        num_ctx = st.select_slider(
+            "Context window (num_ctx)",
+            options=[1024, 2048, 4096, 8192],
+            value=llm_generator.model_params["num_ctx"],
+        )
+        if st.form_submit_button("Apply"):
+            llm_generator.reconfigure(model=model_name.strip(), temperature=temperature, num_ctx=num_ctx)
+            llm_generator.warm_up_in_background()
+            st.success("Model settings updated.")
+
+
+def render_analysis_details(analysis_result: dict):
+    """Renders the recommendations and CV section tabs."""
+    # Detailed Analysis Tabs - REMOVED RAW ANALYSIS
+    tab1, tab2 = st.tabs(["🎯 Improvement Recommendations", "📑 CV Sections"])
+
+    with tab1:
+        st.subheader("💡 Recommendations for Improvement")
+        if analysis_result["recommendations"]:
+            recommendations = analysis_result["recommendations"].split('\n')
+            for rec in recommendations:
+                if rec.strip():
+                    st.markdown(f"""
+                    <div class="recommendation-item">
+                        <span style="font-weight: 500;">{rec}</span>
+                    </div>
+                    """, unsafe_allow_html=True)
+        else:
+            st.info("No specific recommendations generated. The CV appears to be well-structured.")
+
+    with tab2:
+        st.subheader("📑 CV Section Analysis")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Education Section
+            st.markdown(f"""
+            <div class="section-card education-card">
+                <div class="section-title">🎓 Education</div>
+                <div class="section-content">{analysis_result['sections']['education']}</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            # Projects Section
+            st.markdown(f"""
+            <div class="section-card projects-card">
+                <div class="section-title">🚀 Projects & Achievements</div>
+                <div class="section-content">{analysis_result['sections']['projects']}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        
+        with col2:
+            # Experience Section
+            st.markdown(f"""
+            <div class="section-card experience-card">
+                <div class="section-title">💼 Work Experience</div>
+                <div class="section-content">{analysis_result['sections']['experience']}</div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            # Skills Section
+            st.markdown(f"""
+            <div class="section-card skills-card">
+                <div class="section-title">🛠️ Skills & Competencies</div>
+                <div class="section-content">{analysis_result['sections']['skills']}</div>
+            </div>
+            """, unsafe_allow_html=True)
+
+
 # --- MAIN UI ---
 st.markdown('<h1 class="main-header">📊 Professional CV Analyzer</h1>', unsafe_allow_html=True)
 
@@ -91,137 +311,140 @@ with col1:
 with col2:
     uploaded_file = st.file_uploader(
         "**Upload CV for Analysis**",
-        type=["pdf", "docx"],
+        type=FILE_CONFIG["allowed_types"],
         help="Upload any CV in PDF or DOCX format for professional analysis"
     )
 
+    analysis_mode = st.radio(
+        "Analysis mode",
+        options=["concurrent", "fused", "sequential", "json", "fast"],
+        format_func=lambda mode: {
+            "concurrent": "Concurrent (scoring and recommendations in parallel)",
+            "fused": "Fused (single combined generation)",
+            "sequential": "Sequential (one call after the other)",
+            "json": "JSON (structured output with field-level retry)",
+            "fast": "Fast (rule-based score only, no AI)",
+        }[mode],
+        horizontal=True,
+        help="Choose how the model calls are scheduled. Useful for comparing latency on your Ollama hardware."
+    )
+
     analyze_button = st.button("**Analyze CV** 🚀", type="primary", use_container_width=True)
 
 # --- PROCESSING LOGIC ---
 if analyze_button and uploaded_file is not None:
-    with st.spinner('🔍 Analyzing CV with AI... This may take 20-30 seconds.'):
-        try:
-            # Save uploaded file temporarily
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                temp_file_path = tmp_file.name
-
-            # Parse CV
-            cv_text = parse_cv(temp_file_path)
+    file_hash = uploaded_file_hash(uploaded_file)
+    stored = stored_analyses().get(file_hash)
+    api_client = get_api_client()
+    busy_errors = (ServiceBusyError,)
+    if stored is None or stored["mode"] != analysis_mode:
+        if api_client is None:
+            from src.parser import parse_cv_cached
+            from src.scheduler import QueueFullError, get_scheduler
+            busy_errors += (QueueFullError,)
+    try:
+        if stored is not None and stored["mode"] == analysis_mode:
+            # Already analyzed in this session; the stored report is shown below
+            job = None
+            st.info("ℹ️ This file was already analyzed in this mode; showing the stored result.")
+        elif uploaded_file.size > FILE_CONFIG["max_upload_mb"] * 1024 * 1024:
+            job = None
+            st.error(f"❌ The file exceeds {FILE_CONFIG['max_upload_mb']:g} MB.")
+        elif api_client is not None:
+            # Thin-client mode: the analysis API parses and queues the CV
+            with st.spinner('📤 Uploading CV...'):
+                job = api_client.submit(uploaded_file.getvalue(), uploaded_file.name, mode=analysis_mode)
+        else:
+            with st.spinner('🔍 Extracting text from CV...'):
+                # Parse CV (cached by file content hash)
+                cv_text = parse_cv_cached(uploaded_file.getvalue(), uploaded_file.name)
 
             if not cv_text or not cv_text.strip():
+                job = None
                 st.error("❌ Could not extract text from the CV. The file might be corrupted or contain images only.")
             else:
-                # Generate analysis
-                llm_generator = LLMGenerator()
-                analysis_result = llm_generator.generate_cv_analysis(cv_text)
-
-                # --- DISPLAY RESULTS ---
-                st.success("✅ CV Analysis Complete!")
-                
-                # Score and Metrics
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.markdown(f"""
-                    <div class="score-card">
-                        <h3>ATS Score</h3>
-                        <h1 style="font-size: 3rem; margin: 0;">{analysis_result["score"]}/100</h1>
-                        <p>{"🎉 Excellent" if analysis_result["score"] >= 80 else "✅ Good" if analysis_result["score"] >= 60 else "⚠️ Needs Work"}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                with col2:
-                    score_quality = "High" if analysis_result["score"] >= 80 else "Medium" if analysis_result["score"] >= 60 else "Low"
-                    st.markdown(f"""
-                    <div style="background: linear-gradient(135deg, #a1c4fd 0%, #c2e9fb 100%); color: white; padding: 2rem; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                        <h3>📋 Quality Assessment</h3>
-                        <p style="font-size: 1.2rem; margin: 0.5rem 0;">{score_quality}</p>
-                        <p>Overall CV Quality</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                with col3:
-                    st.markdown("""
-                    <div style="background: linear-gradient(135deg, #ff9a9e 0%, #fecfef 100%); color: white; padding: 2rem; border-radius: 15px; text-align: center; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);">
-                        <h3>👁️ Human Review</h3>
-                        <p>Recruiter Appeal</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                # Queue the analysis with the process-wide scheduler, which limits
+                # how many analyses hit Ollama at once
+                job = get_scheduler().submit(cv_text, mode=analysis_mode)
+
+        if job is not None:
+            # Render each part as soon as the model produces it; the stored
+            # report replaces this live view once the analysis is done
+            status_placeholder = st.empty()
+            live_placeholder = st.empty()
+            with live_placeholder.container():
+                score_placeholder = st.empty()
+                if job.rule_score is not None:
+                    # The rule-based score is ready before the job reaches the model;
+                    # the AI score replaces it when it arrives
+                    with score_placeholder.container():
+                        render_score_cards(job.rule_score["score"])
+                        st.caption("⚡ Instant rule-based score. The AI assessment refines it below.")
+                    render_rule_breakdown(job.rule_score)
+                try:
+                    while not job.wait_started(timeout=1.0):
+                        position, eta = job.position(), job.eta_seconds()
+                        if position is not None and eta is not None:
+                            status_placeholder.info(
+                                f"⏳ Waiting for a free analysis slot: {position} job(s) ahead of yours, "
+                                f"ready in about {eta:.0f}s."
+                            )
+                except BaseException:
+                    # The session was stopped or rerun while queued; give up the slot.
+                    job.cancel()
+                    raise
+                status_placeholder.info("🤖 Analyzing CV with AI... results appear below as they are generated.")
 
-                # Executive Summary
                 st.markdown("---")
                 st.subheader("📋 Executive Summary")
-                st.info(analysis_result["summary"])
-
-                # Detailed Analysis Tabs - REMOVED RAW ANALYSIS
-                tab1, tab2 = st.tabs(["🎯 Improvement Recommendations", "📑 CV Sections"])
-
-                with tab1:
-                    st.subheader("💡 Recommendations for Improvement")
-                    if analysis_result["recommendations"]:
-                        recommendations = analysis_result["recommendations"].split('\n')
-                        for rec in recommendations:
-                            if rec.strip():
-                                st.markdown(f"""
-                                <div class="recommendation-item">
-                                    <span style="font-weight: 500;">{rec}</span>
-                                </div>
-                                """, unsafe_allow_html=True)
-                    else:
-                        st.info("No specific recommendations generated. The CV appears to be well-structured.")
-
-                with tab2:
-                    st.subheader("📑 CV Section Analysis")
-                    
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        # Education Section
-                        st.markdown(f"""
-                        <div class="section-card education-card">
-                            <div class="section-title">🎓 Education</div>
-                            <div class="section-content">{analysis_result['sections']['education']}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Projects Section
-                        st.markdown(f"""
-                        <div class="section-card projects-card">
-                            <div class="section-title">🚀 Projects & Achievements</div>
-                            <div class="section-content">{analysis_result['sections']['projects']}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    with col2:
-                        # Experience Section
-                        st.markdown(f"""
-                        <div class="section-card experience-card">
-                            <div class="section-title">💼 Work Experience</div>
-                            <div class="section-content">{analysis_result['sections']['experience']}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-                        
-                        # Skills Section
-                        st.markdown(f"""
-                        <div class="section-card skills-card">
-                            <div class="section-title">🛠️ Skills & Competencies</div>
-                            <div class="section-content">{analysis_result['sections']['skills']}</div>
-                        </div>
-                        """, unsafe_allow_html=True)
-
-        except Exception as e:
-            st.error(f"❌ Analysis failed: {str(e)}")
-            st.info("💡 Troubleshooting: Ensure Ollama is running and the model is installed.")
-        
-        finally:
-            # Cleanup
-            if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
+                summary_placeholder = st.empty()
+                recommendations_placeholder = st.empty()
+
+                summary_text = ""
+                streamed_recommendations = []
+                analysis_result = None
+
+                for event in job.iter_events():
+                    if event["type"] == "score":
+                        with score_placeholder.container():
+                            render_score_cards(event["score"])
+                    elif event["type"] == "summary_token":
+                        summary_text += event["text"]
+                        summary_placeholder.info(summary_text + " ▌")
+                    elif event["type"] == "recommendation":
+                        streamed_recommendations.append(f"{event['index']}. {event['text']}")
+                        with recommendations_placeholder.container():
+                            st.markdown("**💡 Recommendations so far**")
+                            for rec in streamed_recommendations:
+                                st.markdown(rec)
+                    elif event["type"] == "done":
+                        analysis_result = event["analysis"]
+
+            # Keep the result for later reruns of this session, keyed by file content
+            stored_analyses()[file_hash] = build_report(analysis_result, uploaded_file.name, file_hash, analysis_mode)
+            live_placeholder.empty()
+            status_placeholder.success("✅ CV Analysis Complete!")
+
+    except busy_errors as e:
+        st.warning(f"🚦 The server is busy. {e}")
+    except APIError as e:
+        if e.status_code in (413, 415, 422):
+            st.error(f"❌ {e.detail}")
+        else:
+            st.error(f"❌ Analysis failed: {e.detail}")
+    except Exception as e:
+        st.error(f"❌ Analysis failed: {str(e)}")
+        st.info("💡 Troubleshooting: Ensure Ollama is running and the model is installed.")
 
 elif analyze_button:
     st.warning("⚠️ Please upload a CV file to begin analysis.")
 
+# --- DISPLAY RESULTS ---
+# Drawn from session state on every rerun, so widget interactions never
+# re-run the analysis
+if uploaded_file is not None and uploaded_file_hash(uploaded_file) in stored_analyses():
+    render_stored_report(uploaded_file_hash(uploaded_file))
+
 # --- SIDEBAR ---
 with st.sidebar:
     st.markdown("## 💡 CV Best Practices")
@@ -252,3 +475,11 @@ with st.sidebar:
     • PDF or DOCX files
     • Stable connection
     """)
+
+    # A checkbox rather than an expander: expander bodies run on every rerun,
+    # and this one loads the LLM pipeline
+    if st.checkbox("⚙️ Show model settings"):
+        render_model_settings()
+
+    if st.checkbox("🔍 Show debug metrics", help="Per-stage timings and Ollama token counts of recent requests."):
+        render_debug_panel()
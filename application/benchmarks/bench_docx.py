@@ -0,0 +1,75 @@
+"""
+Micro-benchmark: streaming DOCX extraction vs. the original python-docx
+paragraph loop, on typical, huge and template-style CVs (header, table
+layout, text box).
+
+Usage (from the application directory):
+    python -m benchmarks.bench_docx --repeat 20
+"""
+import argparse
+import io
+import timeit
+import tracemalloc
+
+import docx
+
+from src.docx_extraction import extract_docx
+
+from .corpus import make_docx, make_template_docx, synthetic_cv_text
+
+
+def legacy_extract_text(data: bytes) -> str:
+    """The original extract_text_from_docx: body paragraphs of the python-docx model."""
+    document = docx.Document(io.BytesIO(data))
+    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def _peak_kib(function, data: bytes) -> float:
+    tracemalloc.start()
+    function(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def run(name: str, data: bytes, repeat: int, probes: tuple) -> dict:
+    streaming = lambda payload: extract_docx(payload, max_chars=None).text  # noqa: E731
+    legacy_seconds = min(timeit.repeat(lambda: legacy_extract_text(data), number=repeat, repeat=3)) / repeat
+    streaming_seconds = min(timeit.repeat(lambda: streaming(data), number=repeat, repeat=3)) / repeat
+    legacy_text, streaming_text = legacy_extract_text(data), streaming(data)
+    return {
+        "document": name,
+        "kib": round(len(data) / 1024, 1),
+        "legacy_ms": round(legacy_seconds * 1000, 3),
+        "streaming_ms": round(streaming_seconds * 1000, 3),
+        "speedup": round(legacy_seconds / streaming_seconds, 2) if streaming_seconds else None,
+        "legacy_peak_kib": _peak_kib(legacy_extract_text, data),
+        "streaming_peak_kib": _peak_kib(streaming, data),
+        "legacy_chars": len(legacy_text),
+        "streaming_chars": len(streaming_text),
+        # Text that only the streaming path finds (header, table, text box).
+        "legacy_found": [probe for probe in probes if probe in legacy_text],
+        "streaming_found": [probe for probe in probes if probe in streaming_text],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    text = synthetic_cv_text(0)
+    huge_text = synthetic_cv_text(1000, jobs=150, bullets_per_job=8)
+    lines = text.split("\n")
+    probes = (lines[1], "Skills", "Languages:")
+    documents = [
+        ("typical", make_docx(text)),
+        ("huge+table", make_docx(huge_text, table_rows=200)),
+        ("template", make_template_docx(text)),
+    ]
+    for name, data in documents:
+        print(run(name, data, args.repeat if name != "huge+table" else max(args.repeat // 10, 1), probes))
+
+
+if __name__ == "__main__":
+    main()
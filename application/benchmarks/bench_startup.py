@@ -0,0 +1,133 @@
+"""
+Micro-benchmark: import cost of the Streamlit app at startup, on every
+rerun, and at the first analysis.
+
+The imports are read from app.py itself: module-level imports run when the
+page is first served, and imports inside functions and branches run when
+they are first reached (the first analysis, the model settings, the
+background warm-up). Each measurement starts a fresh interpreter with
+-X importtime, so it reports what a new container pays. "eager" is what
+importing everything at module level, as app.py used to, costs.
+
+Streamlit itself is a dependency of every variant; --exclude streamlit
+leaves it out where it cannot be imported.
+
+Usage (from the application directory):
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import ast
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+_MARKER = "-- deferred --"
+
+
+def app_imports(path: Path = APP_PATH) -> Tuple[List[str], List[str]]:
+    """The modules app.py imports at module level, and those it imports later."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    top_level = {id(node) for node in tree.body}
+    startup: List[str] = []
+    deferred: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names = [node.module]
+        else:
+            continue
+        target = startup if id(node) in top_level else deferred
+        target.extend(name for name in names if name not in target)
+    return startup, [name for name in deferred if name not in startup]
+
+
+def _import_source(modules: List[str]) -> str:
+    return "".join(f"import {module}\n" for module in modules)
+
+
+def measure_cold(startup: List[str], deferred: List[str]) -> Dict[str, Dict[str, float]]:
+    """
+    Imports the startup modules, then the deferred ones, in a fresh
+    interpreter, and returns the cumulative milliseconds of each module
+    that was not already loaded, per phase.
+    """
+    script = (
+        _import_source(startup)
+        + f"import sys\nsys.stderr.write({_MARKER!r} + '\\n')\nsys.stderr.flush()\n"
+        + _import_source(deferred)
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=APP_PATH.parent, capture_output=True, text=True,
+    )
+    if completed.returncode:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    phases: Dict[str, Dict[str, float]] = {"startup": {}, "deferred": {}}
+    phase = None
+    for line in completed.stderr.splitlines():
+        if line == _MARKER:
+            phase = "deferred"
+            continue
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented; only the outermost count towards a phase.
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue
+        name = name.strip()
+        if name in startup:
+            phase = phase or "startup"
+        if phase:
+            phases[phase][name] = int(cumulative) / 1000
+    return phases
+
+
+def measure_rerun(startup: List[str], repeat: int = 1000) -> float:
+    """
+    Microseconds the module-level import statements take when the script is
+    re-executed in a process that already loaded them, as on a rerun.
+    """
+    code = compile(_import_source(startup), "<app imports>", "exec")
+    exec(code, {})
+    started = time.perf_counter()
+    for _ in range(repeat):
+        exec(code, {})
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement.")
+    parser.add_argument("--exclude", nargs="*", default=[], help="Modules to leave out, e.g. streamlit.")
+    args = parser.parse_args()
+
+    startup, deferred = app_imports()
+    startup = [module for module in startup if module not in args.exclude]
+    deferred = [module for module in deferred if module not in args.exclude]
+    print({"startup_imports": startup, "deferred_imports": deferred})
+
+    lazy_startup, first_analysis, eager = [], [], []
+    for _ in range(args.repeat):
+        lazy = measure_cold(startup, deferred)
+        lazy_startup.append(sum(lazy["startup"].values()))
+        first_analysis.append(sum(lazy["deferred"].values()))
+        eager.append(sum(measure_cold(startup + deferred, [])["startup"].values()))
+    breakdown = measure_cold(startup, deferred)
+
+    print({
+        "eager_startup_ms": round(statistics.median(eager), 1),
+        "lazy_startup_ms": round(statistics.median(lazy_startup), 1),
+        "first_analysis_ms": round(statistics.median(first_analysis), 1),
+        "rerun_imports_us": round(measure_rerun(startup), 2),
+    })
+    for phase, modules in breakdown.items():
+        print({phase: {name: round(ms, 1) for name, ms in sorted(modules.items(), key=lambda item: -item[1])}})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Synthetic CV corpus for the benchmarks: small and huge PDF/DOCX documents
+plus malformed files that the parser must reject or survive.
+
+Everything is generated deterministically in memory. To look at the files:
+    python -m benchmarks.corpus --out /tmp/cv-corpus
+"""
+import argparse
+import io
+import os
+import random
+import zipfile
+from dataclasses import dataclass
+from typing import List
+
+import docx
+
+FIRST_NAMES = ["Amira", "Omar", "Lina", "Youssef", "Sara", "Karim", "Nour", "Hassan", "Maya", "Ali"]
+LAST_NAMES = ["Hassan", "Mahmoud", "Khaled", "Ibrahim", "Fathy", "Saleh", "Mostafa", "Adel"]
+ROLES = ["Software Engineer", "Data Analyst", "Machine Learning Engineer", "Backend Developer", "DevOps Engineer"]
+COMPANIES = ["Valeo", "Vodafone", "Instabug", "Swvl", "Fawry", "Microsoft", "Siemens", "IBM"]
+SKILLS = ["Python", "Java", "SQL", "TensorFlow", "PyTorch", "Docker", "Kubernetes", "React", "AWS", "Linux",
+          "NLP", "Computer Vision", "Git", "FastAPI", "Spark", "Pandas"]
+BULLETS = [
+    "Developed a {skill} service handling {n}k requests per day",
+    "Reduced pipeline latency by {n}% by rewriting the {skill} batch jobs",
+    "Led a team of {n} engineers delivering the {skill} migration",
+    "Implemented monitoring dashboards that cut incident response time by {n}%",
+    "Built an internal {skill} library adopted by {n} teams",
+    "Collaborated with product managers to ship {n} customer-facing features",
+]
+
+
+@dataclass
+class CorpusDocument:
+    """One benchmark input. kind is "pdf" or "docx"; malformed inputs are expected to fail."""
+    name: str
+    kind: str
+    size: str
+    data: bytes
+    malformed: bool = False
+
+
+def synthetic_cv_text(seed: int, jobs: int = 3, bullets_per_job: int = 4) -> str:
+    """Returns plain CV text with the usual sections, reproducible for a given seed."""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        name,
+        f"{name.split()[0].lower()}@example.com | +20 100 {rng.randint(1000000, 9999999)} | Cairo, Egypt",
+        "linkedin.com/in/example | github.com/example",
+        "",
+        "Professional Summary",
+        f"{rng.choice(ROLES)} with {rng.randint(2, 12)} years of experience building data-intensive systems.",
+        "",
+        "Work Experience",
+    ]
+    for job in range(jobs):
+        start = 2024 - 2 * (job + 1)
+        lines.append(f"{rng.choice(ROLES)} - {rng.choice(COMPANIES)} ({start} - {start + 2})")
+        for _ in range(bullets_per_job):
+            lines.append("- " + rng.choice(BULLETS).format(skill=rng.choice(SKILLS), n=rng.randint(2, 90)))
+    lines += [
+        "",
+        "Education",
+        f"Bachelor of Science in Computer Engineering, Cairo University ({2024 - 2 * jobs - 4} - {2024 - 2 * jobs})",
+        f"GPA: {rng.uniform(2.8, 3.9):.2f}",
+        "",
+        "Projects",
+        f"Implemented a {rng.choice(SKILLS)} application for CV ranking used by {rng.randint(10, 500)} students",
+        "",
+        "Skills",
+        ", ".join(rng.sample(SKILLS, 8)),
+    ]
+    return "\n".join(lines)
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages: List[str]) -> bytes:
+    """Builds a minimal text-only PDF with one page per string (Helvetica, no compression)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * index} 0 R" for index in range(len(pages)))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    font_id = 3 + 2 * len(pages)
+    for index, text in enumerate(pages):
+        operators = " ".join(f"({_pdf_escape(line)}) Tj T*" for line in text.split("\n"))
+        content = f"BT /F1 10 Tf 50 760 Td 13 TL {operators} ET".encode("latin-1", "replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * index} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def _paginate(text: str, lines_per_page: int = 50) -> List[str]:
+    lines = text.split("\n")
+    return ["\n".join(lines[start:start + lines_per_page]) for start in range(0, len(lines), lines_per_page)]
+
+
+def make_docx(text: str, table_rows: int = 0) -> bytes:
+    """Builds a DOCX with one paragraph per line and an optional skills table."""
+    document = docx.Document()
+    for line in text.split("\n"):
+        document.add_paragraph(line)
+    if table_rows:
+        table = document.add_table(rows=table_rows, cols=2)
+        for row_index, row in enumerate(table.rows):
+            row.cells[0].text = SKILLS[row_index % len(SKILLS)]
+            row.cells[1].text = f"{row_index % 10 + 1} years"
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+# A VML text box as Word writes it, for content that python-docx's
+# paragraph list does not include.
+_TEXT_BOX_XML = (
+    '<w:r xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:v="urn:schemas-microsoft-com:vml"><w:pict><v:shape><v:textbox><w:txbxContent>'
+    '<w:p><w:r><w:t>{text}</w:t></w:r></w:p>'
+    '</w:txbxContent></v:textbox></v:shape></w:pict></w:r>'
+)
+
+
+def make_template_docx(text: str) -> bytes:
+    """
+    Builds a DOCX laid out like a modern CV template: name and contact
+    lines in the page header, a two-column table with skills on the left
+    and the rest of the CV on the right, and languages in a text box.
+    """
+    from docx.oxml import parse_xml
+
+    lines = text.split("\n")
+    skills_index = lines.index("Skills")
+    document = docx.Document()
+    header = document.sections[0].header
+    header.paragraphs[0].text = lines[0]
+    header.add_paragraph(lines[1])
+
+    table = document.add_table(rows=1, cols=2)
+    left, right = table.rows[0].cells
+    left.paragraphs[0].text = "Skills"
+    for skill in lines[skills_index + 1].split(", "):
+        left.add_paragraph(skill)
+    right.paragraphs[0].text = lines[2]
+    for line in lines[3:skills_index]:
+        if line:
+            right.add_paragraph(line)
+
+    anchor = document.add_paragraph()
+    anchor._p.append(parse_xml(_TEXT_BOX_XML.format(text="Languages: Arabic (native), English (fluent)")))
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _zip_without_document() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("readme.txt", "not a word document")
+    return buffer.getvalue()
+
+
+def _docx_with_broken_xml(valid_docx: bytes) -> bytes:
+    source = zipfile.ZipFile(io.BytesIO(valid_docx))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename == "word/document.xml":
+                data = data[: len(data) // 2]
+            archive.writestr(item, data)
+    return buffer.getvalue()
+
+
+def build_corpus(small: int = 8, huge: int = 2, seed: int = 0) -> List[CorpusDocument]:
+    """
+    Generates the benchmark corpus.
+
+    Args:
+        small: Number of typical one- or two-page CVs per format.
+        huge: Number of very long CVs per format (well past the page and
+            character limits of the parser).
+        seed: Base seed for the generated text.
+
+    Returns:
+        Documents in a stable order: small, huge, then malformed.
+    """
+    documents: List[CorpusDocument] = []
+    for index in range(small):
+        text = synthetic_cv_text(seed + index)
+        documents.append(CorpusDocument(f"small-{index}.pdf", "pdf", "small", make_pdf(_paginate(text))))
+        documents.append(CorpusDocument(f"small-{index}.docx", "docx", "small", make_docx(text)))
+    for index in range(huge):
+        text = synthetic_cv_text(seed + 1000 + index, jobs=150, bullets_per_job=8)
+        documents.append(CorpusDocument(f"huge-{index}.pdf", "pdf", "huge", make_pdf(_paginate(text))))
+        documents.append(CorpusDocument(f"huge-{index}.docx", "docx", "huge", make_docx(text, table_rows=200)))
+
+    valid_pdf = make_pdf(_paginate(synthetic_cv_text(seed)))
+    valid_docx = make_docx(synthetic_cv_text(seed))
+    documents += [
+        CorpusDocument("truncated.pdf", "pdf", "malformed", valid_pdf[: len(valid_pdf) // 2], malformed=True),
+        CorpusDocument("garbage.pdf", "pdf", "malformed", b"%PDF-1.4\n" + random.Random(seed).randbytes(4096),
+                       malformed=True),
+        CorpusDocument("not-a-docx.docx", "docx", "malformed", _zip_without_document(), malformed=True),
+        CorpusDocument("broken-xml.docx", "docx", "malformed", _docx_with_broken_xml(valid_docx), malformed=True),
+    ]
+    return documents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", required=True, help="Directory to write the corpus to.")
+    parser.add_argument("--small", type=int, default=8)
+    parser.add_argument("--huge", type=int, default=2)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for document in build_corpus(args.small, args.huge):
+        with open(os.path.join(args.out, document.name), "wb") as output:
+            output.write(document.data)
+        print(f"{document.name}: {len(document.data) / 1024:.1f} KiB ({document.size})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+"""
+Local stand-in for the Ollama HTTP API, used by the benchmarks.
+
+Implements /api/chat, /api/generate, /api/tags and /api/version with
+configurable time to first token, token rate, streaming and parallelism, and
+answers in the formats the analysis prompts ask for, so the whole pipeline can
+run without a model or GPU. Optionally models load time with keep_alive
+residency, and prompt evaluation speed with reuse of cached prompt prefixes.
+
+Usage (from the application directory):
+    python -m benchmarks.fake_ollama --port 11434 --latency-ms 200 --tokens-per-second 40
+"""
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass
+class FakeOllamaConfig:
+    """
+    Behaviour of the fake server.
+
+    Attributes:
+        latency_ms: Delay before the first token (prompt evaluation).
+        tokens_per_second: Generation speed once output starts.
+        parallel: Requests served at once, like OLLAMA_NUM_PARALLEL; further
+            requests wait for a free slot.
+        think_tokens: Length of a <think> block emitted before the answer,
+            as reasoning models such as deepseek-r1 do.
+        stream: Whether streaming is allowed. When False, every response is
+            sent as one object regardless of the request.
+        load_ms: Time to load a model that is not resident. Models stay
+            loaded for the request's keep_alive (Ollama's default is 5m).
+        prompt_tokens_per_second: Prompt evaluation speed, added to
+            latency_ms for every prompt token that is not covered by a
+            cached prefix. Each slot caches the last prompt it evaluated,
+            and a request reuses the idle slot sharing the longest prefix,
+            as Ollama does; a slot in use cannot be shared. 0 disables
+            prefix modelling.
+    """
+    latency_ms: float = 200.0
+    tokens_per_second: float = 40.0
+    parallel: int = 4
+    think_tokens: int = 0
+    stream: bool = True
+    load_ms: float = 0.0
+    prompt_tokens_per_second: float = 0.0
+
+
+_TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+_RECOMMENDATIONS = [
+    "Quantify the impact of each role with concrete metrics such as revenue, users or time saved.",
+    "Add a targeted professional summary that names the role and the core technologies.",
+    "Group technical skills into categories and mirror the keywords used in job postings.",
+    "List dates, locations and titles consistently for every position and degree.",
+    "Add links to GitHub or a portfolio with the projects mentioned in the CV.",
+]
+
+
+def _prompt_text(body: dict) -> str:
+    if "messages" in body:
+        return "\n".join(str(message.get("content", "")) for message in body.get("messages") or [])
+    return str(body.get("prompt", ""))
+
+
+def _fake_score(prompt: str) -> int:
+    """Deterministic score in 55-94 derived from the prompt, so runs are reproducible."""
+    return 55 + int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:4], 16) % 40
+
+
+def build_answer(body: dict) -> str:
+    """Returns the text a well-behaved model would answer to an analysis request."""
+    prompt = _prompt_text(body)
+    score = _fake_score(prompt)
+    summary = (
+        "The CV shows relevant technical experience and a clear education section. "
+        "Achievements lack measurable results and the skills section could be better organized."
+    )
+    numbered = "\n".join(f"{index}. {text}" for index, text in enumerate(_RECOMMENDATIONS, start=1))
+
+    schema = body.get("format")
+    if isinstance(schema, dict) or schema == "json":
+        answer = {"score": score, "summary": summary, "recommendations": list(_RECOMMENDATIONS)}
+        required = schema.get("required") if isinstance(schema, dict) else None
+        if required:
+            answer = {key: answer[key] for key in required if key in answer}
+        return json.dumps(answer)
+    if "RECOMMENDATIONS:" in prompt:
+        return f"SCORE: {score}\nSUMMARY: {summary}\nRECOMMENDATIONS:\n{numbered}"
+    if "SCORE:" in prompt:
+        return f"SCORE: {score}\nSUMMARY: {summary}"
+    return numbered
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text)
+
+
+_DURATION_PATTERN = re.compile(r"^(-?\d+(?:\.\d+)?)(ms|s|m|h)?$")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600, None: 1}
+DEFAULT_KEEP_ALIVE_SECONDS = 300.0
+
+
+def _keep_alive_seconds(value) -> float:
+    """Parses a keep_alive value as Ollama does; negative means forever."""
+    if value is None or value == "":
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    match = _DURATION_PATTERN.match(str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE_SECONDS
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    return float("inf") if seconds < 0 else seconds
+
+
+def _common_prefix(a: List[str], b: List[str]) -> int:
+    length = 0
+    for left, right in zip(a, b):
+        if left != right:
+            break
+        length += 1
+    return length
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def log_message(self, format, *args):  # noqa: A002 - signature from BaseHTTPRequestHandler
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": name, "model": name} for name in sorted(self.server.models_seen)]})
+        elif self.path == "/api/version":
+            self._send_json(200, {"version": "0.0.0-fake"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/api/chat", "/api/generate"):
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        config = self.server.config
+        model = body.get("model") or "fake"
+        chat = self.path == "/api/chat"
+        stream = config.stream and body.get("stream", True) is not False
+        keep_alive = _keep_alive_seconds(body.get("keep_alive"))
+        prompt = _tokenize(_prompt_text(body))
+
+        self.server.record_request(model)
+        started = time.perf_counter()
+        load_seconds = self.server.load(model)
+        if not prompt:
+            # An empty prompt only loads the model, as in Ollama.
+            self.server.release(model, keep_alive)
+            self._send_json(200, {**self._chunk(model, chat, "", done=True), "done_reason": "load"})
+            return
+
+        tokens = _tokenize(build_answer(body))
+        if config.think_tokens:
+            tokens = ["<think>"] + ["hmm "] * config.think_tokens + ["</think>\n"] + tokens
+        num_predict = (body.get("options") or {}).get("num_predict")
+        if isinstance(num_predict, int) and num_predict > 0:
+            tokens = tokens[:num_predict]
+
+        try:
+            with self.server.slots:
+                slot, cached = self.server.claim_slot(model, prompt)
+                try:
+                    evaluated = len(prompt) - cached
+                    prefill = config.latency_ms / 1000
+                    if config.prompt_tokens_per_second:
+                        prefill += evaluated / config.prompt_tokens_per_second
+                    time.sleep(prefill)
+                    prompt_done = time.perf_counter()
+                    if stream:
+                        self._stream(model, chat, tokens, started, prompt_done, evaluated, load_seconds)
+                    else:
+                        time.sleep(len(tokens) / config.tokens_per_second)
+                        payload = self._chunk(model, chat, "".join(tokens), done=False)
+                        payload.update(self._final_stats(started, prompt_done, evaluated, len(tokens), load_seconds))
+                        self._send_json(200, payload)
+                finally:
+                    self.server.free_slot(slot)
+        finally:
+            self.server.release(model, keep_alive)
+
+    @staticmethod
+    def _chunk(model: str, chat: bool, text: str, done: bool) -> dict:
+        chunk = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": done}
+        if chat:
+            chunk["message"] = {"role": "assistant", "content": text}
+        else:
+            chunk["response"] = text
+        return chunk
+
+    @staticmethod
+    def _final_stats(started: float, prompt_done: float, prompt_tokens: int, eval_tokens: int,
+                     load_seconds: float = 0.0) -> dict:
+        now = time.perf_counter()
+        return {
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((now - started) * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int((prompt_done - started - load_seconds) * 1e9),
+            "eval_count": eval_tokens,
+            "eval_duration": int((now - prompt_done) * 1e9),
+        }
+
+    def _write_chunk(self, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, model: str, chat: bool, tokens: List[str],
+                started: float, prompt_done: float, prompt_tokens: int, load_seconds: float) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        interval = 1.0 / self.server.config.tokens_per_second
+        next_token_at = time.perf_counter()
+        try:
+            for token in tokens:
+                next_token_at += interval
+                delay = next_token_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                self._write_chunk(self._chunk(model, chat, token, done=False))
+            final = self._chunk(model, chat, "", done=True)
+            final.update(self._final_stats(started, prompt_done, prompt_tokens, len(tokens), load_seconds))
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (timeout or cancelled stream).
+            self.close_connection = True
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeOllamaConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self.slots = threading.BoundedSemaphore(max(config.parallel, 1))
+        self.models_seen = set()
+        self.request_count = 0
+        self.load_count = 0
+        self._count_lock = threading.Lock()
+        # Loaded models: in-flight requests and when they unload once idle.
+        self._resident: Dict[str, dict] = {}
+        self._load_lock = threading.Lock()
+        # Per model, the parallel slots in least recently used order, with
+        # the last prompt each evaluated and whether a request is using it.
+        self._prefixes: Dict[str, List[dict]] = {}
+
+    def record_request(self, model: str) -> None:
+        with self._count_lock:
+            self.request_count += 1
+            self.models_seen.add(model)
+
+    def load(self, model: str) -> float:
+        """Makes the model resident, sleeping load_ms if it was not. Returns the load time."""
+        with self._load_lock:
+            state = self._resident.get(model)
+            if state is not None and (state["active"] or state["expires_at"] > time.monotonic()):
+                state["active"] += 1
+                return 0.0
+            start = time.perf_counter()
+            time.sleep(self.config.load_ms / 1000)
+            self._resident[model] = {"active": 1, "expires_at": float("inf")}
+            self._prefixes.pop(model, None)
+            self.load_count += 1
+            return time.perf_counter() - start
+
+    def release(self, model: str, keep_alive: float) -> None:
+        with self._load_lock:
+            state = self._resident[model]
+            state["active"] -= 1
+            state["expires_at"] = time.monotonic() + keep_alive
+
+    def claim_slot(self, model: str, prompt: List[str]) -> Tuple[dict, int]:
+        """
+        Takes the idle slot whose KV cache shares the most leading tokens
+        with the prompt (an empty or the least recently used one if none
+        does), stores the prompt in it and returns it with the number of
+        cached tokens. The caller holds one of the `slots` permits, so an
+        idle slot always exists.
+        """
+        with self._count_lock:
+            slots = self._prefixes.setdefault(model, [])
+            idle = [slot for slot in slots if not slot["busy"]]
+            best, cached = None, 0
+            for slot in idle:
+                length = _common_prefix(slot["prompt"], prompt)
+                if length > cached:
+                    best, cached = slot, length
+            if best is None:
+                if len(slots) < max(self.config.parallel, 1):
+                    best = {"prompt": [], "busy": False}
+                    slots.append(best)
+                else:
+                    best = idle[0]
+            slots.remove(best)
+            slots.append(best)
+            best.update(prompt=prompt, busy=True)
+            return best, cached
+
+    def free_slot(self, slot: dict) -> None:
+        with self._count_lock:
+            slot["busy"] = False
+
+
+class FakeOllamaServer:
+    """
+    Runs the fake API on a background thread. Use as a context manager:
+
+        with FakeOllamaServer(FakeOllamaConfig(latency_ms=50)) as server:
+            generator = LLMGenerator(base_url=server.url)
+    """
+    def __init__(self, config: Optional[FakeOllamaConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeOllamaConfig()
+        self._server = _Server((host, port), self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count
+
+    @property
+    def load_count(self) -> int:
+        """How many times a model was loaded (first use or after keep_alive expired)."""
+        return self._server.load_count
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serves on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOllamaServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=FakeOllamaConfig.latency_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=FakeOllamaConfig.tokens_per_second)
+    parser.add_argument("--parallel", type=int, default=FakeOllamaConfig.parallel)
+    parser.add_argument("--think-tokens", type=int, default=0)
+    parser.add_argument("--no-stream", action="store_true", help="Always answer with a single JSON object.")
+    parser.add_argument("--load-ms", type=float, default=0.0, help="Model load time when not resident.")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=0.0,
+                        help="Prompt evaluation speed for tokens not covered by a cached prefix.")
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        parallel=args.parallel,
+        think_tokens=args.think_tokens,
+        stream=not args.no_stream,
+        load_ms=args.load_ms,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+    )
+    server = FakeOllamaServer(config, host=args.host, port=args.port)
+    print(f"Fake Ollama listening on {server.url} ({config}). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Offline benchmark and load-test suite.
+
+Runs against the synthetic corpus and a local fake Ollama server, so no model,
+GPU or network is needed. Scenarios:
+
+    parse     parse throughput per format and size, malformed-file handling
+    analysis  generate_cv_analysis latency percentiles per mode
+    sessions  N concurrent simulated UI sessions streaming analyses
+    warmup    cold vs warmed-up first analysis, keep_alive residency and
+              prompt prefix reuse between the two calls of an analysis,
+              in sequential and concurrent mode
+    ranking   CV index build, reopen and top-k job description queries
+    dedup     near-duplicate check latency and clustering of CV variants
+
+Results are written as JSON (with the git commit) so runs can be compared:
+
+    python -m benchmarks.run_benchmarks --out results.json
+    python -m benchmarks.run_benchmarks --scenario analysis --compare baseline.json
+
+Usage (from the application directory).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from src.cache import MemoryCache, TieredCache
+from src.cv_index import CVIndex
+from src.near_duplicates import NearDuplicateDetector
+from src.metrics import recent_requests
+from src.parser import parse_cv_bytes
+from src.rag_pipeline import ANALYSIS_MODES, LLMGenerator
+from src.scheduler import JobScheduler
+
+from .corpus import build_corpus, synthetic_cv_text
+from .fake_ollama import FakeOllamaConfig, FakeOllamaServer
+
+SCENARIOS = ("parse", "analysis", "sessions", "warmup", "ranking", "dedup")
+
+JOB_DESCRIPTIONS = (
+    "Senior backend engineer with Python, PostgreSQL and Docker; Kubernetes a plus.",
+    "Machine learning engineer: PyTorch, TensorFlow, computer vision and NLP experience.",
+    "Data analyst with SQL, Power BI and Excel reporting for finance stakeholders.",
+)
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Summary statistics of latency samples in seconds, reported in milliseconds."""
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    ordered = sorted(samples)
+
+    def at(fraction: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p50_ms": round(at(0.50) * 1000, 2),
+        "p90_ms": round(at(0.90) * 1000, 2),
+        "p99_ms": round(at(0.99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _generator(server: FakeOllamaServer, **kwargs) -> LLMGenerator:
+    # A private in-memory cache keeps benchmark runs out of the user's cache.
+    return LLMGenerator(cache=TieredCache("benchmark", MemoryCache()), base_url=server.url, **kwargs)
+
+
+def run_parse(repeat: int, small: int, huge: int) -> dict:
+    """Parses every corpus document `repeat` times and reports throughput by group."""
+    corpus = build_corpus(small=small, huge=huge)
+    groups: Dict[str, dict] = {}
+    for document in corpus:
+        group = groups.setdefault(f"{document.kind}/{document.size}", {
+            "documents": 0, "bytes": 0, "samples": [], "failures": 0, "chars": 0,
+        })
+        group["documents"] += 1
+        for _ in range(repeat):
+            start = time.perf_counter()
+            try:
+                text = parse_cv_bytes(document.data, document.name)
+            except Exception:
+                text = ""
+            group["samples"].append(time.perf_counter() - start)
+            group["bytes"] += len(document.data)
+            if not text.strip():
+                group["failures"] += 1
+            group["chars"] += len(text)
+
+    results = {}
+    for name, group in groups.items():
+        total = sum(group["samples"])
+        results[name] = {
+            "documents": group["documents"],
+            "parses": len(group["samples"]),
+            "failures": group["failures"],
+            "docs_per_second": round(len(group["samples"]) / total, 2) if total else None,
+            "mb_per_second": round(group["bytes"] / total / 1e6, 3) if total else None,
+            "avg_chars": round(group["chars"] / len(group["samples"])),
+            "latency": percentiles(group["samples"]),
+        }
+    return results
+
+
+def run_analysis(server: FakeOllamaServer, modes: List[str], requests: int) -> dict:
+    """Runs generate_cv_analysis sequentially per mode and reports latency percentiles."""
+    generator = _generator(server)
+    results = {}
+    for mode in modes:
+        samples, errors = [], 0
+        requests_before = server.request_count
+        for index in range(requests):
+            cv_text = synthetic_cv_text(index)
+            start = time.perf_counter()
+            try:
+                analysis = generator.generate_cv_analysis(cv_text, use_cache=False, mode=mode)
+                if not analysis.get("score"):
+                    errors += 1
+            except Exception as e:
+                print(f"[analysis/{mode}] request {index} failed: {e}")
+                errors += 1
+            samples.append(time.perf_counter() - start)
+        results[mode] = {
+            "errors": errors,
+            "model_calls": server.request_count - requests_before,
+            "latency": percentiles(samples),
+        }
+    return results
+
+
+def run_sessions(server: FakeOllamaServer, sessions: int, analyses_per_session: int, mode: str,
+                 scheduler_workers: int = 0) -> dict:
+    """
+    Simulates concurrent UI sessions sharing one generator, each streaming
+    analyses back to back. Reports time to first score and to completion.
+    With scheduler_workers > 0 the sessions go through a JobScheduler with
+    that many workers, as the app does.
+    """
+    generator = _generator(server)
+    scheduler = JobScheduler(generator, workers=scheduler_workers, max_queue=sessions) if scheduler_workers else None
+    first_score: List[float] = []
+    completion: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def session(session_index: int) -> None:
+        nonlocal errors
+        for run_index in range(analyses_per_session):
+            cv_text = synthetic_cv_text(10_000 + session_index * analyses_per_session + run_index)
+            start = time.perf_counter()
+            score_at = None
+            try:
+                if scheduler is not None:
+                    events = scheduler.submit(cv_text, mode=mode, use_cache=False).iter_events()
+                else:
+                    events = generator.stream_cv_analysis(cv_text, use_cache=False, mode=mode)
+                for event in events:
+                    if event["type"] == "score" and score_at is None:
+                        score_at = time.perf_counter() - start
+            except Exception as e:
+                print(f"[sessions] session {session_index} failed: {e}")
+                with lock:
+                    errors += 1
+                continue
+            with lock:
+                completion.append(time.perf_counter() - start)
+                if score_at is not None:
+                    first_score.append(score_at)
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        list(executor.map(session, range(sessions)))
+    wall = time.perf_counter() - wall_start
+    if scheduler is not None:
+        scheduler.shutdown()
+    return {
+        "sessions": sessions,
+        "scheduler_workers": scheduler_workers,
+        "analyses": len(completion),
+        "errors": errors,
+        "mode": mode,
+        "wall_seconds": round(wall, 3),
+        "analyses_per_minute": round(len(completion) / wall * 60, 2) if wall else None,
+        "time_to_first_score": percentiles(first_score),
+        "time_to_complete": percentiles(completion),
+    }
+
+
+def _timed_analysis(generator: LLMGenerator, cv_text: str, mode: str) -> float:
+    start = time.perf_counter()
+    generator.generate_cv_analysis(cv_text, use_cache=False, mode=mode)
+    return time.perf_counter() - start
+
+
+def run_warm_up(config: FakeOllamaConfig, requests: int, mode: str = "sequential") -> dict:
+    """
+    Measures model residency and prompt prefix reuse against fresh fake
+    servers that model load time and prompt evaluation speed:
+
+    - the first analysis with and without LLMGenerator.warm_up beforehand,
+    - back-to-back analyses with keep_alive=0 (unload after every request)
+      and with the configured keep-alive,
+    - prompt tokens evaluated by each model call of one analysis, which shows
+      how much of the CV prefix the second call reuses.
+    """
+    results: Dict[str, dict] = {}
+
+    with FakeOllamaServer(config) as server:
+        results["cold_first_analysis_ms"] = round(_timed_analysis(_generator(server), synthetic_cv_text(0), mode) * 1000, 2)
+
+    with FakeOllamaServer(config) as server:
+        generator = _generator(server)
+        warm_up_seconds = generator.warm_up()
+        results["warm_up_ms"] = round(warm_up_seconds * 1000, 2)
+        results["warmed_first_analysis_ms"] = round(_timed_analysis(generator, synthetic_cv_text(0), mode) * 1000, 2)
+        analysis_record = recent_requests()[-1]
+        results["prompt_tokens_evaluated"] = {
+            call["chain"]: call.get("prompt_eval_count") for call in analysis_record["llm_calls"]
+        }
+
+    for name, keep_alive in (("keep_alive_0", 0), ("keep_alive_default", None)):
+        with FakeOllamaServer(config) as server:
+            generator = _generator(server, keep_alive=keep_alive)
+            samples = [_timed_analysis(generator, synthetic_cv_text(index), mode) for index in range(requests)]
+            results[name] = {"model_loads": server.load_count, "latency": percentiles(samples)}
+    results.update(mode=mode, load_ms=config.load_ms, prompt_tokens_per_second=config.prompt_tokens_per_second)
+    return results
+
+
+def compare(current: dict, baseline: dict, prefix: str = "") -> List[str]:
+    """Lists changes of the *_ms / *_per_* metrics between two result files."""
+    lines = []
+    for key, value in current.items():
+        path = f"{prefix}{key}"
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            lines += compare(value, old or {}, path + ".")
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old and (
+                key.endswith("_ms") or "_per_" in key):
+            lines.append(f"{path}: {old} -> {value} ({(value - old) / old * 100:+.1f}%)")
+    return lines
+
+
+def run_ranking(documents: int, queries: int, top_k: int = 20) -> dict:
+    """
+    Indexes `documents` synthetic CVs into a persistent CVIndex, reopens it
+    and reports the latency of top-k job description queries.
+    """
+    texts = [synthetic_cv_text(seed) for seed in range(documents)]
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = CVIndex(index_dir)
+        start = time.perf_counter()
+        for seed, text in enumerate(texts):
+            index.add(f"cv-{seed}", text)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = CVIndex(index_dir)
+        index.search(JOB_DESCRIPTIONS[0], top_k)
+        reopen_seconds = time.perf_counter() - start
+
+        samples = []
+        for query in range(queries):
+            start = time.perf_counter()
+            index.search(JOB_DESCRIPTIONS[query % len(JOB_DESCRIPTIONS)], top_k)
+            samples.append(time.perf_counter() - start)
+        stats = index.stats()
+    return {
+        "documents": documents,
+        "postings": stats["postings"],
+        "adds_per_second": round(documents / build_seconds, 1) if build_seconds else None,
+        "reopen_ms": round(reopen_seconds * 1000, 2),
+        "query": percentiles(samples),
+    }
+
+
+def _variant(text: str, seed: int) -> str:
+    """A re-submitted CV: one bullet extended, one line added, the city changed."""
+    rng = random.Random(seed)
+    lines = text.split("\n")
+    index = rng.randrange(8, len(lines) - 8)
+    lines[index] += " and mentored two junior engineers"
+    lines.insert(rng.randrange(8, len(lines)), "- Certified AWS Solutions Architect")
+    return "\n".join(lines).replace("Cairo, Egypt", "Giza, Egypt")
+
+
+def run_dedup(documents: int, variant_share: float = 0.2) -> dict:
+    """
+    Feeds `documents` distinct CVs plus variants of a share of them through a
+    NearDuplicateDetector in shuffled order and reports the per-CV check
+    latency and how many variants were merged with their original.
+    """
+    originals = [(f"cv-{seed}", synthetic_cv_text(seed)) for seed in range(documents)]
+    variants = [(f"variant-{seed}", _variant(text, seed)) for seed, (_, text) in enumerate(originals)
+                if seed < documents * variant_share]
+    stream = originals + variants
+    random.Random(0).shuffle(stream)
+
+    detector = NearDuplicateDetector()
+    samples, merged, wrong = [], 0, 0
+    for doc_id, text in stream:
+        start = time.perf_counter()
+        match = detector.add(doc_id, text)
+        samples.append(time.perf_counter() - start)
+        if match.is_duplicate:
+            if match.representative.split("-")[1] == doc_id.split("-")[1]:
+                merged += 1
+            else:
+                wrong += 1
+    return {
+        "documents": len(stream),
+        "variants": len(variants),
+        "variants_merged": merged,
+        "wrong_merges": wrong,
+        "clusters": len(detector.clusters()),
+        "check": percentiles(samples),
+    }
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append",
+                        help="Scenario to run; repeat for several. Defaults to all.")
+    parser.add_argument("--out", help="Write results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file to compare the results with.")
+    parser.add_argument("--parse-repeat", type=int, default=3)
+    parser.add_argument("--small", type=int, default=8, help="Small CVs per format in the corpus.")
+    parser.add_argument("--huge", type=int, default=2, help="Huge CVs per format in the corpus.")
+    parser.add_argument("--modes", nargs="+", choices=ANALYSIS_MODES, default=list(ANALYSIS_MODES))
+    parser.add_argument("--requests", type=int, default=10, help="Analyses per mode.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated sessions.")
+    parser.add_argument("--analyses-per-session", type=int, default=3)
+    parser.add_argument("--session-mode", choices=ANALYSIS_MODES, default="concurrent")
+    parser.add_argument("--scheduler-workers", type=int, default=0,
+                        help="Route sessions through a JobScheduler with this many workers (0 = direct calls).")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Fake model time to first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="Fake model generation speed.")
+    parser.add_argument("--parallel", type=int, default=4, help="Requests the fake model serves at once.")
+    parser.add_argument("--think-tokens", type=int, default=0)
+    parser.add_argument("--load-ms", type=float, default=1500.0,
+                        help="Fake model load time when not resident (warmup scenario only).")
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=500.0,
+                        help="Fake prompt evaluation speed for uncached tokens (warmup scenario only).")
+    parser.add_argument("--index-size", type=int, default=2000, help="CVs indexed in the ranking and dedup scenarios.")
+    parser.add_argument("--queries", type=int, default=50, help="Job description queries in the ranking scenario.")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    scenarios = args.scenario or list(SCENARIOS)
+    fake_config = FakeOllamaConfig(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        parallel=args.parallel,
+        think_tokens=args.think_tokens,
+    )
+    results = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "fake_ollama": vars(fake_config),
+        "scenarios": {},
+    }
+
+    if "parse" in scenarios:
+        print("Running parse scenario...")
+        results["scenarios"]["parse"] = run_parse(args.parse_repeat, args.small, args.huge)
+    if "analysis" in scenarios or "sessions" in scenarios:
+        with FakeOllamaServer(fake_config) as server:
+            if "analysis" in scenarios:
+                print(f"Running analysis scenario against {server.url}...")
+                results["scenarios"]["analysis"] = run_analysis(server, args.modes, args.requests)
+            if "sessions" in scenarios:
+                print(f"Running sessions scenario with {args.sessions} sessions...")
+                results["scenarios"]["sessions"] = run_sessions(
+                    server, args.sessions, args.analyses_per_session, args.session_mode, args.scheduler_workers
+                )
+
+    if "warmup" in scenarios:
+        print("Running warmup scenario...")
+        warm_up_config = FakeOllamaConfig(
+            **{**vars(fake_config), "load_ms": args.load_ms, "prompt_tokens_per_second": args.prompt_tokens_per_second}
+        )
+        results["scenarios"]["warmup"] = {
+            mode: run_warm_up(warm_up_config, args.requests, mode)
+            for mode in ("sequential", "concurrent") if mode in args.modes
+        }
+
+    if "ranking" in scenarios:
+        print(f"Running ranking scenario with {args.index_size} CVs...")
+        results["scenarios"]["ranking"] = run_ranking(args.index_size, args.queries)
+
+    if "dedup" in scenarios:
+        print(f"Running dedup scenario with {args.index_size} CVs...")
+        results["scenarios"]["dedup"] = run_dedup(args.index_size)
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out_file:
+            out_file.write(output + "\n")
+        print(f"Results written to {args.out}")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        print(f"Compared with {args.compare} (commit {baseline.get('commit')}):")
+        for line in compare(results["scenarios"], baseline.get("scenarios", {})):
+            print("  " + line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Settings of the Streamlit app, read from the environment once per process.
+
+Only the standard library is imported here: Streamlit re-executes app.py on
+every interaction, and the page should not wait on anything heavier before
+it renders.
+"""
+import os
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+
+def _flag(name: str, default: str = "1") -> bool:
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off")
+
+
+# Working directories; the Docker image creates and mounts /app/uploads and /app/temp.
+UPLOADS_DIR = Path(os.getenv("SMART_CV_UPLOADS_DIR", APP_DIR / "uploads"))
+TEMP_DIR = Path(os.getenv("SMART_CV_TEMP_DIR", APP_DIR / "temp"))
+
+FILE_CONFIG = {
+    # Extensions the parser reads, without the dot (as st.file_uploader expects).
+    "allowed_types": ["pdf", "docx"],
+    # Same variable and default as the API's upload limit.
+    "max_upload_mb": float(os.getenv("SMART_CV_MAX_UPLOAD_MB", 10)),
+}
+
+ATS_SCORING = {
+    "max_score": 100,
+    # Lowest scores shown as "Excellent" and "Good"; anything below needs work.
+    "excellent_threshold": int(os.getenv("SMART_CV_SCORE_EXCELLENT", 80)),
+    "good_threshold": int(os.getenv("SMART_CV_SCORE_GOOD", 60)),
+}
+
+# Keyword arguments of st.set_page_config.
+STREAMLIT_CONFIG = {
+    "page_title": os.getenv("SMART_CV_PAGE_TITLE", "Smart CV Analyzer Pro"),
+    "page_icon": "📊",
+    "layout": "wide",
+    "initial_sidebar_state": "expanded",
+}
+
+# Load the model in the background when the first page is served. Read here
+# as well as in rag_pipeline so the app does not import the LLM stack just to
+# find out warm-up is disabled.
+WARM_UP_ON_STARTUP = _flag("SMART_CV_WARMUP")
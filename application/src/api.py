@@ -0,0 +1,237 @@
+"""
+HTTP API for CV analysis, independent of the Streamlit UI.
+
+Run with:
+    uvicorn src.api:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+    POST   /v1/analyses                  upload a CV (multipart "file") and queue its analysis
+    GET    /v1/analyses/{job_id}         job status, queue position and ETA
+    GET    /v1/analyses/{job_id}/result  the analysis; ?wait=N long-polls up to N seconds
+    GET    /v1/analyses/{job_id}/events  analysis events as newline-delimited JSON while they are generated
+    DELETE /v1/analyses/{job_id}         cancel a job that has not started
+    POST   /v1/search                    top-k uploaded CVs for a job description (JSON body)
+    GET    /healthz                      liveness
+    GET    /metrics                      Prometheus metrics
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from fastapi import FastAPI, File, Form, HTTPException, Query, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from .cache import hash_bytes
+from .cv_index import get_cv_index
+from .near_duplicates import get_duplicate_detector
+from .metrics import REGISTRY
+from .parser import parse_cv_cached
+from .ollama_router import get_ollama_router
+from .rag_pipeline import ANALYSIS_MODES, warm_up_on_startup
+from .scheduler import PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, Job, QueueFullError, get_scheduler
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("SMART_CV_MAX_UPLOAD_MB", 10)) * 1024 * 1024)
+# Longest a client may block on GET .../result?wait=N.
+MAX_WAIT_SECONDS = 300.0
+# How often an idle event stream checks that its client is still connected.
+EVENT_POLL_SECONDS = 1.0
+_END_OF_EVENTS = object()
+
+PRIORITIES = {"high": PRIORITY_HIGH, "normal": PRIORITY_NORMAL, "low": PRIORITY_LOW}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Load the model into Ollama before the first request arrives.
+    warm_up_on_startup()
+    yield
+
+
+app = FastAPI(title="Smart CV Evaluator API", version="1.0.0", lifespan=lifespan)
+
+
+class SearchRequest(BaseModel):
+    job_description: str = Field(..., min_length=1)
+    top_k: int = Field(10, ge=1, le=1000)
+
+
+def _job_status(job: Job) -> dict:
+    eta = job.eta_seconds()
+    status = {
+        "job_id": job.id,
+        "status": job.status,
+        "mode": job.mode,
+        "position": job.position(),
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "rule_score": job.rule_score,
+        "links": {
+            "self": f"/v1/analyses/{job.id}",
+            "result": f"/v1/analyses/{job.id}/result",
+            "events": f"/v1/analyses/{job.id}/events",
+        },
+    }
+    if job.error is not None:
+        status["error"] = str(job.error)
+    return status
+
+
+def _get_job(job_id: str) -> Job:
+    job = get_scheduler().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'.")
+    return job
+
+
+@app.get("/healthz")
+async def healthz() -> dict:
+    status = {"status": "ok", "queue": get_scheduler().stats()}
+    router = get_ollama_router()
+    if router is not None:
+        status["ollama_endpoints"] = router.stats()
+    return status
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.post("/v1/analyses", status_code=202)
+async def create_analysis(
+    file: UploadFile = File(..., description="The CV as PDF or DOCX."),
+    mode: str = Form("concurrent"),
+    priority: str = Form("normal"),
+    use_cache: bool = Form(True),
+) -> JSONResponse:
+    """Parses the uploaded CV and queues its analysis. Returns 202 with the job status."""
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=422, detail=f"Unsupported mode '{mode}'. Expected one of {ANALYSIS_MODES}.")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=422, detail=f"Unsupported priority '{priority}'. Expected one of {list(PRIORITIES)}.")
+
+    data = await file.read(MAX_UPLOAD_BYTES + 1)
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+
+    # Parsing is CPU-bound (and uses worker processes for PDFs); keep it off the event loop.
+    try:
+        cv_text = await asyncio.to_thread(parse_cv_cached, data, file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    if not cv_text or not cv_text.strip():
+        raise HTTPException(
+            status_code=422,
+            detail="Could not extract text from the CV. The file might be corrupted or contain images only.",
+        )
+    # Every uploaded CV becomes searchable by job description.
+    cv_id = hash_bytes(data)
+    if cv_id not in get_cv_index():
+        await asyncio.to_thread(get_cv_index().add, cv_id, cv_text, {"file": file.filename or ""})
+    # Revised uploads still get their own analysis; the match is only reported.
+    duplicate = get_duplicate_detector().add(cv_id, cv_text)
+
+    try:
+        job = await asyncio.to_thread(
+            get_scheduler().submit, cv_text, mode=mode, priority=PRIORITIES[priority], use_cache=use_cache
+        )
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": str(e), "retry_after": round(e.retry_after)},
+            headers={"Retry-After": str(max(int(e.retry_after), 1))},
+        )
+    content = _job_status(job)
+    content["cv_id"] = cv_id
+    if duplicate.is_duplicate:
+        content["near_duplicate_of"] = {"cv_id": duplicate.representative, "similarity": round(duplicate.similarity, 3)}
+    return JSONResponse(status_code=202 if not job.done else 200, content=content)
+
+
+@app.get("/v1/analyses/{job_id}")
+async def get_analysis(job_id: str) -> dict:
+    return _job_status(_get_job(job_id))
+
+
+@app.get("/v1/analyses/{job_id}/result")
+async def get_analysis_result(job_id: str, wait: float = Query(0.0, ge=0.0)) -> JSONResponse:
+    """
+    Returns the analysis (200), the job status while it is still pending
+    (202), or the error if the analysis failed (500) or was cancelled (410).
+    """
+    job = _get_job(job_id)
+    if not job.done and wait:
+        await asyncio.to_thread(job.wait, min(wait, MAX_WAIT_SECONDS))
+    if not job.done:
+        return JSONResponse(status_code=202, content=_job_status(job))
+    if job.status == "cancelled":
+        return JSONResponse(status_code=410, content=_job_status(job))
+    if job.error is not None:
+        return JSONResponse(status_code=500, content=_job_status(job))
+    return JSONResponse(content={"job_id": job.id, "status": job.status, "analysis": job.result})
+
+
+async def _ndjson(job: Job, request: Request) -> AsyncIterator[bytes]:
+    # Each blocking step of the job's iterator runs in a worker thread. The
+    # heartbeat returns control at least every EVENT_POLL_SECONDS, so a client
+    # that went away releases the thread instead of holding it until the job ends.
+    events = job.iter_events(heartbeat=EVENT_POLL_SECONDS)
+    try:
+        while True:
+            event = await asyncio.to_thread(next, events, _END_OF_EVENTS)
+            if event is _END_OF_EVENTS:
+                break
+            if event is None:
+                if await request.is_disconnected():
+                    break
+                continue
+            yield (json.dumps(event) + "\n").encode("utf-8")
+    except Exception as e:
+        yield (json.dumps({"type": "error", "error": str(e)}) + "\n").encode("utf-8")
+    finally:
+        events.close()
+
+
+@app.get("/v1/analyses/{job_id}/events")
+async def stream_analysis_events(job_id: str, request: Request) -> StreamingResponse:
+    """
+    Streams the job's events (rule_score, score, summary_token, recommendation, done) as
+    newline-delimited JSON, starting from the first one, until the job ends.
+    Failures end the stream with an {"type": "error"} event.
+    """
+    job = _get_job(job_id)
+    return StreamingResponse(_ndjson(job, request), media_type="application/x-ndjson")
+
+
+@app.post("/v1/search")
+async def search_cvs(request: SearchRequest) -> dict:
+    """
+    Ranks the CVs uploaded so far against a job description. Results carry
+    the CV id (SHA-256 of the file), match score and file name.
+    """
+    results = await asyncio.to_thread(get_cv_index().search, request.job_description, request.top_k)
+    return {"results": [result.as_dict() for result in results]}
+
+
+@app.delete("/v1/analyses/{job_id}")
+async def cancel_analysis(job_id: str) -> dict:
+    job = _get_job(job_id)
+    cancelled = job.cancel()
+    return {**_job_status(job), "cancelled": cancelled}
+
+
+def main(host: Optional[str] = None, port: Optional[int] = None) -> None:
+    """Runs the API with uvicorn (SMART_CV_API_HOST / SMART_CV_API_PORT)."""
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        host=host or os.getenv("SMART_CV_API_HOST", "0.0.0.0"),
+        port=port or int(os.getenv("SMART_CV_API_PORT", 8000)),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+import requests
+
+# How often a RemoteJob refreshes its status while it waits in the queue.
+STATUS_POLL_SECONDS = 1.0
+
+
+class APIError(RuntimeError):
+    """An error response from the analysis API."""
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ServiceBusyError(APIError):
+    """The API rejected the job because its queue is full (HTTP 429)."""
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(429, detail)
+        self.retry_after = retry_after
+
+
+def _raise_for_status(response: requests.Response) -> None:
+    if response.status_code < 400:
+        return
+    try:
+        body = response.json()
+    except ValueError:
+        body = {"detail": response.text}
+    detail = body.get("detail") or body.get("error") or f"HTTP {response.status_code}"
+    if response.status_code == 429:
+        raise ServiceBusyError(detail, float(body.get("retry_after") or response.headers.get("Retry-After") or 0))
+    raise APIError(response.status_code, str(detail))
+
+
+class RemoteJob:
+    """
+    A job queued on the analysis API, with the same interface the UI uses
+    for local scheduler jobs: rule_score, wait_started, position,
+    eta_seconds, iter_events and cancel.
+    """
+    def __init__(self, client: "AnalysisAPIClient", status: dict):
+        self.client = client
+        self.id = status["job_id"]
+        self._status = status
+        self._lock = threading.Lock()
+
+    @property
+    def status(self) -> str:
+        return self._status["status"]
+
+    def refresh(self) -> dict:
+        status = self.client.status(self.id)
+        with self._lock:
+            self._status = status
+        return status
+
+    def wait_started(self, timeout: Optional[float] = None) -> bool:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.refresh()["status"] == "queued":
+            remaining = deadline - time.monotonic() if deadline is not None else STATUS_POLL_SECONDS
+            if remaining <= 0:
+                return False
+            time.sleep(min(STATUS_POLL_SECONDS, remaining))
+        return True
+
+    def position(self) -> Optional[int]:
+        return self._status.get("position")
+
+    def eta_seconds(self) -> Optional[float]:
+        return self._status.get("eta_seconds")
+
+    @property
+    def rule_score(self) -> Optional[dict]:
+        return self._status.get("rule_score")
+
+    def iter_events(self) -> Iterator[dict]:
+        yield from self.client.stream_events(self.id)
+
+    def cancel(self) -> bool:
+        try:
+            return bool(self.client.cancel(self.id).get("cancelled"))
+        except (APIError, requests.RequestException):
+            return False
+
+
+class AnalysisAPIClient:
+    """Minimal client for src.api, used by the Streamlit app when SMART_CV_API_URL is set."""
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def submit(self, file_bytes: bytes, file_name: str, mode: str = "concurrent",
+               priority: str = "normal", use_cache: bool = True) -> RemoteJob:
+        """
+        Uploads a CV and queues its analysis.
+
+        Raises:
+            ServiceBusyError: If the API's queue is full.
+            APIError: If the file cannot be parsed (415/422) or another error occurs.
+        """
+        response = self.session.post(
+            f"{self.base_url}/v1/analyses",
+            files={"file": (file_name, file_bytes)},
+            data={"mode": mode, "priority": priority, "use_cache": str(use_cache).lower()},
+            timeout=self.timeout,
+        )
+        _raise_for_status(response)
+        return RemoteJob(self, response.json())
+
+    def status(self, job_id: str) -> dict:
+        response = self.session.get(f"{self.base_url}/v1/analyses/{job_id}", timeout=self.timeout)
+        _raise_for_status(response)
+        return response.json()
+
+    def result(self, job_id: str, wait: float = 0.0) -> Optional[dict]:
+        """Returns the analysis, or None if it is not ready within `wait` seconds."""
+        response = self.session.get(
+            f"{self.base_url}/v1/analyses/{job_id}/result",
+            params={"wait": wait},
+            timeout=self.timeout + wait,
+        )
+        _raise_for_status(response)
+        if response.status_code == 202:
+            return None
+        return response.json()["analysis"]
+
+    def stream_events(self, job_id: str) -> Iterator[dict]:
+        """
+        Yields the job's analysis events as the server produces them.
+
+        Raises:
+            APIError: If the analysis fails.
+        """
+        with self.session.get(
+            f"{self.base_url}/v1/analyses/{job_id}/events", stream=True, timeout=(self.timeout, None)
+        ) as response:
+            _raise_for_status(response)
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event.get("type") == "error":
+                    raise APIError(500, event.get("error", "Analysis failed."))
+                yield event
+
+    def cancel(self, job_id: str) -> dict:
+        response = self.session.delete(f"{self.base_url}/v1/analyses/{job_id}", timeout=self.timeout)
+        _raise_for_status(response)
+        return response.json()
+
+
+_client: Optional[AnalysisAPIClient] = None
+_client_lock = threading.Lock()
+
+
+def get_api_client() -> Optional[AnalysisAPIClient]:
+    """Returns the client for SMART_CV_API_URL, or None when the app analyzes in-process."""
+    global _client
+    base_url = os.getenv("SMART_CV_API_URL")
+    if not base_url:
+        return None
+    with _client_lock:
+        if _client is None:
+            _client = AnalysisAPIClient(base_url)
+        return _client
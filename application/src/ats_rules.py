@@ -0,0 +1,236 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .section_matcher import SectionMatch, SectionMatcher, get_section_matcher
+
+# The eight criteria of ATS_SCORE_PROMPT: (key, label, points).
+CRITERIA = (
+    ("contact", "Contact Information", 10),
+    ("summary", "Professional Summary", 15),
+    ("experience", "Work Experience", 25),
+    ("education", "Education", 10),
+    ("skills", "Skills Section", 15),
+    ("format", "Format & Readability", 10),
+    ("keywords", "Keywords & Optimization", 10),
+    ("achievements", "Achievements & Impact", 5),
+)
+
+# Deterministic signals: (feature, criterion, weight within the criterion,
+# advice when the signal is weak). Each feature is normalized to 0..1.
+FEATURES = (
+    ("email", "contact", 0.35, "Add a professional email address."),
+    ("phone", "contact", 0.30, "Add a phone number with country code."),
+    ("linkedin", "contact", 0.20, "Add your LinkedIn profile URL."),
+    ("portfolio", "contact", 0.15, "Link your GitHub profile or portfolio."),
+    ("summary_heading", "summary", 0.50, "Add a professional summary section at the top of the CV."),
+    ("summary_body", "summary", 0.50, "Write a 2-3 sentence summary naming your target role and strengths."),
+    ("experience_lines", "experience", 0.40, "Describe your work experience in more detail."),
+    ("date_ranges", "experience", 0.25, "Give start and end dates for every position."),
+    ("quantified_lines", "experience", 0.35, "Quantify the results of each role with numbers."),
+    ("education_lines", "education", 0.40, "Add an education section."),
+    ("degree", "education", 0.35, "State your degree and field of study (e.g. BSc Computer Science)."),
+    ("institution", "education", 0.25, "Name the university or college you attended."),
+    ("skills_heading", "skills", 0.40, "Add a dedicated skills section with a standard heading."),
+    ("skill_keywords", "skills", 0.60, "List more concrete technical skills and tools."),
+    ("length", "format", 0.35, "Keep the CV to one or two pages (roughly 300-1000 words)."),
+    ("headings", "format", 0.25, "Use standard section headings such as Experience, Education and Skills."),
+    ("bullets", "format", 0.20, "Use bullet points for responsibilities and achievements."),
+    ("clean_text", "format", 0.20, "Avoid tables, graphics and special characters that ATS parsers cannot read."),
+    ("action_verbs", "keywords", 0.60, "Start bullet points with strong action verbs (led, built, improved)."),
+    ("keyword_hits", "keywords", 0.40, "Mirror the keywords of the job posting in your experience and skills."),
+    ("metrics", "achievements", 1.00, "Add measurable results such as percentages, amounts or time saved."),
+)
+
+FEATURE_NAMES = tuple(name for name, _, _, _ in FEATURES)
+CRITERION_KEYS = tuple(key for key, _, _ in CRITERIA)
+MAX_POINTS = np.array([points for _, _, points in CRITERIA], dtype=np.float64)
+
+
+def _weight_matrix() -> np.ndarray:
+    """(criteria x features) weights; each criterion's row sums to 1."""
+    weights = np.zeros((len(CRITERIA), len(FEATURES)))
+    for column, (_, criterion, weight, _) in enumerate(FEATURES):
+        weights[CRITERION_KEYS.index(criterion), column] = weight
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+WEIGHTS = _weight_matrix()
+
+ACTION_VERBS = (
+    "achieved", "analyzed", "automated", "built", "collaborated", "coordinated", "created", "delivered",
+    "designed", "developed", "drove", "enhanced", "established", "executed", "generated", "implemented",
+    "improved", "increased", "launched", "led", "managed", "mentored", "migrated", "optimized", "organized",
+    "reduced", "resolved", "scaled", "spearheaded", "streamlined", "trained",
+)
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?<![\w.])\+?\d[\d\s().-]{7,}\d(?![\w.])")
+_LINKEDIN = re.compile(r"linkedin\.com/", re.IGNORECASE)
+_PORTFOLIO = re.compile(r"github\.com/|gitlab\.com/|https?://(?!(?:www\.)?linkedin)|www\.(?!linkedin)", re.IGNORECASE)
+_SUMMARY_HEADING = re.compile(r"^(?:professional\s+|career\s+)?(?:summary|profile|objective|about(?:\s+me)?)\b", re.IGNORECASE)
+_SKILLS_HEADING = re.compile(r"^(?:technical\s+|core\s+|key\s+)?(?:skills|competencies|technologies|tech\s+stack)\b", re.IGNORECASE)
+_HEADING = re.compile(
+    r"^(?:professional\s+|work\s+|career\s+|technical\s+)?(?:summary|profile|objective|experience|employment|"
+    r"education|skills|projects|certifications?|awards|publications|languages|interests|references)\s*:?$",
+    re.IGNORECASE,
+)
+_YEAR_RANGE = re.compile(
+    r"\b(?:19|20)\d{2}\s*(?:-|–|—|to)\s*(?:(?:19|20)\d{2}|present|current|now)\b", re.IGNORECASE)
+_DEGREE = re.compile(
+    r"\b(?:bachelor|master|ph\.?d|doctorate|mba|b\.?sc|m\.?sc|b\.?s\.?|m\.?s\.?|b\.?a\.?|m\.?a\.?|b\.?eng|m\.?eng|"
+    r"associate(?:'s)?\s+degree|diploma)\b",
+    re.IGNORECASE,
+)
+_INSTITUTION = re.compile(r"\b(?:university|college|institute|school|academy|polytechnic)\b", re.IGNORECASE)
+_NUMBER = re.compile(r"\d")
+_METRIC = re.compile(
+    r"\d+(?:[.,]\d+)?\s*(?:%|percent|k\b|m\b|x\b|\+)|[$€£]\s*\d|"
+    r"\b\d+(?:[.,]\d+)?\s+(?:users|customers|clients|hours|days|people|engineers|projects|countries|requests)\b",
+    re.IGNORECASE,
+)
+_BULLET = re.compile(r"^\s*(?:[•●▪◦‣∙\-*–]|\d+[.)])\s+")
+_ACTION_VERBS = re.compile(r"\b(" + "|".join(sorted(ACTION_VERBS, key=len, reverse=True)) + r")\b", re.IGNORECASE)
+# Characters that usually come from tables, icons or broken PDF encodings.
+_UNREADABLE = re.compile(r"[\ufffd\u25a0-\u25ff\ue000-\uf8ff]")
+
+
+def _saturate(value: float, target: float) -> float:
+    return min(value / target, 1.0) if target else 0.0
+
+
+def _length_feature(words: int) -> float:
+    """1 for 300-1000 words, falling linearly to 0 at 100 and 2500 words."""
+    if words < 300:
+        return max((words - 100) / 200, 0.0)
+    if words > 1000:
+        return max(1 - (words - 1000) / 1500, 0.0)
+    return 1.0
+
+
+def extract_features(cv_text: str, section_match: SectionMatch) -> np.ndarray:
+    """Computes the FEATURES vector of one CV, each value in 0..1."""
+    lines = [line.strip() for line in cv_text.split("\n") if line.strip()]
+    words = len(cv_text.split())
+    top_lines = lines[:25]
+    body_lines = section_match.lines.get("experience", []) + section_match.lines.get("projects", [])
+    values = {
+        "email": float(bool(_EMAIL.search(cv_text))),
+        # "2019 - 2023" has the shape of a phone number too.
+        "phone": float(bool(_PHONE.search(_YEAR_RANGE.sub("", cv_text)))),
+        "linkedin": float(bool(_LINKEDIN.search(cv_text))),
+        "portfolio": float(bool(_PORTFOLIO.search(cv_text))),
+        "summary_heading": float(any(_SUMMARY_HEADING.match(line) for line in top_lines)),
+        "summary_body": _saturate(max((len(line.split()) for line in top_lines), default=0), 20),
+        "experience_lines": _saturate(len(section_match.lines.get("experience", [])), 8),
+        "date_ranges": _saturate(len(_YEAR_RANGE.findall(cv_text)), 3),
+        "quantified_lines": _saturate(
+            sum(1 for line in body_lines if _NUMBER.search(_YEAR_RANGE.sub("", line))), 4),
+        "education_lines": _saturate(len(section_match.lines.get("education", [])), 2),
+        "degree": float(bool(_DEGREE.search(cv_text))),
+        "institution": float(bool(_INSTITUTION.search(cv_text))),
+        "skills_heading": float(any(_SKILLS_HEADING.match(line) for line in lines)),
+        "skill_keywords": _saturate(section_match.scores.get("skills", 0), 8),
+        "length": _length_feature(words),
+        "headings": _saturate(sum(1 for line in lines if _HEADING.match(line)), 4),
+        "bullets": _saturate(sum(1 for line in lines if _BULLET.match(line)) / max(len(lines), 1), 0.2),
+        "clean_text": max(1 - 20 * len(_UNREADABLE.findall(cv_text)) / len(cv_text), 0.0) if words else 0.0,
+        "action_verbs": _saturate(len({verb.lower() for verb in _ACTION_VERBS.findall(cv_text)}), 10),
+        "keyword_hits": _saturate(sum(section_match.scores.values()), 25),
+        "metrics": _saturate(len(_METRIC.findall(cv_text)), 5),
+    }
+    return np.array([values[name] for name in FEATURE_NAMES], dtype=np.float64)
+
+
+def score_features(features: np.ndarray) -> np.ndarray:
+    """
+    Scores a (CVs x features) matrix, or one feature vector, in a single
+    matrix product. Returns the points per criterion, shaped (CVs x criteria).
+    """
+    return np.atleast_2d(features) @ WEIGHTS.T * MAX_POINTS
+
+
+@dataclass
+class RuleScore:
+    """Deterministic ATS score with its per-criterion breakdown."""
+    score: int
+    criteria: Dict[str, dict] = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {"score": self.score, "criteria": self.criteria}
+
+    def advice(self, limit: int = 5, min_points_lost: float = 0.5) -> List[str]:
+        """Advice for the weakest signals, ordered by the points they cost."""
+        missing = [item for criterion in self.criteria.values() for item in criterion["missing"]
+                   if item["points_lost"] >= min_points_lost]
+        missing.sort(key=lambda item: -item["points_lost"])
+        return [item["advice"] for item in missing[:limit]]
+
+    def summary(self) -> str:
+        """A short deterministic summary naming the strongest and weakest criteria."""
+        ranked = sorted(self.criteria.values(), key=lambda criterion: criterion["points"] / criterion["max_points"])
+        weakest = [criterion for criterion in ranked if criterion["points"] < criterion["max_points"]][:2]
+        strongest = ranked[::-1][:2]
+        text = "Rule-based ATS check. Strongest areas: " + ", ".join(
+            f"{criterion['label']} ({criterion['points']:g}/{criterion['max_points']})" for criterion in strongest
+        ) + "."
+        if weakest:
+            text += " Needs work: " + ", ".join(
+                f"{criterion['label']} ({criterion['points']:g}/{criterion['max_points']})" for criterion in weakest
+            ) + "."
+        return text
+
+
+def _breakdown(features: np.ndarray, points: np.ndarray) -> RuleScore:
+    criteria = {}
+    for index, (key, label, max_points) in enumerate(CRITERIA):
+        criteria[key] = {"label": label, "points": round(float(points[index]), 1), "max_points": max_points, "missing": []}
+    for column, (name, criterion, _, advice) in enumerate(FEATURES):
+        value = float(features[column])
+        if value < 1.0:
+            lost = (1.0 - value) * WEIGHTS[CRITERION_KEYS.index(criterion), column] * MAX_POINTS[CRITERION_KEYS.index(criterion)]
+            criteria[criterion]["missing"].append({"feature": name, "advice": advice, "points_lost": round(float(lost), 1)})
+    return RuleScore(score=int(round(float(points.sum()))), criteria=criteria)
+
+
+class RuleScorer:
+    """
+    Scores CVs against the criteria of the LLM scoring prompt with regexes
+    and section statistics only, in milliseconds and with the same result
+    every time. Used as the instant first score and for "fast" mode.
+    """
+    def __init__(self, section_matcher: Optional[SectionMatcher] = None):
+        self.section_matcher = section_matcher if section_matcher is not None else get_section_matcher()
+
+    def features(self, cv_text: str, section_match: Optional[SectionMatch] = None) -> np.ndarray:
+        return extract_features(cv_text, section_match or self.section_matcher.classify(cv_text))
+
+    def score(self, cv_text: str, section_match: Optional[SectionMatch] = None) -> RuleScore:
+        features = self.features(cv_text, section_match)
+        return _breakdown(features, score_features(features)[0])
+
+    def score_many(self, cv_texts: Sequence[str],
+                   section_matches: Optional[Sequence[SectionMatch]] = None) -> List[RuleScore]:
+        """Scores a batch of CVs with one matrix product over their stacked features."""
+        if not cv_texts:
+            return []
+        section_matches = section_matches or [None] * len(cv_texts)
+        features = np.vstack([self.features(cv_text, match) for cv_text, match in zip(cv_texts, section_matches)])
+        points = score_features(features)
+        return [_breakdown(features[row], points[row]) for row in range(len(cv_texts))]
+
+
+_default_scorer: Optional[RuleScorer] = None
+_default_scorer_lock = threading.Lock()
+
+
+def get_rule_scorer() -> RuleScorer:
+    """Returns the process-wide rule scorer, built on the shared section matcher."""
+    global _default_scorer
+    with _default_scorer_lock:
+        if _default_scorer is None:
+            _default_scorer = RuleScorer()
+        return _default_scorer
@@ -0,0 +1,404 @@
+"""
+Headless batch evaluation of CV folders.
+
+Parses files in a process pool, sends analyses to Ollama with bounded
+concurrency and streams each result to a JSONL or CSV file as soon as it
+completes. Progress is checkpointed so an interrupted run can be resumed.
+
+With --job-description, every file is parsed and indexed first (see
+cv_index) and only the --top-k best matches are analyzed.
+
+Near-duplicate submissions (see near_duplicates) are analyzed once: the
+other CVs of a cluster reuse the representative's analysis, with the
+lines that differ from it.
+
+Usage:
+    python -m src.batch ./cvs --output results.jsonl --concurrency 2
+    python -m src.batch ./cvs --job-description jd.txt --top-k 50
+"""
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .cache import hash_bytes
+from .cv_index import CVIndex
+from .metrics import start_metrics_server
+from .near_duplicates import DEFAULT_THRESHOLD, DuplicateMatch, NearDuplicateDetector, diff_cv_texts
+from .parser import parse_cv_cached
+from .pdf_extraction import PdfExtractionLimits
+from .rag_pipeline import ANALYSIS_MODES, DEFAULT_TIMEOUT_SECONDS, get_llm_generator, warm_up_on_startup
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+# CVs scored together in "fast" mode (see RuleScorer.score_many).
+FAST_BATCH_SIZE = 64
+CSV_FIELDS = ["file", "status", "score", "summary", "recommendations", "error", "parse_seconds", "analysis_seconds",
+              "rank", "match_score", "duplicate_of", "similarity"]
+# Every parse worker is already a process of its own: give each a single
+# extraction process (which still enforces the memory limit) instead of a
+# CPU-count-sized pool per worker.
+WORKER_PDF_LIMITS = PdfExtractionLimits(max_workers=1)
+
+
+def collect_files(inputs: Iterable[str]) -> List[str]:
+    """
+    Expands directories and glob patterns into a sorted list of CV files.
+    """
+    files: Set[str] = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = (str(path) for path in Path(item).rglob("*"))
+        else:
+            candidates = glob.glob(item, recursive=True)
+        for candidate in candidates:
+            if os.path.isfile(candidate) and candidate.lower().endswith(SUPPORTED_EXTENSIONS):
+                files.add(os.path.abspath(candidate))
+    return sorted(files)
+
+
+def _parse_file(file_path: str) -> dict:
+    """
+    Process-pool worker: parses one CV file. Must stay at module level so it
+    can be pickled.
+    """
+    start = time.perf_counter()
+    try:
+        with open(file_path, "rb") as cv_file:
+            cv_text = parse_cv_cached(cv_file.read(), file_path, pdf_limits=WORKER_PDF_LIMITS)
+        error = None
+    except Exception as e:
+        cv_text, error = "", str(e)
+    return {"file": file_path, "cv_text": cv_text, "error": error, "parse_seconds": time.perf_counter() - start}
+
+
+class ResultWriter:
+    """
+    Appends results to a JSONL or CSV file and records finished files in a
+    checkpoint, flushing after every row so progress survives interruption.
+    """
+    def __init__(self, output_path: str, checkpoint_path: str):
+        self.format = "csv" if output_path.lower().endswith(".csv") else "jsonl"
+        self._lock = threading.Lock()
+        is_new = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self._output = open(output_path, "a", encoding="utf-8", newline="")
+        self._checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+        self._csv_writer = None
+        if self.format == "csv":
+            self._csv_writer = csv.DictWriter(self._output, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            if is_new:
+                self._csv_writer.writeheader()
+
+    def write(self, result: dict) -> None:
+        with self._lock:
+            if self._csv_writer is not None:
+                self._csv_writer.writerow(result)
+            else:
+                self._output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._output.flush()
+            self._checkpoint.write(result["file"] + "\n")
+            self._checkpoint.flush()
+
+    def close(self) -> None:
+        self._output.close()
+        self._checkpoint.close()
+
+
+def load_checkpoint(checkpoint_path: str) -> Set[str]:
+    """Returns the files already processed by a previous run."""
+    if not os.path.exists(checkpoint_path):
+        return set()
+    with open(checkpoint_path, encoding="utf-8") as checkpoint:
+        return {line.strip() for line in checkpoint if line.strip()}
+
+
+def shortlist(
+    files: List[str],
+    job_description: str,
+    top_k: int,
+    index: Optional[CVIndex] = None,
+    parse_workers: Optional[int] = None,
+) -> List[Tuple[str, float]]:
+    """
+    Ranks files against a job description and returns the top_k as
+    (file, match score) pairs, best first.
+
+    Files are indexed by content hash, so with a persistent index a file
+    indexed by an earlier run is not parsed again.
+    """
+    index = index if index is not None else CVIndex()
+    files_by_id: Dict[str, str] = {}
+    for path in files:
+        with open(path, "rb") as cv_file:
+            files_by_id.setdefault(hash_bytes(cv_file.read()), path)
+    to_parse = [path for doc_id, path in files_by_id.items() if doc_id not in index]
+    if to_parse:
+        ids_by_file = {path: doc_id for doc_id, path in files_by_id.items()}
+        with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+            for parsed in parse_pool.map(_parse_file, to_parse, chunksize=8):
+                if parsed["cv_text"].strip():
+                    index.add(ids_by_file[parsed["file"]], parsed["cv_text"], {"file": parsed["file"]})
+    print(f"Indexed {len(to_parse)} new CVs; ranking {len(files_by_id)} against the job description.")
+    return [
+        (files_by_id[result.doc_id], round(result.score, 4))
+        for result in index.search(job_description, top_k, doc_ids=files_by_id)
+    ]
+
+
+def run_batch(
+    files: List[str],
+    writer: ResultWriter,
+    parse_workers: Optional[int] = None,
+    concurrency: int = 2,
+    mode: str = "concurrent",
+    timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    use_cache: bool = True,
+    annotations: Optional[Dict[str, dict]] = None,
+    dedup_threshold: Optional[float] = DEFAULT_THRESHOLD,
+) -> Dict[str, int]:
+    """
+    Runs the parse -> analyze pipeline over files and returns status counts.
+
+    Parsing and analysis overlap: a file is handed to the LLM pool as soon
+    as it has been parsed, and the LLM pool never runs more than
+    `concurrency` analyses at once. annotations adds fields (such as the
+    shortlist rank) to the result of each file.
+
+    With dedup_threshold, a CV at least that similar to one already seen
+    is not analyzed; it is written with the analysis of its cluster's
+    representative once that finishes (status "duplicate"). None analyzes
+    every CV.
+
+    In "fast" mode no model is called: parsed CVs are collected and scored
+    FAST_BATCH_SIZE at a time with one matrix product.
+    """
+    counts = {"ok": 0, "duplicate": 0, "parse_failed": 0, "analysis_failed": 0}
+    if not files:
+        return counts
+
+    llm_generator = get_llm_generator()
+    detector = NearDuplicateDetector(dedup_threshold) if dedup_threshold is not None else None
+    # Representatives: their text (for diffs), finished result, and the
+    # duplicates waiting for that result.
+    representative_texts: Dict[str, str] = {}
+    representative_results: Dict[str, dict] = {}
+    failed_representatives: Set[str] = set()
+    waiting: Dict[str, List[Tuple[dict, DuplicateMatch]]] = {}
+
+    def reuse(parsed: dict, match: DuplicateMatch, representative_result: dict) -> dict:
+        result = {key: value for key, value in representative_result.items()
+                  if key not in ("file", "parse_seconds", "analysis_seconds", "rank", "match_score")}
+        result.update(
+            (annotations or {}).get(parsed["file"], {}),
+            file=parsed["file"],
+            status="duplicate",
+            duplicate_of=match.representative,
+            similarity=round(match.similarity, 3),
+            diff=diff_cv_texts(representative_texts[match.representative], parsed["cv_text"]),
+            parse_seconds=round(parsed["parse_seconds"], 3),
+            analysis_seconds=0.0,
+        )
+        return result
+
+    def record(result: dict) -> None:
+        writer.write(result)
+        counts[result["status"]] += 1
+        print(f"[{sum(counts.values())}/{len(files)}] {result['status']}: {result['file']}")
+
+    def new_result(parsed: dict) -> dict:
+        return {
+            "file": parsed["file"],
+            "parse_seconds": round(parsed["parse_seconds"], 3),
+            **(annotations or {}).get(parsed["file"], {}),
+        }
+
+    def analyze(parsed: dict) -> dict:
+        start = time.perf_counter()
+        result = new_result(parsed)
+        try:
+            analysis = llm_generator.generate_cv_analysis(
+                parsed["cv_text"], use_cache=use_cache, mode=mode, timeout=timeout
+            )
+            result.update(status="ok", error=None, **analysis)
+        except Exception as e:
+            result.update(status="analysis_failed", error=str(e))
+        result["analysis_seconds"] = round(time.perf_counter() - start, 3)
+        return result
+
+    def analyze_fast_batch(batch: List[dict]) -> List[dict]:
+        start = time.perf_counter()
+        results = [new_result(parsed) for parsed in batch]
+        try:
+            analyses = llm_generator.fast_analyses([parsed["cv_text"] for parsed in batch])
+            for result, analysis in zip(results, analyses):
+                result.update(status="ok", error=None, **analysis)
+        except Exception as e:
+            for result in results:
+                result.update(status="analysis_failed", error=str(e))
+        seconds = round((time.perf_counter() - start) / len(batch), 3)
+        for result in results:
+            result["analysis_seconds"] = seconds
+        return results
+
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="cv-batch") as llm_pool:
+        parse_futures: Set[Future] = {parse_pool.submit(_parse_file, path) for path in files}
+        analysis_futures: Set[Future] = set()
+        fast_batch: List[dict] = []
+
+        def schedule(parsed: dict) -> None:
+            if mode == "fast":
+                fast_batch.append(parsed)
+            else:
+                analysis_futures.add(llm_pool.submit(analyze, parsed))
+
+        def finish(result: dict) -> None:
+            record(result)
+            duplicates = waiting.pop(result["file"], [])
+            if result["status"] == "ok":
+                representative_results[result["file"]] = result
+                for parsed, match in duplicates:
+                    record(reuse(parsed, match, result))
+            else:
+                # Nothing to reuse; analyze the duplicates on their own.
+                failed_representatives.add(result["file"])
+                for parsed, _ in duplicates:
+                    schedule(parsed)
+
+        while parse_futures or analysis_futures or fast_batch:
+            if fast_batch and (len(fast_batch) >= FAST_BATCH_SIZE or not parse_futures):
+                batch, fast_batch[:] = list(fast_batch), []
+                for result in analyze_fast_batch(batch):
+                    finish(result)
+                continue
+            done, _ = wait(parse_futures | analysis_futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in parse_futures:
+                    parse_futures.discard(future)
+                    parsed = future.result()
+                    if parsed["error"] or not parsed["cv_text"].strip():
+                        writer.write({
+                            **(annotations or {}).get(parsed["file"], {}),
+                            "file": parsed["file"],
+                            "status": "parse_failed",
+                            "error": parsed["error"] or "No text could be extracted.",
+                            "parse_seconds": round(parsed["parse_seconds"], 3),
+                        })
+                        counts["parse_failed"] += 1
+                        continue
+                    match = detector.add(parsed["file"], parsed["cv_text"]) if detector is not None else None
+                    if match is None or not match.is_duplicate:
+                        if match is not None:
+                            representative_texts[parsed["file"]] = parsed["cv_text"]
+                        schedule(parsed)
+                    elif match.representative in representative_results:
+                        record(reuse(parsed, match, representative_results[match.representative]))
+                    elif match.representative in failed_representatives:
+                        schedule(parsed)
+                    else:
+                        waiting.setdefault(match.representative, []).append((parsed, match))
+                else:
+                    analysis_futures.discard(future)
+                    finish(future.result())
+    if waiting:
+        # Every representative has finished, so nothing will ever write these.
+        stranded = sorted(parsed["file"] for duplicates in waiting.values() for parsed, _ in duplicates)
+        raise RuntimeError(f"Near-duplicates were never written: {', '.join(stranded)}")
+    return counts
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="smart-cv-evaluator",
+        description="Evaluate a folder of CVs (PDF/DOCX) and stream results to JSONL or CSV.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of CV files.")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="Output file (.jsonl or .csv).")
+    parser.add_argument("--checkpoint", help="Checkpoint file. Defaults to <output>.checkpoint.")
+    parser.add_argument("--parse-workers", type=int, default=None, help="Processes used for parsing.")
+    parser.add_argument("--concurrency", type=int, default=2, help="Maximum concurrent Ollama analyses.")
+    parser.add_argument("--mode", choices=ANALYSIS_MODES, default="concurrent", help="Analysis mode.")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS, help="Per-call timeout in seconds.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the analysis cache.")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over.")
+    parser.add_argument("--job-description",
+                        help="Job description text, or a file containing it; only the best matches are analyzed.")
+    parser.add_argument("--top-k", type=int, default=50, help="CVs analyzed with --job-description.")
+    parser.add_argument("--index", help="Directory of a persistent CV index to reuse across runs.")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Similarity above which a CV reuses the analysis of a near-duplicate.")
+    parser.add_argument("--no-dedup", action="store_true", help="Analyze every CV, even near-duplicates.")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Serve Prometheus metrics on this port while the batch runs.")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point for the smart-cv-evaluator command."""
+    args = build_arg_parser().parse_args(argv)
+    start_metrics_server(args.metrics_port)
+    # Load the model while the first files are being parsed ("fast" mode never calls it).
+    if args.mode != "fast":
+        warm_up_on_startup()
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+
+    if args.restart:
+        for path in (args.output, checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    files = collect_files(args.inputs)
+    done = load_checkpoint(checkpoint_path)
+    pending = [path for path in files if path not in done]
+    print(f"Found {len(files)} CV files, {len(files) - len(pending)} already processed, {len(pending)} to go.")
+
+    annotations = None
+    if args.job_description and pending:
+        # Rank every file, not only the pending ones, so a resumed run keeps
+        # the shortlist of the interrupted one.
+        job_description = args.job_description
+        if os.path.isfile(job_description):
+            with open(job_description, encoding="utf-8") as jd_file:
+                job_description = jd_file.read()
+        ranked = shortlist(files, job_description, args.top_k,
+                           index=CVIndex(args.index) if args.index else None, parse_workers=args.parse_workers)
+        annotations = {path: {"rank": rank, "match_score": score} for rank, (path, score) in enumerate(ranked, start=1)}
+        pending = [path for path, _ in ranked if path not in done]
+        print(f"Shortlisted the top {len(ranked)} CVs, {len(pending)} of them still to analyze.")
+
+    writer = ResultWriter(args.output, checkpoint_path)
+    start = time.perf_counter()
+    try:
+        counts = run_batch(
+            pending,
+            writer,
+            parse_workers=args.parse_workers,
+            concurrency=args.concurrency,
+            mode=args.mode,
+            timeout=args.timeout,
+            use_cache=not args.no_cache,
+            annotations=annotations,
+            dedup_threshold=None if args.no_dedup else args.dedup_threshold,
+        )
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+
+    processed = sum(counts.values())
+    throughput = processed / elapsed * 60 if elapsed > 0 else 0.0
+    print(
+        f"Processed {processed} CVs in {elapsed:.1f}s ({throughput:.1f} CVs/min): "
+        f"{counts['ok']} ok, {counts['duplicate']} reused from near-duplicates, {counts['parse_failed']} parse failures, "
+        f"{counts['analysis_failed']} analysis failures. Results: {args.output}"
+    )
+    return 0 if counts["parse_failed"] + counts["analysis_failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
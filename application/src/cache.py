@@ -0,0 +1,303 @@
+import copy
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from .metrics import CACHE_EVENTS
+
+
+def hash_bytes(data: bytes) -> str:
+    """Returns the SHA-256 hex digest used to content-address uploaded files."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_cv_text(cv_text: str) -> str:
+    """
+    Normalizes CV text so that cosmetic whitespace differences between
+    two extractions of the same document map to the same cache key.
+    """
+    lines = [re.sub(r'[ \t\r\f\v]+', ' ', line).strip() for line in cv_text.split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+
+def analysis_cache_key(cv_text: str, prompt_version: str, model: str, params: Dict[str, Any]) -> str:
+    """
+    Builds the analysis cache key from the normalized CV text, the prompt
+    template version, the model name and the sampling parameters.
+    """
+    payload = json.dumps(
+        {
+            "cv": normalize_cv_text(cv_text),
+            "prompt_version": prompt_version,
+            "model": model,
+            "params": params,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """
+    Thread-safe in-memory LRU tier with optional TTL expiry.
+
+    Values are copied on the way in and out, so a caller that edits a
+    result (e.g. adds its rule score) does not change what later hits see.
+    """
+    def __init__(self, max_entries: int = 256, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any) -> None:
+        expires_at = time.time() + self.ttl_seconds if self.ttl_seconds else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    Persistent on-disk tier backed by SQLite.
+
+    Entries are stored as JSON and evicted by TTL, then least-recently-used
+    first whenever the entry count or total payload size exceeds its limit.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if self.ttl_seconds is not None and created_at + self.ttl_seconds < now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        """Drops expired entries, then the least recently used ones over the limits."""
+        if self.ttl_seconds is not None:
+            cursor = self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+            self.evictions += max(cursor.rowcount, 0)
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed_at ASC"
+        ).fetchall()
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+        self.evictions += len(stale)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+class TieredCache:
+    """
+    Two-level cache: an in-memory LRU in front of an optional persistent tier.
+
+    Disk hits are promoted into memory so repeated lookups stay in-process.
+    Values must be JSON-serializable.
+    """
+    def __init__(self, name: str, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.name = name
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+
+    def _count(self, *names: str) -> None:
+        with self._lock:
+            for name in names:
+                self._counters[name] += 1
+        for name in names:
+            CACHE_EVENTS.inc(cache=self.name, event=name)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("hits", "memory_hits")
+            return value
+
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._count("hits", "disk_hits")
+                return value
+
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._count("sets")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+        return value
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and tier sizes."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        stats["evictions"] = self.memory.evictions
+        if self.disk is not None:
+            stats["disk_entries"] = len(self.disk)
+            stats["evictions"] += self.disk.evictions
+        return stats
+
+
+# --- SHARED CACHES ---
+
+CACHE_DIR = os.getenv("SMART_CV_CACHE_DIR", os.path.join(Path.home(), ".cache", "smart-cv-evaluator"))
+CACHE_TTL_SECONDS = float(os.getenv("SMART_CV_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+CACHE_DISK_ENABLED = os.getenv("SMART_CV_CACHE_DISK", "1") not in ("0", "false", "False")
+
+_caches: Dict[str, TieredCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(name: str, memory_entries: int, disk_entries: int, disk_bytes: int) -> TieredCache:
+    with _caches_lock:
+        cache = _caches.get(name)
+        if cache is None:
+            disk = None
+            if CACHE_DISK_ENABLED:
+                disk = SQLiteCache(
+                    os.path.join(CACHE_DIR, f"{name}.sqlite3"),
+                    max_entries=disk_entries,
+                    max_bytes=disk_bytes,
+                    ttl_seconds=CACHE_TTL_SECONDS,
+                )
+            memory = MemoryCache(max_entries=memory_entries, ttl_seconds=CACHE_TTL_SECONDS)
+            cache = TieredCache(name, memory, disk)
+            _caches[name] = cache
+        return cache
+
+
+def get_parse_cache() -> TieredCache:
+    """Process-wide cache of extracted CV text, keyed by file content hash."""
+    return _get_cache("parse", memory_entries=512, disk_entries=20000, disk_bytes=512 * 1024 * 1024)
+
+
+def get_analysis_cache() -> TieredCache:
+    """Process-wide cache of LLM analysis results."""
+    return _get_cache("analysis", memory_entries=256, disk_entries=10000, disk_bytes=128 * 1024 * 1024)
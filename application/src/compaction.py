@@ -0,0 +1,223 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+# Headings that start a new CV section. Matched against short lines only.
+SECTION_HEADINGS = {
+    "summary": ["summary", "profile", "objective", "about me", "professional summary"],
+    "experience": ["experience", "work experience", "employment", "work history", "professional experience", "internships"],
+    "education": ["education", "academic", "qualifications"],
+    "skills": ["skills", "technical skills", "competencies", "technologies", "tools"],
+    "projects": ["projects", "portfolio", "selected projects"],
+    "certifications": ["certifications", "certificates", "licenses", "courses", "training"],
+    "achievements": ["achievements", "awards", "honors", "publications"],
+    "languages": ["languages"],
+}
+
+# Relative share of the budget a section may claim when the CV is too long.
+# Experience carries most of the ATS score, so it gets the largest weight.
+SECTION_WEIGHTS = {
+    "header": 0.6,
+    "summary": 0.8,
+    "experience": 2.0,
+    "education": 1.0,
+    "skills": 1.2,
+    "projects": 1.2,
+    "certifications": 0.6,
+    "achievements": 0.8,
+    "languages": 0.3,
+    "other": 0.5,
+}
+
+_PAGE_NOISE = re.compile(
+    r"^(?:page\s*\d+(?:\s*(?:of|/)\s*\d+)?|-?\s*\d{1,3}\s*-?|\d+\s*/\s*\d+)$", re.IGNORECASE
+)
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_OMITTED_MARKER = "[...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate close to what BPE tokenizers produce for English:
+    one token per punctuation mark and roughly one per four word characters.
+    """
+    return sum(max(1, math.ceil(len(piece) / 4)) for piece in _TOKEN_PATTERN.findall(text))
+
+
+@dataclass
+class CompactionResult:
+    """Compacted CV text with token accounting."""
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    section_tokens: Dict[str, int] = field(default_factory=dict)
+    truncated_sections: List[str] = field(default_factory=list)
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+    def stats(self) -> dict:
+        return {
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "tokens_saved": self.tokens_saved,
+            "truncated_sections": list(self.truncated_sections),
+        }
+
+
+def normalize_lines(cv_text: str) -> List[str]:
+    """
+    Normalizes unicode and whitespace and drops empty lines and page
+    numbers left behind by PDF extraction.
+    """
+    text = unicodedata.normalize("NFKC", cv_text)
+    text = text.replace("\u00ad", "")
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"\s+", " ", line).strip()
+        if line and not _PAGE_NOISE.match(line):
+            lines.append(line)
+    return lines
+
+
+def remove_repeated_lines(lines: List[str]) -> List[str]:
+    """
+    Drops every repeat of a line after its first occurrence. This removes
+    running headers/footers (name, contact line, "Curriculum Vitae") that
+    pypdf emits once per page, as well as duplicated bullets.
+    """
+    counts = Counter(line.lower() for line in lines)
+    seen = set()
+    kept = []
+    for line in lines:
+        key = line.lower()
+        if counts[key] > 1:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return kept
+
+
+def _section_for_heading(line: str) -> str:
+    lowered = line.lower().rstrip(":").strip()
+    if len(lowered) > 40 or len(lowered.split()) > 4:
+        return ""
+    for section, keywords in SECTION_HEADINGS.items():
+        if any(re.match(rf"{re.escape(keyword)}\b", lowered) for keyword in keywords):
+            return section
+    return ""
+
+
+def split_sections(lines: List[str]) -> List[Tuple[str, List[str]]]:
+    """
+    Splits lines into (section name, lines) blocks in document order. Text
+    before the first heading is the "header" (name and contact details).
+    """
+    blocks: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in lines:
+        section = _section_for_heading(line)
+        if section:
+            blocks.append((section, [line]))
+        else:
+            blocks[-1][1].append(line)
+    return [(name, block) for name, block in blocks if block]
+
+
+def _allocate(sizes: List[int], weights: List[float], budget: int) -> List[int]:
+    """
+    Weighted water-filling: sections smaller than their share keep all of
+    their tokens and the remainder is redistributed among the larger ones.
+    """
+    allocation = [0] * len(sizes)
+    open_sections = set(range(len(sizes)))
+    remaining = budget
+    while open_sections and remaining > 0:
+        total_weight = sum(weights[i] for i in open_sections)
+        shares = {i: remaining * weights[i] / total_weight for i in open_sections}
+        satisfied = {i for i in open_sections if sizes[i] - allocation[i] <= shares[i]}
+        if not satisfied:
+            for i in open_sections:
+                allocation[i] += int(shares[i])
+            break
+        for i in satisfied:
+            remaining -= sizes[i] - allocation[i]
+            allocation[i] = sizes[i]
+        open_sections -= satisfied
+    return allocation
+
+
+def _truncate_block(lines: List[str], budget: int) -> List[str]:
+    """Keeps whole lines in order until the budget runs out, then trims the last one by words."""
+    kept: List[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line)
+        if used + cost <= budget:
+            kept.append(line)
+            used += cost
+            continue
+        words = []
+        for word in line.split(" "):
+            cost = estimate_tokens(word)
+            if used + cost > budget:
+                break
+            words.append(word)
+            used += cost
+        if words:
+            kept.append(" ".join(words))
+        kept.append(_OMITTED_MARKER)
+        break
+    return kept
+
+
+def compact_cv_text(cv_text: str, token_budget: int) -> CompactionResult:
+    """
+    Prepares CV text for prompting within a token budget.
+
+    Whitespace is normalized, page noise and repeated header/footer lines are
+    removed, and if the CV is still too long the budget is split across the
+    detected sections so that every section stays represented instead of
+    losing everything after a fixed character offset.
+
+    Args:
+        cv_text: The extracted CV text.
+        token_budget: The maximum number of tokens the CV may use in the prompt.
+
+    Returns:
+        A CompactionResult with the compacted text and token counts.
+    """
+    original_tokens = estimate_tokens(cv_text)
+    lines = remove_repeated_lines(normalize_lines(cv_text))
+    blocks = split_sections(lines)
+
+    sizes = [sum(estimate_tokens(line) for line in block) for _, block in blocks]
+    truncated_sections: List[str] = []
+    if sum(sizes) > token_budget:
+        # Reserve room for the omission markers added to truncated sections.
+        weights = [SECTION_WEIGHTS.get(name, SECTION_WEIGHTS["other"]) for name, _ in blocks]
+        reserved = estimate_tokens(_OMITTED_MARKER) * len(blocks)
+        allocation = _allocate(sizes, weights, max(token_budget - reserved, 0))
+        compacted_blocks = []
+        for (name, block), size, budget in zip(blocks, sizes, allocation):
+            if budget < size:
+                block = _truncate_block(block, budget)
+                truncated_sections.append(name)
+            compacted_blocks.append((name, block))
+        blocks = compacted_blocks
+
+    text = "\n".join(line for _, block in blocks for line in block)
+    section_tokens: Dict[str, int] = {}
+    for name, block in blocks:
+        section_tokens[name] = section_tokens.get(name, 0) + sum(estimate_tokens(line) for line in block)
+    return CompactionResult(
+        text=text,
+        original_tokens=original_tokens,
+        compacted_tokens=estimate_tokens(text),
+        section_tokens=section_tokens,
+        truncated_sections=truncated_sections,
+    )
@@ -0,0 +1,415 @@
+"""
+Ranking of parsed CVs against a job description.
+
+CVs are indexed as BM25 term-frequency vectors over a hashed vocabulary,
+stored as two flat arrays (term ids and frequencies, one run per CV) that
+are appended to on disk and read back as memory-mapped arrays. A query
+scores every posting of its terms with a few vectorized NumPy operations,
+so the top-k of thousands of CVs comes back in milliseconds and only that
+shortlist needs an LLM analysis.
+
+With an embedder (see ollama_embedder), each CV also gets a dense vector
+and the ranking blends the BM25 score with cosine similarity.
+"""
+import json
+import os
+import re
+import threading
+import zlib
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache import CACHE_DIR, normalize_cv_text
+from .llm_client import get_http_session, ollama_base_url
+
+# Size of the hashed vocabulary. Collisions only merge rare terms.
+HASH_BUCKETS = 1 << 22
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Weight of the embedding similarity in the blended score (0..1).
+DEFAULT_EMBEDDING_WEIGHT = float(os.getenv("SMART_CV_EMBEDDING_WEIGHT", 0.5))
+# Removed CVs leave dead postings behind; compact once they exceed this share.
+COMPACT_DEAD_RATIO = 0.25
+# CVs kept by the index of API uploads; the oldest are removed beyond this.
+DEFAULT_MAX_DOCS = int(os.getenv("SMART_CV_INDEX_MAX_DOCS", 100000))
+
+# Keeps technology names such as "c++", "c#" and "node.js" as one term.
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it of on or our the this to we will with you your "
+    "who able work working experience strong years year team".split()
+)
+
+Embedder = Callable[[List[str]], np.ndarray]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of a CV or job description, without stopwords."""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def term_ids(tokens: Sequence[str]) -> np.ndarray:
+    """Maps terms to hashed vocabulary ids. CRC32 is stable across processes, unlike hash()."""
+    return np.fromiter(
+        (zlib.crc32(token.encode("utf-8")) % HASH_BUCKETS for token in tokens), dtype=np.int32, count=len(tokens)
+    )
+
+
+def vectorize(text: str) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Returns the sorted term ids, their frequencies and the length in terms of a text."""
+    tokens = tokenize(text)
+    ids, counts = np.unique(term_ids(tokens), return_counts=True)
+    return ids.astype(np.int32), counts.astype(np.float32), len(tokens)
+
+
+@dataclass
+class SearchResult:
+    """One ranked CV: its id, blended score, BM25 score and stored metadata."""
+    doc_id: str
+    score: float
+    bm25: float
+    metadata: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {"id": self.doc_id, "score": round(self.score, 4), "bm25": round(self.bm25, 4), "metadata": self.metadata}
+
+
+class CVIndex:
+    """
+    Incremental BM25 index of CV texts, optionally persisted to a directory.
+
+    Each added CV becomes a row: its postings are appended to terms.i32 and
+    tfs.f32 and the row is recorded in docs.jsonl, so adding a CV writes
+    only that CV. Removing one records a tombstone; compact() rewrites the
+    files without dead rows. Files are memory-mapped when the index is
+    opened, so a large index is not read into memory up front.
+    """
+    def __init__(self, path: Optional[str] = None, embedder: Optional[Embedder] = None,
+                 embedding_weight: float = DEFAULT_EMBEDDING_WEIGHT, max_docs: Optional[int] = None):
+        """
+        Args:
+            path: Directory to persist the index in. None keeps it in memory.
+            embedder: Optional function mapping texts to dense vectors.
+            embedding_weight: Weight of the embedding similarity when an
+                embedder is set; the BM25 score gets the rest.
+            max_docs: Most CVs kept; adding one beyond it removes the CV
+                that was added (or replaced) longest ago. None is unbounded.
+        """
+        self.path = path
+        self.embedder = embedder
+        self.embedding_weight = embedding_weight
+        self.max_docs = max_docs
+        self._lock = threading.RLock()
+        self._ids: List[Optional[str]] = []
+        self._metadata: List[dict] = []
+        self._offsets: List[int] = []
+        self._lengths: List[int] = []
+        self._doc_lens: List[float] = []
+        self._rows: Dict[str, int] = {}
+        self._nnz = 0
+        self._dead_nnz = 0
+        self._dim: Optional[int] = None
+        # Postings added since the arrays were last materialized (in-memory index).
+        self._pending: List[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]] = []
+        self._terms = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.float32)
+        self._embeddings: Optional[np.ndarray] = None
+        self._row_of_posting: Optional[np.ndarray] = None
+        self._stale = False
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._rows
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # --- persistence ---
+
+    def _load(self) -> None:
+        log_path = self._file("docs.jsonl")
+        if os.path.exists(log_path):
+            complete = 0
+            with open(log_path, "rb") as log:
+                for line in log:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("unterminated line")
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn last line from an interrupted write.
+                        break
+                    complete += len(line)
+                    if entry["op"] == "add":
+                        self._dim = entry.get("dim", self._dim)
+                        self._append_row(entry["id"], entry["offset"], entry["length"], entry["doc_len"], entry.get("metadata", {}))
+                    elif entry["op"] == "remove":
+                        self._drop_row(entry["id"])
+            if complete < os.path.getsize(log_path):
+                # Cut the torn line off, or the next entry would be appended to it.
+                os.truncate(log_path, complete)
+        self._stale = True
+
+    def _append_row(self, doc_id: str, offset: int, length: int, doc_len: float, metadata: dict) -> None:
+        if doc_id in self._rows:
+            self._drop_row(doc_id)
+        self._rows[doc_id] = len(self._ids)
+        self._ids.append(doc_id)
+        self._metadata.append(metadata)
+        self._offsets.append(offset)
+        self._lengths.append(length)
+        self._doc_lens.append(doc_len)
+        self._nnz = offset + length
+
+    def _drop_row(self, doc_id: str) -> bool:
+        row = self._rows.pop(doc_id, None)
+        if row is None:
+            return False
+        self._ids[row] = None
+        self._dead_nnz += self._lengths[row]
+        return True
+
+    def _log(self, entry: dict) -> None:
+        with open(self._file("docs.jsonl"), "a", encoding="utf-8") as log:
+            log.write(json.dumps(entry) + "\n")
+
+    def _map(self, name: str, dtype, count: int) -> np.ndarray:
+        # np.memmap refuses empty files, and the file may hold postings
+        # written after the last logged row; map only the logged part.
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode="r", shape=(count,))
+
+    def _materialize(self) -> None:
+        """Makes self._terms / _tfs / _embeddings cover every row. Called with the lock held."""
+        if not self._stale and not self._pending:
+            return
+        if self.path is not None:
+            self._terms = self._map("terms.i32", np.int32, self._nnz)
+            self._tfs = self._map("tfs.f32", np.float32, self._nnz)
+            if self._dim:
+                self._embeddings = self._map("embeddings.f32", np.float32, len(self._ids) * self._dim).reshape(-1, self._dim)
+        else:
+            self._terms = np.concatenate([self._terms] + [terms for terms, _, _ in self._pending])
+            self._tfs = np.concatenate([self._tfs] + [tfs for _, tfs, _ in self._pending])
+            vectors = [vector for _, _, vector in self._pending if vector is not None]
+            if vectors:
+                base = [self._embeddings] if self._embeddings is not None else []
+                self._embeddings = np.vstack(base + [vector[None, :] for vector in vectors])
+        self._pending = []
+        self._row_of_posting = np.repeat(np.arange(len(self._ids), dtype=np.int32), self._lengths)
+        self._stale = False
+
+    # --- updates ---
+
+    def add(self, doc_id: str, cv_text: str, metadata: Optional[dict] = None) -> None:
+        """Indexes a CV under doc_id, replacing any CV already stored under it."""
+        ids, tfs, doc_len = vectorize(normalize_cv_text(cv_text))
+        vector = None
+        if self.embedder is not None:
+            vector = self._normalized(self.embedder([cv_text]))[0]
+        with self._lock:
+            if vector is not None:
+                if self._dim is None:
+                    self._dim = len(vector)
+                elif len(vector) != self._dim:
+                    raise ValueError(f"Embedding has {len(vector)} dimensions, the index stores {self._dim}.")
+            offset = self._nnz
+            if self.path is not None:
+                with open(self._file("terms.i32"), "ab") as terms_file:
+                    terms_file.truncate(offset * 4)
+                    terms_file.write(ids.tobytes())
+                with open(self._file("tfs.f32"), "ab") as tfs_file:
+                    tfs_file.truncate(offset * 4)
+                    tfs_file.write(tfs.tobytes())
+                if vector is not None:
+                    with open(self._file("embeddings.f32"), "ab") as embeddings_file:
+                        embeddings_file.truncate(len(self._ids) * self._dim * 4)
+                        embeddings_file.write(vector.astype(np.float32).tobytes())
+                # The row only exists once it is logged, after its postings are on disk.
+                self._log({"op": "add", "id": doc_id, "offset": offset, "length": len(ids), "doc_len": doc_len,
+                           "dim": self._dim, "metadata": metadata or {}})
+                self._stale = True
+            else:
+                self._pending.append((ids, tfs, vector))
+            self._append_row(doc_id, offset, len(ids), doc_len, metadata or {})
+            # Live rows are in insertion order, so the first is the oldest.
+            while self.max_docs is not None and len(self._rows) > self.max_docs:
+                self.remove(next(iter(self._rows)))
+
+    def remove(self, doc_id: str) -> bool:
+        """Removes a CV. Returns False if it was not indexed."""
+        with self._lock:
+            if not self._drop_row(doc_id):
+                return False
+            if self.path is not None:
+                self._log({"op": "remove", "id": doc_id})
+            if self._dead_nnz > COMPACT_DEAD_RATIO * max(self._nnz, 1):
+                self.compact()
+            return True
+
+    def compact(self) -> None:
+        """Rewrites the index without removed CVs."""
+        with self._lock:
+            self._materialize()
+            live = [row for row, doc_id in enumerate(self._ids) if doc_id is not None]
+            keep = np.zeros(len(self._ids), dtype=bool)
+            keep[live] = True
+            posting_mask = keep[self._row_of_posting]
+            terms, tfs = np.array(self._terms[posting_mask]), np.array(self._tfs[posting_mask])
+            embeddings = np.array(self._embeddings[live]) if self._embeddings is not None else None
+            ids = [self._ids[row] for row in live]
+            metadata = [self._metadata[row] for row in live]
+            lengths = [self._lengths[row] for row in live]
+            doc_lens = [self._doc_lens[row] for row in live]
+
+            self._ids, self._metadata, self._offsets, self._lengths, self._doc_lens = [], [], [], [], []
+            self._rows, self._nnz, self._dead_nnz = {}, 0, 0
+            offset = 0
+            for doc_id, meta, length, doc_len in zip(ids, metadata, lengths, doc_lens):
+                self._append_row(doc_id, offset, length, doc_len, meta)
+                offset += length
+
+            if self.path is not None:
+                # Write the new files next to the old ones and swap them in,
+                # so a crash leaves either the old or the new index.
+                files = {"terms.i32": terms, "tfs.f32": tfs}
+                if embeddings is not None:
+                    files["embeddings.f32"] = embeddings.astype(np.float32)
+                for name, array in files.items():
+                    array.tofile(self._file(name + ".tmp"))
+                with open(self._file("docs.jsonl.tmp"), "w", encoding="utf-8") as log:
+                    for row, doc_id in enumerate(self._ids):
+                        log.write(json.dumps({"op": "add", "id": doc_id, "offset": self._offsets[row],
+                                              "length": self._lengths[row], "doc_len": self._doc_lens[row],
+                                              "dim": self._dim, "metadata": self._metadata[row]}) + "\n")
+                # Release the memory maps before replacing the files they map.
+                self._terms = self._tfs = self._embeddings = None
+                for name in list(files) + ["docs.jsonl"]:
+                    os.replace(self._file(name + ".tmp"), self._file(name))
+                self._stale = True
+            else:
+                self._terms, self._tfs, self._embeddings = terms, tfs, embeddings
+                self._row_of_posting = np.repeat(np.arange(len(self._ids), dtype=np.int32), self._lengths)
+
+    # --- queries ---
+
+    @staticmethod
+    def _normalized(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        """BM25 score of every row for the query; removed rows score -inf."""
+        query_ids = np.unique(term_ids(tokenize(query)))
+        with self._lock:
+            self._materialize()
+            rows = len(self._ids)
+            alive = np.fromiter((doc_id is not None for doc_id in self._ids), dtype=bool, count=rows)
+            doc_lens = np.asarray(self._doc_lens, dtype=np.float32)
+            scores = np.zeros(rows, dtype=np.float32)
+            if rows and len(query_ids) and alive.any():
+                # Only postings of query terms in live rows contribute.
+                hits = np.flatnonzero(np.isin(self._terms, query_ids))
+                hit_rows = self._row_of_posting[hits]
+                live_hits = alive[hit_rows]
+                hits, hit_rows = hits[live_hits], hit_rows[live_hits]
+                term_slot = np.searchsorted(query_ids, self._terms[hits])
+                documents = int(alive.sum())
+                df = np.bincount(term_slot, minlength=len(query_ids))
+                idf = np.log1p((documents - df + 0.5) / (df + 0.5)).astype(np.float32)
+                tf = self._tfs[hits]
+                avg_len = float(doc_lens[alive].mean()) or 1.0
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lens[hit_rows] / avg_len)
+                contributions = idf[term_slot] * tf * (BM25_K1 + 1) / (tf + norm)
+                scores = np.bincount(hit_rows, weights=contributions, minlength=rows).astype(np.float32)
+            scores[~alive] = -np.inf
+            return scores
+
+    def search(self, query: str, k: int = 10, doc_ids: Optional[Iterable[str]] = None) -> List[SearchResult]:
+        """
+        Returns the k CVs that best match a job description, best first.
+
+        The BM25 scores are normalized by the best one; with an embedder
+        they are blended with the cosine similarity of the embeddings.
+
+        Args:
+            query: The job description.
+            k: Number of CVs to return.
+            doc_ids: Only rank these CVs (e.g. one intake batch); term
+                statistics still come from the whole index.
+        """
+        query_vector = self._normalized(self.embedder([query]))[0] if self.embedder is not None else None
+        with self._lock:
+            bm25 = self.bm25_scores(query)
+            live = np.isfinite(bm25)
+            if doc_ids is not None:
+                candidates = np.zeros(len(bm25), dtype=bool)
+                candidates[[self._rows[doc_id] for doc_id in doc_ids if doc_id in self._rows]] = True
+                live &= candidates
+            if not live.any():
+                return []
+            best = float(bm25[live].max())
+            scores = np.where(live, bm25 / best if best > 0 else 0.0, -np.inf)
+            if query_vector is not None and self._embeddings is not None and len(self._embeddings) == len(bm25):
+                similarity = np.asarray(self._embeddings) @ query_vector
+                scores = np.where(live, (1 - self.embedding_weight) * scores + self.embedding_weight * similarity, -np.inf)
+            k = min(k, int(live.sum()))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [SearchResult(self._ids[row], float(scores[row]), float(bm25[row]), self._metadata[row]) for row in top]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"documents": len(self._rows), "postings": self._nnz, "dead_postings": self._dead_nnz,
+                    "embedding_dim": self._dim, "path": self.path}
+
+
+def ollama_embedder(model: str, base_url: Optional[str] = None, timeout: float = 60.0) -> Embedder:
+    """
+    Returns an embedder backed by a local Ollama embedding model
+    (e.g. "nomic-embed-text"), through the shared HTTP session.
+    """
+    url = f"{(base_url or ollama_base_url()).rstrip('/')}/api/embed"
+
+    def embed(texts: List[str]) -> np.ndarray:
+        response = get_http_session().post(url, json={"model": model, "input": texts}, timeout=timeout)
+        response.raise_for_status()
+        return np.asarray(response.json()["embeddings"], dtype=np.float32)
+
+    return embed
+
+
+def index_from_env(path: Optional[str] = None) -> CVIndex:
+    """
+    Opens the index at `path` (default SMART_CV_INDEX_DIR, or "index" in the
+    cache directory), with an Ollama embedder when SMART_CV_EMBEDDING_MODEL
+    is set, keeping at most SMART_CV_INDEX_MAX_DOCS CVs.
+    """
+    embedding_model = os.getenv("SMART_CV_EMBEDDING_MODEL")
+    return CVIndex(
+        path or os.getenv("SMART_CV_INDEX_DIR") or os.path.join(CACHE_DIR, "index"),
+        embedder=ollama_embedder(embedding_model) if embedding_model else None,
+        max_docs=DEFAULT_MAX_DOCS,
+    )
+
+
+_shared_index: Optional[CVIndex] = None
+_shared_index_lock = threading.Lock()
+
+
+def get_cv_index() -> CVIndex:
+    """Returns the process-wide persistent CV index."""
+    global _shared_index
+    with _shared_index_lock:
+        if _shared_index is None:
+            _shared_index = index_from_env()
+        return _shared_index
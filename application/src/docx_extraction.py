@@ -0,0 +1,169 @@
+import io
+import os
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator, List, Optional, Union
+
+# Stop once this much text has been gathered; the analysis never uses more.
+DEFAULT_MAX_CHARS = 20000
+
+DOCUMENT_PART = "word/document.xml"
+_HEADER_PART = re.compile(r"word/header(\d*)\.xml$")
+_FOOTER_PART = re.compile(r"word/footer(\d*)\.xml$")
+
+
+@dataclass
+class DocxExtraction:
+    """
+    Text of a DOCX document plus what the extraction covered.
+
+    Attributes:
+        text: Headers, body and footers in reading order, one line per
+            paragraph or per table row of one-line cells.
+        parts: The XML parts that were read.
+        truncated: True if extraction stopped at max_chars.
+        error: The XML error that ended extraction early, if any.
+    """
+    text: str
+    parts: List[str] = field(default_factory=list)
+    truncated: bool = False
+    error: Optional[str] = None
+
+
+def _local(tag: str) -> str:
+    # Matches both the transitional and the strict OOXML namespaces.
+    return tag.rsplit("}", 1)[-1]
+
+
+def _iter_part_lines(stream: BinaryIO) -> Iterator[str]:
+    """
+    Streams the lines of one WordprocessingML part (document, header or
+    footer) with iterparse, dropping each element once it has been read so
+    memory stays bounded by the deepest open element, not the part size.
+
+    Paragraphs inside text boxes become lines of their own. Table rows of
+    one-line cells become one line with the cells joined by " | "; rows
+    with longer cells, as in two-column CV layouts, are read cell by cell.
+    The compatibility fallback copy of a drawing (mc:Fallback) is skipped
+    so text boxes are not read twice.
+    """
+    # Finished lines go to the innermost open table cell, or out.
+    sinks: List[List[str]] = [[]]
+    rows: List[List[str]] = []
+    paragraphs: List[List[str]] = []
+    elements: list = []
+    skip_depth = 0
+
+    for event, element in ET.iterparse(stream, events=("start", "end")):
+        name = _local(element.tag)
+        if event == "start":
+            elements.append(element)
+            if skip_depth or name == "Fallback":
+                skip_depth += 1
+            elif name == "p":
+                paragraphs.append([])
+            elif name == "tr":
+                rows.append([])
+            elif name == "tc":
+                sinks.append([])
+            continue
+
+        elements.pop()
+        if skip_depth:
+            skip_depth -= 1
+        elif name == "t" and paragraphs:
+            paragraphs[-1].append(element.text or "")
+        elif name == "tab" and paragraphs:
+            paragraphs[-1].append("\t")
+        elif name in ("br", "cr") and paragraphs:
+            paragraphs[-1].append("\n")
+        elif name == "noBreakHyphen" and paragraphs:
+            paragraphs[-1].append("-")
+        elif name == "p" and paragraphs:
+            line = "".join(paragraphs.pop()).strip()
+            if line:
+                sinks[-1].append(line)
+        elif name == "tc" and len(sinks) > 1:
+            cell = sinks.pop()
+            if rows:
+                rows[-1].append(cell)
+        elif name == "tr" and rows:
+            cells = [cell for cell in rows.pop() if cell]
+            if all(len(cell) == 1 for cell in cells):
+                # A data row ("Python | 5 years") reads as one line.
+                if cells:
+                    sinks[-1].append(" | ".join(cell[0] for cell in cells))
+            else:
+                # A layout row (sidebar and main column) reads cell by cell.
+                for cell in cells:
+                    sinks[-1].extend(cell)
+
+        # Free what has been read; top-level blocks are detached entirely.
+        element.clear()
+        if elements and len(elements) <= 2:
+            elements[-1].remove(element)
+        if len(sinks) == 1 and sinks[0]:
+            yield from sinks[0]
+            sinks[0].clear()
+
+
+def _part_sort_key(name: str, pattern: "re.Pattern") -> int:
+    number = pattern.match(name).group(1)
+    return int(number) if number else 0
+
+
+def extract_docx(source: Union[str, os.PathLike, bytes, BinaryIO], max_chars: Optional[int] = DEFAULT_MAX_CHARS) -> DocxExtraction:
+    """
+    Extracts the text of a DOCX file, bytes or binary stream by streaming
+    its XML parts out of the zip, without building a document model.
+
+    Headers come first (contact details often live there), then the body,
+    then footers. Lines repeated across header or footer variants (first
+    page, even pages) are kept once.
+
+    Raises:
+        zipfile.BadZipFile: If the source is not a zip archive.
+        KeyError: If the archive has no word/document.xml.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    lines: List[str] = []
+    seen_margins = set()
+    chars = 0
+    result = DocxExtraction(text="")
+
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        if DOCUMENT_PART not in names:
+            raise KeyError(f"There is no item named '{DOCUMENT_PART}' in the archive")
+        headers = sorted((name for name in names if _HEADER_PART.match(name)),
+                         key=lambda name: _part_sort_key(name, _HEADER_PART))
+        footers = sorted((name for name in names if _FOOTER_PART.match(name)),
+                         key=lambda name: _part_sort_key(name, _FOOTER_PART))
+
+        for part in headers + [DOCUMENT_PART] + footers:
+            is_margin = part != DOCUMENT_PART
+            result.parts.append(part)
+            try:
+                with archive.open(part) as stream:
+                    for line in _iter_part_lines(stream):
+                        if is_margin:
+                            if line in seen_margins:
+                                continue
+                            seen_margins.add(line)
+                        lines.append(line)
+                        chars += len(line) + 1
+                        if max_chars is not None and chars >= max_chars:
+                            result.truncated = True
+                            break
+            except ET.ParseError as e:
+                # Keep what was read before the damage.
+                result.error = f"{part}: {e}"
+            if result.truncated or (result.error and part == DOCUMENT_PART):
+                break
+
+    text = "\n".join(lines)
+    result.text = text[:max_chars] if max_chars is not None else text
+    return result
@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Union
+from uuid import UUID
+import requests
+from requests.adapters import HTTPAdapter
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_community.chat_models import ChatOllama
+from langchain_community.llms.ollama import OllamaEndpointNotFoundError
+from .metrics import RequestTrace
+
+DEFAULT_OLLAMA_PORT = "11434"
+# Ollama unloads idle models after 5 minutes by default; keeping the model
+# resident longer avoids paying the load time again after short idle periods.
+DEFAULT_KEEP_ALIVE = "30m"
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_http_session(pool_size: int = 16) -> requests.Session:
+    """
+    Returns the process-wide HTTP session used to talk to Ollama.
+
+    Keeping one session means keep-alive connections are reused across
+    requests and Streamlit sessions instead of opening a new TCP connection
+    for every model call.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def ollama_base_url() -> str:
+    """
+    Returns the Ollama server URL from OLLAMA_HOST / OLLAMA_PORT.
+
+    OLLAMA_HOST may be a bare host ("localhost"), a host:port pair, or a full
+    URL ("http://ollama:11434"); the default is http://localhost:11434.
+    """
+    return normalize_ollama_url(os.getenv("OLLAMA_HOST", "localhost"))
+
+
+def normalize_ollama_url(host: str) -> str:
+    """Turns a bare host, host:port pair or URL into an Ollama server URL, as for OLLAMA_HOST."""
+    host = host.strip() or "localhost"
+    if "://" in host:
+        return host.rstrip("/")
+    if host.startswith("0.0.0.0"):
+        # The server's bind address; clients connect through loopback.
+        host = "localhost" + host[len("0.0.0.0"):]
+    if ":" not in host:
+        host = f"{host}:{os.getenv('OLLAMA_PORT', DEFAULT_OLLAMA_PORT)}"
+    return f"http://{host}"
+
+
+def ollama_keep_alive() -> Union[int, str]:
+    """
+    Returns how long Ollama keeps the model loaded after a request, from
+    SMART_CV_KEEP_ALIVE (default DEFAULT_KEEP_ALIVE).
+
+    Accepts Ollama's duration strings ("10m", "1h") or a number of seconds;
+    a negative number keeps the model loaded indefinitely and 0 unloads it
+    after every request.
+    """
+    value = os.getenv("SMART_CV_KEEP_ALIVE", DEFAULT_KEEP_ALIVE).strip() or DEFAULT_KEEP_ALIVE
+    try:
+        # Ollama parses strings as Go durations, so bare numbers must be sent as numbers.
+        return int(value)
+    except ValueError:
+        return value
+
+
+class PooledChatOllama(ChatOllama):
+    """
+    ChatOllama that sends its requests through the shared pooled session.
+
+    The stock implementation calls requests.post directly, which creates and
+    tears down a connection per call. Only the transport is changed here; the
+    payload is built exactly as in langchain_community's _create_stream.
+
+    With a router (see ollama_router.OllamaRouter), each request is sent to
+    the endpoint the router picks instead of base_url.
+    """
+
+    router: Optional[Any] = None
+
+    def _create_stream(
+        self,
+        api_url: str,
+        payload: Any,
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        if self.stop is not None and stop is not None:
+            raise ValueError("`stop` found in both the input and default params.")
+        elif self.stop is not None:
+            stop = self.stop
+
+        params: Dict[str, Any] = self._default_params
+        for key in self._default_params:
+            if key in kwargs:
+                params[key] = kwargs[key]
+
+        if "options" in kwargs:
+            params["options"] = kwargs["options"]
+        else:
+            params["options"] = {
+                **params["options"],
+                "stop": stop,
+                **{k: v for k, v in kwargs.items() if k not in self._default_params},
+            }
+
+        if payload.get("messages"):
+            request_payload = {"messages": payload.get("messages", []), **params}
+        else:
+            request_payload = {
+                "prompt": payload.get("prompt"),
+                "images": payload.get("images", []),
+                **params,
+            }
+
+        headers = {
+            "Content-Type": "application/json",
+            **(self.headers if isinstance(self.headers, dict) else {}),
+        }
+        if self.router is not None:
+            return self.router.stream(
+                api_url[len(self.base_url):], request_payload, headers=headers, auth=self.auth, timeout=self.timeout
+            )
+
+        response = get_http_session().post(
+            url=api_url,
+            headers=headers,
+            auth=self.auth,
+            json=request_payload,
+            stream=True,
+            timeout=self.timeout,
+        )
+        check_ollama_response(response, self.model)
+        return response.iter_lines(decode_unicode=True)
+
+    async def _acreate_stream(
+        self,
+        api_url: str,
+        payload: Any,
+        stop: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        if self.router is None:
+            async for line in super()._acreate_stream(api_url, payload, stop, **kwargs):
+                yield line
+            return
+        open_stream = super()._acreate_stream
+        path = api_url[len(self.base_url):]
+        async for line in self.router.astream(lambda url: open_stream(url + path, payload, stop, **kwargs)):
+            yield line
+
+
+def check_ollama_response(response: requests.Response, model: str) -> None:
+    """Raises the errors langchain's Ollama client raises for a failed response."""
+    response.encoding = "utf-8"
+    if response.status_code != 200:
+        if response.status_code == 404:
+            raise OllamaEndpointNotFoundError(
+                "Ollama call failed with status code 404. "
+                "Maybe your model is not found "
+                f"and you should pull the model with `ollama pull {model}`."
+            )
+        raise ValueError(
+            f"Ollama call failed with status code {response.status_code}."
+            f" Details: {response.text}"
+        )
+
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Records each model call of a chain into a RequestTrace: wall time plus
+    the token counts and prefill/decode durations from Ollama's final
+    response, which langchain keeps as the generation info.
+    """
+
+    def __init__(self, trace: RequestTrace, chain: str):
+        self.trace = trace
+        self.chain = chain
+        self._starts: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def _elapsed(self, run_id: UUID) -> float:
+        start = self._starts.pop(run_id, None)
+        return time.perf_counter() - start if start is not None else 0.0
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        metadata: Dict[str, Any] = {}
+        if response.generations and response.generations[0]:
+            generation = response.generations[0][0]
+            metadata = dict(generation.generation_info or {})
+            message = getattr(generation, "message", None)
+            if not metadata and message is not None:
+                metadata = dict(getattr(message, "response_metadata", None) or {})
+        self.trace.record_llm_call(self.chain, self._elapsed(run_id), metadata)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self.trace.record_llm_call(self.chain, self._elapsed(run_id), error=type(error).__name__)
@@ -0,0 +1,411 @@
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Histogram buckets in seconds, from sub-millisecond parsing stages up to
+# multi-minute generations on slow hardware.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Number of finished request records kept for the debug panel.
+RECENT_REQUESTS = 50
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label combination."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, LabelValues, str, float]]:
+        with self._lock:
+            return [(self.name + "_total" if not self.name.endswith("_total") else self.name, key, "", value)
+                    for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, per label combination."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[str, LabelValues, str, float]]:
+        with self._lock:
+            return [(self.name, key, "", value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label combination."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts followed by the +Inf count, sum and count.
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def summary(self, **labels: Any) -> Dict[str, float]:
+        """Count, sum and mean for one label combination."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+        if not state:
+            return {"count": 0, "sum": 0.0, "mean": 0.0}
+        return {"count": state[-1], "sum": state[-2], "mean": state[-2] / state[-1]}
+
+    def samples(self) -> List[Tuple[str, LabelValues, str, float]]:
+        samples = []
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                samples.append((self.name + "_bucket", key, f'le="{_format_value(float(bound))}"', cumulative))
+            samples.append((self.name + "_sum", key, "", state[-2]))
+            samples.append((self.name + "_count", key, "", state[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """Holds metrics and renders them in the Prometheus text exposition format."""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample_name, key, extra, value in metric.samples():
+                lines.append(f"{sample_name}{_format_labels(metric.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "smart_cv_stage_seconds", "Wall time of each pipeline stage.", ("stage",))
+REQUESTS = REGISTRY.counter(
+    "smart_cv_requests_total", "Finished requests by kind, mode and outcome.", ("kind", "mode", "outcome"))
+CACHE_EVENTS = REGISTRY.counter(
+    "smart_cv_cache_events_total", "Cache lookups and writes by cache and event.", ("cache", "event"))
+LLM_CALLS = REGISTRY.counter(
+    "smart_cv_llm_calls_total", "Model calls by chain and outcome.", ("chain", "outcome"))
+LLM_TOKENS = REGISTRY.counter(
+    "smart_cv_llm_tokens_total", "Tokens reported by Ollama, by chain and kind (prompt or eval).", ("chain", "kind"))
+LLM_SECONDS = REGISTRY.histogram(
+    "smart_cv_llm_seconds",
+    "Model call time by chain and phase: total wall time, load, prompt_eval (prefill) and eval (decode).",
+    ("chain", "phase"))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "smart_cv_queue_depth", "Analysis jobs waiting for a worker.")
+JOBS_RUNNING = REGISTRY.gauge(
+    "smart_cv_jobs_running", "Analysis jobs currently being processed.")
+JOBS = REGISTRY.counter(
+    "smart_cv_jobs_total",
+    "Analysis jobs by outcome: completed, failed, cached, rules, deduplicated, rejected or cancelled.", ("outcome",))
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "smart_cv_queue_wait_seconds", "Time analysis jobs spent queued before a worker picked them up.")
+PDF_PAGES = REGISTRY.counter(
+    "smart_cv_pdf_pages_total", "PDF pages read by the extractor.")
+PDF_TRUNCATIONS = REGISTRY.counter(
+    "smart_cv_pdf_truncations_total", "PDF extractions stopped early, by reason.", ("reason",))
+OLLAMA_REQUESTS = REGISTRY.counter(
+    "smart_cv_ollama_requests_total", "Requests sent to each Ollama endpoint, by outcome.", ("endpoint", "outcome"))
+OLLAMA_OUTSTANDING = REGISTRY.gauge(
+    "smart_cv_ollama_outstanding_requests", "Requests in flight per Ollama endpoint.", ("endpoint",))
+OLLAMA_ENDPOINT_UP = REGISTRY.gauge(
+    "smart_cv_ollama_endpoint_up", "Whether the last health check of an Ollama endpoint succeeded.", ("endpoint",))
+HEDGED_REQUESTS = REGISTRY.counter(
+    "smart_cv_hedged_requests_total", "Hedged model requests by which copy answered first.", ("winner",))
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Records the wall time of the block in smart_cv_stage_seconds."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+class RequestTrace:
+    """
+    Collects the stages, model calls and outcome of one request, then emits
+    them as a single structured log record.
+
+    Model calls may be recorded from worker threads (concurrent chains), so
+    all mutation goes through a lock.
+    """
+    def __init__(self, kind: str, **fields: Any):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.fields: Dict[str, Any] = dict(fields)
+        self.stages: List[Dict[str, Any]] = []
+        self.llm_calls: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._finished = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times the block as a stage of this request and in the stage histogram."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            STAGE_SECONDS.observe(seconds, stage=name)
+            with self._lock:
+                self.stages.append({"stage": name, "seconds": round(seconds, 4)})
+
+    def set(self, **fields: Any) -> None:
+        with self._lock:
+            self.fields.update(fields)
+
+    def mark(self, name: str) -> None:
+        """Records the time since the request started under `name`, once."""
+        with self._lock:
+            self.fields.setdefault(name, round(time.perf_counter() - self._start, 4))
+
+    def record_llm_call(self, chain: str, seconds: float, metadata: Optional[Dict[str, Any]] = None,
+                        error: Optional[str] = None) -> None:
+        """
+        Records one model call. metadata is Ollama's final response object;
+        its durations are in nanoseconds.
+        """
+        metadata = metadata or {}
+        call: Dict[str, Any] = {"chain": chain, "seconds": round(seconds, 4)}
+        LLM_CALLS.inc(chain=chain, outcome="error" if error else "ok")
+        LLM_SECONDS.observe(seconds, chain=chain, phase="total")
+        if error:
+            call["error"] = error
+        for key, kind in (("prompt_eval_count", "prompt"), ("eval_count", "eval")):
+            if isinstance(metadata.get(key), int):
+                call[key] = metadata[key]
+                LLM_TOKENS.inc(metadata[key], chain=chain, kind=kind)
+        for key, phase in (("load_duration", "load"), ("prompt_eval_duration", "prompt_eval"),
+                           ("eval_duration", "eval")):
+            if isinstance(metadata.get(key), (int, float)):
+                phase_seconds = metadata[key] / 1e9
+                call[f"{phase}_seconds"] = round(phase_seconds, 4)
+                LLM_SECONDS.observe(phase_seconds, chain=chain, phase=phase)
+        if call.get("eval_count") and call.get("eval_seconds"):
+            call["eval_tokens_per_second"] = round(call["eval_count"] / call["eval_seconds"], 1)
+        with self._lock:
+            self.llm_calls.append(call)
+
+    def __enter__(self) -> "RequestTrace":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.finish("ok")
+        elif issubclass(exc_type, (GeneratorExit, KeyboardInterrupt)):
+            # A streaming consumer stopped early.
+            self.finish("cancelled")
+        else:
+            self.finish("error", error=f"{exc_type.__name__}: {exc}")
+
+    def finish(self, outcome: str = "ok", **fields: Any) -> Dict[str, Any]:
+        """Counts the request, logs its record and returns it. Later calls are no-ops."""
+        with self._lock:
+            if self._finished:
+                return {}
+            self._finished = True
+            self.fields.update(fields)
+            record = {
+                "request_id": self.request_id,
+                "kind": self.kind,
+                "outcome": outcome,
+                "seconds": round(time.perf_counter() - self._start, 4),
+                **self.fields,
+                "stages": list(self.stages),
+                "llm_calls": list(self.llm_calls),
+            }
+        record["prompt_tokens"] = sum(call.get("prompt_eval_count", 0) for call in record["llm_calls"])
+        record["eval_tokens"] = sum(call.get("eval_count", 0) for call in record["llm_calls"])
+        REQUESTS.inc(kind=self.kind, mode=str(self.fields.get("mode", "")), outcome=outcome)
+        _recent.append(record)
+        log_request(record)
+        return record
+
+
+_recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_REQUESTS)
+_log_lock = threading.Lock()
+
+
+def recent_requests() -> List[Dict[str, Any]]:
+    """The most recent finished request records, newest last."""
+    return list(_recent)
+
+
+def log_request(record: Dict[str, Any]) -> None:
+    """
+    Writes a request record as one JSON line. Logging is opt-in:
+    SMART_CV_REQUEST_LOG="stdout" prints it, any other value except "off"
+    is a file path to append to, and unset disables it. The records are
+    always kept for recent_requests().
+    """
+    destination = os.getenv("SMART_CV_REQUEST_LOG", "off")
+    if destination.lower() in ("", "off", "0", "false", "none"):
+        return
+    line = json.dumps(record, default=str)
+    if destination.lower() == "stdout":
+        print(line)
+        return
+    with _log_lock:
+        with open(destination, "a", encoding="utf-8") as log_file:
+            log_file.write(line + "\n")
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):  # noqa: A002 - signature from BaseHTTPRequestHandler
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_metrics_server: Optional[ThreadingHTTPServer] = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = "0.0.0.0") -> Optional[int]:
+    """
+    Serves GET /metrics on a background thread, once per process.
+
+    Args:
+        port: The port to listen on. Defaults to SMART_CV_METRICS_PORT; when
+            neither is set no server is started.
+        host: The interface to bind.
+
+    Returns:
+        The port being served, or None when disabled.
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is not None:
+            return _metrics_server.server_address[1]
+        if port is None:
+            configured = os.getenv("SMART_CV_METRICS_PORT")
+            if not configured:
+                return None
+            port = int(configured)
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        _metrics_server = server
+        print(f"Metrics available at http://{host}:{server.server_address[1]}/metrics")
+        return server.server_address[1]
@@ -0,0 +1,182 @@
+"""
+Near-duplicate detection for CV submissions.
+
+Each CV is reduced to a MinHash signature of its word shingles; locality
+sensitive hashing over bands of the signature finds the few earlier CVs
+that may be similar, and their signatures estimate the Jaccard similarity.
+A CV above the threshold joins the cluster of the closest earlier CV, so
+only one CV per cluster needs an LLM analysis.
+"""
+import os
+import re
+import threading
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .cache import normalize_cv_text
+
+SHINGLE_WORDS = 3
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: a pair with similarity s shares a band with probability
+# 1 - (1 - s^8)^16, about 0.24 at s=0.6, 0.61 at 0.7, 0.95 at 0.8 and 0.99 at
+# 0.85. Near-duplicates at the default threshold are found; a lower threshold
+# also needs more bands, or pairs just above it are mostly missed.
+LSH_BANDS = 16
+DEFAULT_THRESHOLD = float(os.getenv("SMART_CV_DEDUP_THRESHOLD", 0.85))
+# CVs remembered by the detector of API uploads; the oldest are forgotten beyond this.
+DEFAULT_MAX_ENTRIES = int(os.getenv("SMART_CV_DEDUP_MAX_ENTRIES", 20000))
+# Lines listed per side in a diff between near-duplicates.
+MAX_DIFF_LINES = 20
+
+_WORD = re.compile(r"\w+")
+_rng = np.random.default_rng(1)
+# Multiply-shift hash functions: odd 64-bit multipliers, high 32 bits kept.
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(cv_text: str) -> np.ndarray:
+    """CRC32 hashes of the word n-grams of the normalized, lowercased text."""
+    words = _WORD.findall(normalize_cv_text(cv_text).lower())
+    if len(words) < SHINGLE_WORDS:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+    return np.unique(np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64, count=len(grams)))
+
+
+def minhash(hashes: np.ndarray) -> np.ndarray:
+    """The MinHash signature of a set of shingle hashes, computed for all permutations at once."""
+    if not len(hashes):
+        return np.full(NUM_PERMUTATIONS, np.iinfo(np.uint32).max, dtype=np.uint32)
+    # uint64 arithmetic wraps, which is what multiply-shift hashing relies on.
+    with np.errstate(over="ignore"):
+        permuted = (_MULTIPLIERS[:, None] * hashes[None, :] + _OFFSETS[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def diff_cv_texts(original: str, variant: str, limit: int = MAX_DIFF_LINES) -> Dict[str, List[str]]:
+    """Lines only in the variant ("added") and only in the original ("removed")."""
+    original_lines = normalize_cv_text(original).split("\n")
+    variant_lines = normalize_cv_text(variant).split("\n")
+    original_set, variant_set = set(original_lines), set(variant_lines)
+    return {
+        "added": [line for line in variant_lines if line not in original_set][:limit],
+        "removed": [line for line in original_lines if line not in variant_set][:limit],
+    }
+
+
+@dataclass
+class DuplicateMatch:
+    """Where a CV landed: its cluster representative and the similarity to it."""
+    doc_id: str
+    representative: str
+    similarity: float
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.representative != self.doc_id
+
+
+class NearDuplicateDetector:
+    """
+    Incremental MinHash/LSH index. add() checks a CV against everything
+    added before and records it, in well under a millisecond for typical
+    CVs regardless of how many are indexed. With max_entries, the oldest
+    CVs are forgotten once more are indexed.
+    """
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, bands: int = LSH_BANDS,
+                 max_entries: Optional[int] = None):
+        if NUM_PERMUTATIONS % bands:
+            raise ValueError(f"bands must divide {NUM_PERMUTATIONS}.")
+        self.threshold = threshold
+        self.bands = bands
+        self.max_entries = max_entries
+        self._rows_per_band = NUM_PERMUTATIONS // bands
+        self._buckets: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._representatives: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in signature.reshape(self.bands, self._rows_per_band)]
+
+    def find(self, cv_text: str) -> Optional[Tuple[str, float]]:
+        """Returns the most similar indexed CV at or above the threshold and its similarity, without adding."""
+        with self._lock:
+            return self._best_match(minhash(shingles(cv_text)))
+
+    def _best_match(self, signature: np.ndarray) -> Optional[Tuple[str, float]]:
+        candidates = {doc_id for band, key in enumerate(self._band_keys(signature))
+                      for doc_id in self._buckets[band].get(key, ())}
+        best = None
+        for doc_id in candidates:
+            similarity = float(np.mean(self._signatures[doc_id] == signature))
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (doc_id, similarity)
+        return best
+
+    def add(self, doc_id: str, cv_text: str) -> DuplicateMatch:
+        """
+        Indexes a CV and returns its cluster: the representative of the most
+        similar earlier CV above the threshold, or the CV itself.
+        """
+        signature = minhash(shingles(cv_text))
+        with self._lock:
+            if doc_id in self._signatures:
+                representative = self._representatives[doc_id]
+                similarity = float(np.mean(self._signatures[representative] == signature))
+                return DuplicateMatch(doc_id, representative, similarity)
+            best = self._best_match(signature)
+            representative, similarity = doc_id, 1.0
+            if best is not None:
+                representative, similarity = self._representatives[best[0]], best[1]
+                if representative not in self._signatures:
+                    # The representative was forgotten; the match leads the cluster now.
+                    representative = best[0]
+                elif representative != best[0]:
+                    similarity = float(np.mean(self._signatures[representative] == signature))
+            self._signatures[doc_id] = signature
+            self._representatives[doc_id] = representative
+            for band, key in enumerate(self._band_keys(signature)):
+                self._buckets[band][key].append(doc_id)
+            while self.max_entries is not None and len(self._signatures) > self.max_entries:
+                self._forget(next(iter(self._signatures)))
+            return DuplicateMatch(doc_id, representative, similarity)
+
+    def _forget(self, doc_id: str) -> None:
+        signature = self._signatures.pop(doc_id)
+        del self._representatives[doc_id]
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band][key]
+            bucket.remove(doc_id)
+            if not bucket:
+                del self._buckets[band][key]
+
+    def clusters(self) -> Dict[str, List[str]]:
+        """Maps each representative to the CVs of its cluster, itself first."""
+        with self._lock:
+            clusters: Dict[str, List[str]] = defaultdict(list)
+            for doc_id, representative in self._representatives.items():
+                clusters[representative].append(doc_id)
+            return dict(clusters)
+
+
+_shared_detector: Optional[NearDuplicateDetector] = None
+_shared_detector_lock = threading.Lock()
+
+
+def get_duplicate_detector() -> NearDuplicateDetector:
+    """Returns the process-wide detector for uploads, bounded by SMART_CV_DEDUP_MAX_ENTRIES."""
+    global _shared_detector
+    with _shared_detector_lock:
+        if _shared_detector is None:
+            _shared_detector = NearDuplicateDetector(max_entries=DEFAULT_MAX_ENTRIES)
+        return _shared_detector
@@ -0,0 +1,356 @@
+"""
+Routing of model requests across several Ollama servers.
+
+SMART_CV_OLLAMA_ENDPOINTS lists the servers ("http://gpu1:11434,gpu2:11434");
+each request goes to the healthy endpoint with the fewest requests in flight.
+A background thread health-checks the endpoints, and an endpoint that refuses
+connections is taken out of rotation until it passes a check again.
+
+With SMART_CV_HEDGE_AFTER_MS set, a request whose first token has not arrived
+within that time is sent again to an idle second endpoint, and whichever
+answers first is used; the other request is closed, which makes Ollama stop
+generating it.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+from .llm_client import check_ollama_response, get_http_session, normalize_ollama_url
+from .metrics import HEDGED_REQUESTS, OLLAMA_ENDPOINT_UP, OLLAMA_OUTSTANDING, OLLAMA_REQUESTS
+
+DEFAULT_HEALTH_INTERVAL_SECONDS = 10.0
+HEALTH_CHECK_TIMEOUT_SECONDS = 2.0
+# Requests each server runs at once (Ollama's own default when unset).
+DEFAULT_SLOTS_PER_ENDPOINT = int(os.getenv("OLLAMA_NUM_PARALLEL") or 4)
+
+
+class Endpoint:
+    """One Ollama server and its routing state."""
+    def __init__(self, url: str):
+        self.url = url
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaRouter:
+    """
+    Picks an endpoint per request by least outstanding requests, with
+    health checks, failover on connection errors and optional hedging.
+    """
+    def __init__(self, urls: List[str], hedge_after: Optional[float] = None,
+                 health_interval: float = DEFAULT_HEALTH_INTERVAL_SECONDS,
+                 slots_per_endpoint: int = DEFAULT_SLOTS_PER_ENDPOINT):
+        """
+        Args:
+            urls: Ollama server URLs, bare hosts or host:port pairs.
+            hedge_after: Seconds to wait for the first token before hedging
+                the request to a second endpoint. None disables hedging.
+            health_interval: Seconds between health checks.
+            slots_per_endpoint: Requests each server runs in parallel
+                (OLLAMA_NUM_PARALLEL); sizes the hedging thread pool.
+        """
+        if not urls:
+            raise ValueError("OllamaRouter needs at least one endpoint.")
+        self.endpoints = [Endpoint(url) for url in dict.fromkeys(normalize_ollama_url(url) for url in urls)]
+        self.hedge_after = hedge_after
+        self.health_interval = health_interval
+        self.slots_per_endpoint = max(slots_per_endpoint, 1)
+        self._lock = threading.Lock()
+        # Breaks ties between equally loaded endpoints in turn.
+        self._turn = itertools.count()
+        self._health_thread: Optional[threading.Thread] = None
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        for endpoint in self.endpoints:
+            OLLAMA_ENDPOINT_UP.set(1, endpoint=endpoint.url)
+
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    def acquire(self, exclude: Tuple[Endpoint, ...] = (), idle_only: bool = False) -> Optional[Endpoint]:
+        """
+        Reserves the healthy endpoint with the fewest requests in flight.
+        When no endpoint is healthy, all are tried, since the health state
+        may be stale. Returns None if every endpoint is excluded (or busy,
+        with idle_only).
+        """
+        self._start_health_checks()
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+            if healthy or idle_only:
+                candidates = healthy
+            if idle_only:
+                candidates = [endpoint for endpoint in candidates if endpoint.outstanding == 0]
+            if not candidates:
+                return None
+            turn = next(self._turn)
+            endpoint = min(
+                candidates,
+                key=lambda candidate: (candidate.outstanding, (self.endpoints.index(candidate) - turn) % len(self.endpoints)),
+            )
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+        OLLAMA_OUTSTANDING.inc(endpoint=endpoint.url)
+        return endpoint
+
+    def release(self, endpoint: Endpoint, ok: bool = True) -> None:
+        """Returns an endpoint reserved by acquire once its request has finished."""
+        with self._lock:
+            endpoint.outstanding -= 1
+        OLLAMA_OUTSTANDING.dec(endpoint=endpoint.url)
+        OLLAMA_REQUESTS.inc(endpoint=endpoint.url, outcome="ok" if ok else "error")
+
+    def _mark_down(self, endpoint: Endpoint, error: BaseException) -> None:
+        with self._lock:
+            endpoint.healthy = False
+            endpoint.failures += 1
+            endpoint.last_error = f"{type(error).__name__}: {error}"
+        OLLAMA_ENDPOINT_UP.set(0, endpoint=endpoint.url)
+        print(f"Ollama endpoint {endpoint.url} is unavailable: {error}")
+
+    def check_health(self) -> None:
+        """Probes every endpoint once and updates its health state."""
+        for endpoint in self.endpoints:
+            try:
+                get_http_session().get(f"{endpoint.url}/api/version", timeout=HEALTH_CHECK_TIMEOUT_SECONDS).raise_for_status()
+            except requests.RequestException as e:
+                if endpoint.healthy:
+                    self._mark_down(endpoint, e)
+                continue
+            if not endpoint.healthy:
+                print(f"Ollama endpoint {endpoint.url} is available again.")
+            with self._lock:
+                endpoint.healthy = True
+            OLLAMA_ENDPOINT_UP.set(1, endpoint=endpoint.url)
+
+    def _start_health_checks(self) -> None:
+        if self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is not None:
+                return
+
+            def run() -> None:
+                while True:
+                    self.check_health()
+                    time.sleep(self.health_interval)
+
+            self._health_thread = threading.Thread(target=run, name="ollama-health", daemon=True)
+            self._health_thread.start()
+
+    def _post(self, endpoint: Endpoint, path: str, payload: dict, **kwargs: Any) -> requests.Response:
+        return get_http_session().post(f"{endpoint.url}{path}", json=payload, stream=True, **kwargs)
+
+    def _send(self, endpoint: Endpoint, path: str, payload: dict, **kwargs: Any) -> Tuple[requests.Response, Endpoint]:
+        """
+        Sends the request to the reserved endpoint, hedging it if enabled.
+        Returns the response whose headers arrived first and its endpoint,
+        which stays reserved; any other reservation is released.
+        """
+        if self.hedge_after is None or len(self.endpoints) < 2:
+            return self._post(endpoint, path, payload, **kwargs), endpoint
+
+        with self._lock:
+            if self._hedge_executor is None:
+                # A copy holds its thread until its first token. Every slot of
+                # every server can have a primary and a hedge in flight; with
+                # fewer threads, copies queue here and hedging adds latency.
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=2 * self.slots_per_endpoint * len(self.endpoints),
+                    thread_name_prefix="ollama-hedge",
+                )
+        executor = self._hedge_executor
+        primary = executor.submit(self._post, endpoint, path, payload, **kwargs)
+        try:
+            return primary.result(timeout=self.hedge_after), endpoint
+        except FutureTimeoutError:
+            pass
+        # Only hedge to an idle endpoint, so hedging cannot pile extra work
+        # onto a cluster that is slow because it is saturated.
+        backup_endpoint = self.acquire(exclude=(endpoint,), idle_only=True)
+        if backup_endpoint is None:
+            return primary.result(), endpoint
+
+        backup = executor.submit(self._post, backup_endpoint, path, payload, **kwargs)
+        copies = {primary: endpoint, backup: backup_endpoint}
+        pending = set(copies)
+        winner = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if winner is None and future.exception() is None:
+                    winner = future
+                    break
+        if winner is None:
+            # Both copies failed; surface the primary's error.
+            self.release(backup_endpoint, ok=False)
+            primary.result()
+
+        HEDGED_REQUESTS.inc(winner="primary" if winner is primary else "hedge")
+        for future, loser_endpoint in copies.items():
+            if future is not winner:
+                future.add_done_callback(lambda f, e=loser_endpoint: self._discard(f, e))
+        return winner.result(), copies[winner]
+
+    def _discard(self, future, endpoint: Endpoint) -> None:
+        """Closes the response of a losing hedged copy and frees its endpoint."""
+        if future.exception() is None:
+            future.result().close()
+        self.release(endpoint, ok=future.exception() is None)
+
+    def stream(self, path: str, payload: dict, **kwargs: Any) -> Iterator[str]:
+        """
+        Posts a streaming request (path such as "/api/chat") and returns its
+        lines. Connection errors fail over to the next endpoint.
+        """
+        model = payload.get("model", "")
+        tried: Tuple[Endpoint, ...] = ()
+        while True:
+            endpoint = self.acquire(exclude=tried)
+            if endpoint is None:
+                raise requests.ConnectionError(f"No Ollama endpoint is reachable (tried {', '.join(e.url for e in tried)}).")
+            try:
+                response, endpoint = self._send(endpoint, path, payload, **kwargs)
+            except requests.ConnectionError as e:
+                self.release(endpoint, ok=False)
+                self._mark_down(endpoint, e)
+                tried += (endpoint,)
+                continue
+            except BaseException:
+                self.release(endpoint, ok=False)
+                raise
+            break
+
+        try:
+            check_ollama_response(response, model)
+        except BaseException:
+            response.close()
+            self.release(endpoint, ok=False)
+            raise
+        return self._iter_lines(response, endpoint)
+
+    def _iter_lines(self, response: requests.Response, endpoint: Endpoint) -> Iterator[str]:
+        ok = False
+        try:
+            yield from response.iter_lines(decode_unicode=True)
+            ok = True
+        finally:
+            response.close()
+            self.release(endpoint, ok)
+
+    async def astream(self, open_stream: Callable[[str], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Async counterpart of stream for a transport that opens the line
+        stream of a request to a given endpoint URL. Hedges like _send: if
+        no line has arrived after hedge_after, the request is also sent to
+        an idle endpoint, and the copy whose first line arrives first is
+        used while the other is cancelled.
+        """
+        endpoint = self.acquire()
+        streams = {endpoint: open_stream(endpoint.url)}
+        firsts = {asyncio.ensure_future(streams[endpoint].__anext__()): endpoint}
+        winner = None
+        try:
+            if self.hedge_after is not None and len(self.endpoints) >= 2:
+                done, _ = await asyncio.wait(set(firsts), timeout=self.hedge_after)
+                backup_endpoint = None if done else self.acquire(exclude=(endpoint,), idle_only=True)
+                if backup_endpoint is not None:
+                    streams[backup_endpoint] = open_stream(backup_endpoint.url)
+                    firsts[asyncio.ensure_future(streams[backup_endpoint].__anext__())] = backup_endpoint
+            pending = set(firsts)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if winner is None and not _failed(future):
+                        winner = future
+            if winner is None:
+                # Every copy failed; surface the primary's error.
+                next(iter(firsts)).result()
+            if len(firsts) > 1:
+                HEDGED_REQUESTS.inc(winner="primary" if firsts[winner] is endpoint else "hedge")
+        finally:
+            for future, copy_endpoint in firsts.items():
+                if future is not winner:
+                    await self._adiscard(future, streams[copy_endpoint], copy_endpoint)
+
+        winner_endpoint = firsts[winner]
+        ok = False
+        try:
+            if winner.exception() is None:
+                yield winner.result()
+                async for line in streams[winner_endpoint]:
+                    yield line
+            ok = True
+        finally:
+            await streams[winner_endpoint].aclose()
+            self.release(winner_endpoint, ok)
+
+    async def _adiscard(self, future: "asyncio.Future", lines: AsyncIterator[str], endpoint: Endpoint) -> None:
+        """Cancels a losing (or failed) copy of an async request and frees its endpoint."""
+        future.cancel()
+        try:
+            await future
+        except (asyncio.CancelledError, Exception):
+            pass
+        await lines.aclose()
+        self.release(endpoint, ok=future.cancelled() or not _failed(future))
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [endpoint.as_dict() for endpoint in self.endpoints]
+
+
+def _failed(future: "asyncio.Future") -> bool:
+    # An empty stream ends its first __anext__ with StopAsyncIteration.
+    return future.cancelled() or not isinstance(future.exception(), (type(None), StopAsyncIteration))
+
+
+def router_from_env() -> Optional[OllamaRouter]:
+    """
+    Builds a router from SMART_CV_OLLAMA_ENDPOINTS (comma-separated),
+    SMART_CV_HEDGE_AFTER_MS and SMART_CV_HEALTH_INTERVAL, or returns None
+    when no endpoints are configured.
+    """
+    urls = [url.strip() for url in os.getenv("SMART_CV_OLLAMA_ENDPOINTS", "").split(",") if url.strip()]
+    if not urls:
+        return None
+    hedge_after_ms = float(os.getenv("SMART_CV_HEDGE_AFTER_MS", 0) or 0)
+    return OllamaRouter(
+        urls,
+        hedge_after=hedge_after_ms / 1000 if hedge_after_ms > 0 else None,
+        health_interval=float(os.getenv("SMART_CV_HEALTH_INTERVAL", DEFAULT_HEALTH_INTERVAL_SECONDS)),
+    )
+
+
+_shared_router: Optional[OllamaRouter] = None
+_shared_router_lock = threading.Lock()
+_shared_router_loaded = False
+
+
+def get_ollama_router() -> Optional[OllamaRouter]:
+    """Returns the process-wide router from the environment, or None for a single Ollama server."""
+    global _shared_router, _shared_router_loaded
+    with _shared_router_lock:
+        if not _shared_router_loaded:
+            _shared_router = router_from_env()
+            _shared_router_loaded = True
+        return _shared_router
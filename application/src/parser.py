@@ -1,63 +1,183 @@
-from typing import List
-import pypdf
-import docx
-
-def extract_text_from_pdf(file_path: str) -> str:
-    """Extracts text from all pages of a PDF file."""
-    try:    
-        with open(file_path, 'rb') as pdf_file_obj:
-            pdf_reader = pypdf.PdfReader(pdf_file_obj)
-            
-            # Initialize an empty list to hold the text from each page.
-            text_parts: List[str] = []
-            
-            # Loop through each page in the PDF.
-            for page in pdf_reader.pages:
-                # Extract the text from the current page.
-                page_text = page.extract_text()
-                # Append the extracted text to our list.
-                if page_text:
-                    text_parts.append(page_text)
-            
-            # Join all the text parts into a single string.
-            full_text = "\n".join(text_parts)
-            return full_text
-    except Exception as e:
-        print(f"An error occurred while reading the PDF: {e}")
-        return ""
+import io
+import os
+import zipfile
+from typing import BinaryIO, Optional, Union
+from .cache import TieredCache, get_parse_cache, hash_bytes
+from .docx_extraction import extract_docx
+from .metrics import RequestTrace, timed
+from .pdf_extraction import PdfExtractionLimits, extract_pdf
+
+# A CV can be given as a path on disk, raw bytes, or a binary file-like object.
+CVSource = Union[str, os.PathLike, bytes, BinaryIO]
+
+PDF_MAGIC = b"%PDF-"
+ZIP_MAGIC = b"PK\x03\x04"
+
+# Part of the parse cache key. Bump it whenever a change alters the text
+# extracted from the same file, so text from the old extractor is not served
+# from the cache. 2: PDF page and size limits; 3: streaming DOCX extraction
+# with tables, headers and text boxes.
+PARSER_VERSION = 3
+
+
+def _open_source(source: CVSource) -> Union[str, BinaryIO]:
+    """
+    Returns something pypdf / zipfile can read: paths are passed through,
+    bytes are wrapped in a BytesIO so nothing is written to disk.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, os.PathLike):
+        return os.fspath(source)
+    return source
+
+
+def detect_format(data: bytes) -> Optional[str]:
+    """
+    Detects the document format from its content rather than its name.
+
+    Args:
+        data: The raw file content.
+
+    Returns:
+        "pdf", "docx", or None if the content is neither.
+    """
+    if data[:1024].lstrip().startswith(PDF_MAGIC):
+        return "pdf"
+    if data.startswith(ZIP_MAGIC):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            return None
+    return None
+
+
+def extract_text_from_pdf(source: CVSource, limits: Optional[PdfExtractionLimits] = None) -> str:
+    """
+    Extracts text from a PDF file, bytes or binary stream.
 
-def extract_text_from_docx(file_path: str) -> str:
-    """Extracts Text From a Signle DOCX File."""
+    Extraction runs under page, time and memory limits; use extract_pdf
+    directly when the diagnostics are needed.
+    """
+    result = extract_pdf(source, limits)
+    if result.truncated:
+        print(
+            f"PDF extraction stopped early ({result.truncation_reason}) after "
+            f"{result.pages_read}/{result.total_pages} pages in {result.elapsed_seconds:.2f}s."
+        )
+    return result.text
+
+def extract_text_from_docx(source: CVSource) -> str:
+    """
+    Extracts text from a DOCX file, bytes or binary stream, including
+    tables, text boxes, headers and footers.
+
+    The XML is streamed out of the archive (see docx_extraction) instead of
+    loading the python-docx object model.
+    """
     try:
-        doc = docx.Document(file_path)
-        full_text = [para.text for para in doc.paragraphs]
-        return "\n".join(full_text)
+        result = extract_docx(_open_source(source))
     except Exception as e:
         print(f"An error occurred while reading the DOCX file: {e}")
         return ""
+    if result.error:
+        print(f"DOCX extraction stopped at damaged XML ({result.error}); keeping the text read before it.")
+    return result.text
 
-def parse_cv(file_path: str) -> str:
+def parse_cv_bytes(data: bytes, file_name: Optional[str] = None, trace: Optional[RequestTrace] = None,
+                   pdf_limits: Optional[PdfExtractionLimits] = None) -> str:
+    """
+    Parses a CV held in memory without touching the filesystem.
+
+    The format is detected from magic bytes. The file name is only used as
+    a fallback when the content is not recognized.
+
+    Args:
+        data: The raw file content.
+        file_name: The original file name, if known.
+        trace: Request trace to record the parse stage in.
+        pdf_limits: PDF extraction limits. Defaults to PdfExtractionLimits().
+
+    Returns:
+        A string containing the extracted text from the document.
+
+    Raises:
+        ValueError: If the content is neither a PDF nor a DOCX document.
+    """
+    file_format = detect_format(data)
+    if file_format is None and file_name:
+        file_format = os.path.splitext(file_name)[1].lower().lstrip(".") or None
+
+    if file_format not in ("pdf", "docx"):
+        raise ValueError("Unsupported file type. Only .pdf and .docx are supported.")
+    if trace is not None:
+        trace.set(format=file_format, bytes=len(data))
+    stage = trace.stage if trace is not None else timed
+    with stage(f"parse_{file_format}"):
+        if file_format == "pdf":
+            return extract_text_from_pdf(data, pdf_limits)
+        return extract_text_from_docx(data)
+
+def parse_cv(file_path: CVSource) -> str:
     """
     Parses a CV file (.pdf or .docx) and extracts its text content.
 
-    This function acts as a dispatcher, checking the file extension and
+    This function acts as a dispatcher, detecting the document format and
     calling the appropriate helper function to perform the text extraction.
+    Paths are kept for compatibility; prefer parse_cv_bytes for uploads.
 
     Args:
-        file_path: The full path to the CV file.
+        file_path: The full path to the CV file, or its bytes / binary stream.
 
     Returns:
         A string containing the extracted text from the document.
-        Returns an empty string if the file format is not supported,
-        the file is not found, or an error occurs during parsing.
-        
+        Returns an empty string if an error occurs during parsing.
+
     Raises:
-        ValueError: If the file extension is not '.pdf' or '.docx'.
+        ValueError: If the file is not a PDF or DOCX document.
         FileNotFoundError: If the file at file_path does not exist.
     """
-    if file_path.endswith('.pdf'):
-        return extract_text_from_pdf(file_path)
-    elif file_path.endswith('.docx'):
-        return extract_text_from_docx(file_path)
-    else:
-        raise ValueError("Unsupported file type. Only .pdf and .docx are supported.")
+    if isinstance(file_path, (str, os.PathLike)):
+        with open(file_path, 'rb') as cv_file:
+            return parse_cv_bytes(cv_file.read(), os.fspath(file_path))
+    if isinstance(file_path, (bytes, bytearray, memoryview)):
+        return parse_cv_bytes(bytes(file_path))
+    return parse_cv_bytes(file_path.read())
+
+
+def parse_cv_cached(file_bytes: bytes, file_name: str, cache: Optional[TieredCache] = None,
+                    pdf_limits: Optional[PdfExtractionLimits] = None) -> str:
+    """
+    Parses an uploaded CV, reusing the text extracted from identical files.
+
+    The parse cache is keyed by the SHA-256 of the file bytes and
+    PARSER_VERSION, so re-uploading the same document skips extraction
+    entirely. Parsing happens in memory.
+
+    Args:
+        file_bytes: The raw content of the uploaded file.
+        file_name: The original file name, used only if the format cannot be
+            detected from the content.
+        cache: The cache to use. Defaults to the process-wide parse cache.
+        pdf_limits: PDF extraction limits. Defaults to PdfExtractionLimits().
+
+    Returns:
+        The extracted text, or an empty string if nothing could be extracted.
+    """
+    cache = cache if cache is not None else get_parse_cache()
+    with RequestTrace("parse") as trace:
+        key = f"v{PARSER_VERSION}:{hash_bytes(file_bytes)}"
+        cv_text = cache.get(key)
+        trace.set(cache="hit" if cv_text is not None else "miss")
+        if cv_text is not None:
+            return cv_text
+
+        cv_text = parse_cv_bytes(file_bytes, file_name, trace, pdf_limits)
+        trace.set(chars=len(cv_text))
+
+        # Failed extractions are not cached so a fixed parser gets another chance.
+        if cv_text and cv_text.strip():
+            cache.set(key, cv_text)
+        return cv_text
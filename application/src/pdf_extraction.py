@@ -0,0 +1,370 @@
+import gc
+import io
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Optional, Tuple, Union
+import pypdf
+from .metrics import PDF_PAGES, PDF_TRUNCATIONS
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+@dataclass
+class PdfExtractionLimits:
+    """
+    Per-document limits for PDF extraction.
+
+    Attributes:
+        max_pages: Pages beyond this index are never read.
+        timeout_seconds: Wall-clock budget for the whole document.
+        max_memory_mb: Address-space ceiling for each extraction worker
+            (POSIX only). None disables the limit.
+        max_chars: Stop once this much text has been gathered; the analysis
+            never uses more than this.
+        pages_per_chunk: Pages handed to a worker per task.
+        max_workers: Upper bound on extraction processes. Defaults to the
+            CPU count.
+        isolate: Run extraction of larger documents in worker processes so
+            that the limits can be enforced and a hostile file cannot hang
+            or exhaust the caller.
+        inline_max_bytes: Files up to this size are opened in the calling
+            process, where only the time and size limits apply (and time is
+            only checked between pages). Larger files are opened, counted
+            and read in the workers.
+        inline_max_pages: Files opened in the caller with up to this many
+            pages are also read there; starting a worker task costs more
+            than extracting a short CV.
+    """
+    max_pages: int = 50
+    timeout_seconds: float = 30.0
+    max_memory_mb: Optional[int] = 512
+    max_chars: int = 20000
+    pages_per_chunk: int = 8
+    max_workers: Optional[int] = None
+    isolate: bool = True
+    inline_max_bytes: int = 2 * 1024 * 1024
+    inline_max_pages: int = 8
+
+
+@dataclass
+class PdfExtractionResult:
+    """
+    Extracted text plus diagnostics about how it was obtained.
+
+    truncation_reason is one of "max_pages", "char_budget", "timeout",
+    "memory" or "error" when not all pages were read.
+    """
+    text: str = ""
+    total_pages: int = 0
+    pages_read: int = 0
+    page_seconds: List[float] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+    truncation_reason: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return self.truncation_reason is not None
+
+
+# Seconds a new pool gets to run its first task. Workers that cannot start
+# (e.g. __main__ is not importable under spawn/forkserver) are respawned
+# forever by multiprocessing, so this is how that failure is noticed.
+WORKER_START_TIMEOUT = 10.0
+
+# --- WORKER PROCESS STATE ---
+
+# The document a worker last opened, so the chunks of one document that
+# land on the same worker do not parse it again.
+_worker_key: Optional[str] = None
+_worker_reader: Optional[pypdf.PdfReader] = None
+
+
+def _init_worker(max_memory_mb: Optional[int]) -> None:
+    """Pool initializer: applies the memory ceiling."""
+    if max_memory_mb and resource is not None:
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_ready() -> int:
+    return os.getpid()
+
+
+def _worker_document(key: str, data: bytes) -> pypdf.PdfReader:
+    global _worker_key, _worker_reader
+    if _worker_key != key:
+        # pypdf object graphs are cyclic; free the previous document before
+        # parsing the next one under the memory ceiling.
+        _worker_key, _worker_reader = None, None
+        gc.collect()
+        _worker_reader = pypdf.PdfReader(io.BytesIO(data))
+        _worker_key = key
+    return _worker_reader
+
+
+def _count_pages(key: str, data: bytes) -> dict:
+    """Opens a document inside a worker and returns its page count or the error."""
+    try:
+        return {"total_pages": len(_worker_document(key, data).pages), "error": None}
+    except MemoryError:
+        return {"total_pages": 0, "error": "out of memory"}
+    except Exception as e:
+        return {"total_pages": 0, "error": str(e)}
+
+
+def _extract_range(key: str, data: bytes, page_range: Tuple[int, int]) -> dict:
+    """
+    Extracts pages [start, end) inside a worker. Errors on individual pages
+    are recorded and skipped; running out of memory ends the chunk.
+    """
+    global _worker_key, _worker_reader
+    start, end = page_range
+    pages: List[Tuple[int, str, float]] = []
+    errors: List[str] = []
+    try:
+        reader = _worker_document(key, data)
+        for index in range(start, end):
+            page_start = time.perf_counter()
+            try:
+                page_text = reader.pages[index].extract_text() or ""
+            except MemoryError:
+                raise
+            except Exception as e:
+                errors.append(f"page {index + 1}: {e}")
+                page_text = ""
+            pages.append((index, page_text, time.perf_counter() - page_start))
+    except MemoryError:
+        _worker_key, _worker_reader = None, None
+        return {"pages": pages, "errors": errors, "out_of_memory": True}
+    except Exception as e:
+        errors.append(f"pages {start + 1}-{end}: {e}")
+    return {"pages": pages, "errors": errors, "out_of_memory": False}
+
+
+def _mp_context():
+    """
+    Prefers forkserver so workers are not forked from a multi-threaded
+    Streamlit process; falls back to spawn where it is unavailable.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+_shared_pool = None
+_shared_pool_key: Optional[Tuple[int, Optional[int]]] = None
+_shared_pool_lock = threading.Lock()
+# Why worker processes cannot be used in this process, once that is known.
+_isolation_unavailable: Optional[str] = None
+
+
+def _get_pool(workers: int, max_memory_mb: Optional[int]):
+    """
+    Returns the process-wide extraction pool, starting it on first use.
+    The workers live as long as the pool, so documents do not pay for
+    process startup.
+
+    Raises:
+        RuntimeError: If worker processes cannot be started here.
+    """
+    global _shared_pool, _shared_pool_key, _isolation_unavailable
+    with _shared_pool_lock:
+        if _isolation_unavailable:
+            raise RuntimeError(_isolation_unavailable)
+        key = (workers, max_memory_mb)
+        if _shared_pool is not None and _shared_pool_key == key:
+            return _shared_pool
+        if _shared_pool is not None:
+            _shared_pool.close()
+        pool = _mp_context().Pool(workers, initializer=_init_worker, initargs=(max_memory_mb,))
+        try:
+            pool.apply_async(_worker_ready).get(timeout=WORKER_START_TIMEOUT)
+        except multiprocessing.TimeoutError:
+            pool.terminate()
+            pool.join()
+            _shared_pool = None
+            _isolation_unavailable = f"extraction workers did not start within {WORKER_START_TIMEOUT:g}s"
+            raise RuntimeError(_isolation_unavailable)
+        _shared_pool, _shared_pool_key = pool, key
+        return pool
+
+
+def _discard_pool(pool) -> None:
+    """Terminates a pool whose worker is stuck on a document; the next call starts a new one."""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is pool:
+            _shared_pool = None
+    pool.terminate()
+    pool.join()
+
+
+def _read_bytes(source: Union[str, os.PathLike, bytes, BinaryIO]) -> bytes:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as pdf_file_obj:
+            return pdf_file_obj.read()
+    return source.read()
+
+
+def _collect(result: PdfExtractionResult, chunk: dict, text_parts: List[str], limits: PdfExtractionLimits) -> bool:
+    """
+    Adds a finished chunk to the result. Returns False once extraction
+    should stop.
+    """
+    for _, page_text, seconds in chunk["pages"]:
+        result.pages_read += 1
+        result.page_seconds.append(round(seconds, 4))
+        if page_text:
+            text_parts.append(page_text)
+    result.errors.extend(chunk["errors"])
+    if chunk["out_of_memory"]:
+        result.truncation_reason = "memory"
+        return False
+    if sum(len(part) for part in text_parts) >= limits.max_chars:
+        result.truncation_reason = "char_budget"
+        return False
+    return True
+
+
+def _extract_inline(reader: pypdf.PdfReader, page_count: int, deadline: float,
+                    result: PdfExtractionResult, limits: PdfExtractionLimits) -> List[str]:
+    """Extracts pages in the calling process. Only time and size limits apply."""
+    text_parts: List[str] = []
+    for index in range(page_count):
+        if time.monotonic() > deadline:
+            result.truncation_reason = "timeout"
+            break
+        page_start = time.perf_counter()
+        try:
+            page_text = reader.pages[index].extract_text() or ""
+        except Exception as e:
+            result.errors.append(f"page {index + 1}: {e}")
+            page_text = ""
+        chunk = {"pages": [(index, page_text, time.perf_counter() - page_start)], "errors": [], "out_of_memory": False}
+        if not _collect(result, chunk, text_parts, limits):
+            break
+    return text_parts
+
+
+def _extract_isolated(data: bytes, page_count: Optional[int], deadline: float,
+                      result: PdfExtractionResult, limits: PdfExtractionLimits) -> List[str]:
+    """
+    Extracts the document in the shared worker pool. When page_count is
+    None the document has not been opened yet, and a worker opens it and
+    counts its pages first.
+
+    Page ranges are consumed in page order so early stopping keeps a clean
+    prefix of the document. Chunks still running when we stop are left to
+    finish; a timeout means a worker is stuck, so the pool is replaced.
+
+    Raises:
+        RuntimeError: If worker processes cannot be started here.
+    """
+    pool = _get_pool(limits.max_workers or os.cpu_count() or 1, limits.max_memory_mb)
+    key = uuid.uuid4().hex
+    text_parts: List[str] = []
+    try:
+        if page_count is None:
+            opened = pool.apply_async(_count_pages, (key, data)).get(timeout=max(deadline - time.monotonic(), 0))
+            if opened["error"]:
+                result.errors.append(f"could not open PDF: {opened['error']}")
+                result.truncation_reason = "memory" if opened["error"] == "out of memory" else "error"
+                return text_parts
+            result.total_pages = opened["total_pages"]
+            page_count = min(result.total_pages, limits.max_pages)
+
+        ranges = [
+            (start, min(start + limits.pages_per_chunk, page_count))
+            for start in range(0, page_count, limits.pages_per_chunk)
+        ]
+        pending = [pool.apply_async(_extract_range, (key, data, page_range)) for page_range in ranges]
+        for chunk in pending:
+            if not _collect(result, chunk.get(timeout=max(deadline - time.monotonic(), 0)), text_parts, limits):
+                break
+    except multiprocessing.TimeoutError:
+        result.truncation_reason = "timeout"
+        _discard_pool(pool)
+    return text_parts
+
+
+def extract_pdf(source: Union[str, os.PathLike, bytes, BinaryIO],
+                limits: Optional[PdfExtractionLimits] = None) -> PdfExtractionResult:
+    """
+    Extracts text from a PDF under page, time, memory and size limits.
+
+    Args:
+        source: A path, the raw bytes, or a binary stream of the PDF.
+        limits: Extraction limits. Defaults to PdfExtractionLimits().
+
+    Returns:
+        A PdfExtractionResult. Failures are reported through its
+        truncation_reason and errors instead of being raised.
+    """
+    limits = limits or PdfExtractionLimits()
+    start = time.perf_counter()
+    deadline = time.monotonic() + limits.timeout_seconds
+    result = PdfExtractionResult()
+
+    def open_inline() -> Optional[pypdf.PdfReader]:
+        try:
+            reader = pypdf.PdfReader(io.BytesIO(data))
+            result.total_pages = len(reader.pages)
+            return reader
+        except Exception as e:
+            result.errors.append(f"could not open PDF: {e}")
+            result.truncation_reason = "error"
+            return None
+
+    try:
+        data = _read_bytes(source)
+    except Exception as e:
+        result.errors.append(f"could not read PDF: {e}")
+        result.truncation_reason = "error"
+        result.elapsed_seconds = time.perf_counter() - start
+        return result
+
+    # Small files are opened here: parsing them costs less than a round trip
+    # to a worker. Larger ones are only ever opened inside the workers.
+    reader = None
+    page_count: Optional[int] = None
+    if not limits.isolate or len(data) <= limits.inline_max_bytes:
+        reader = open_inline()
+        page_count = min(result.total_pages, limits.max_pages)
+
+    text_parts: Optional[List[str]] = None
+    if limits.isolate and result.truncation_reason is None and (reader is None or page_count > limits.inline_max_pages):
+        try:
+            text_parts = _extract_isolated(data, page_count, deadline, result, limits)
+            if result.total_pages:
+                page_count = min(result.total_pages, limits.max_pages)
+        except (OSError, RuntimeError, AssertionError) as e:
+            # e.g. no process support in this environment, a daemonic parent
+            # or workers that cannot start; fall back to in-process extraction,
+            # without the memory limit.
+            result.errors.append(f"isolated extraction unavailable: {e}")
+            result.pages_read = 0
+            result.page_seconds = []
+            if reader is None:
+                reader = open_inline()
+                page_count = min(result.total_pages, limits.max_pages)
+    if text_parts is None:
+        text_parts = _extract_inline(reader, page_count, deadline, result, limits) if reader is not None else []
+
+    if result.truncation_reason is None and page_count is not None and page_count < result.total_pages:
+        result.truncation_reason = "max_pages"
+
+    result.text = "\n".join(text_parts)
+    result.elapsed_seconds = time.perf_counter() - start
+    PDF_PAGES.inc(result.pages_read)
+    if result.truncated:
+        PDF_TRUNCATIONS.inc(reason=result.truncation_reason)
+    return result
@@ -1,10 +1,16 @@
-ATS_SCORE_PROMPT = """
-You are an expert ATS (Applicant Tracking System) evaluator and hiring manager. Analyze the CV text below and provide a score based on how well it would perform in real ATS systems and human review.
+import hashlib
+import json
 
-CRITICAL: You MUST output EXACTLY in this format without any additional text, markdown, or thinking blocks:
-
-SCORE: [number between 0-100]
-SUMMARY: [2-3 sentences explaining the main strengths and weaknesses that affected the score]
+# Every analysis prompt starts with the same preamble followed by the CV, and
+# only then gives its task-specific instructions. Ollama reuses the KV cache
+# for the longest prompt prefix it has already evaluated, so the preamble is
+# shared by all analyses (LLMGenerator.warm_up evaluates it ahead of time).
+# The second call for a CV only evaluates its own instructions when it follows
+# the first on the same slot, as in sequential mode; in concurrent mode the two
+# calls occupy different slots and each evaluates the CV. Keep anything that
+# differs between prompts out of ANALYSIS_PREAMBLE.
+ANALYSIS_PREAMBLE = """
+You are an expert ATS (Applicant Tracking System) evaluator, hiring manager and CV coach. You review CVs for how well they would perform in real ATS systems and human review.
 
 EVALUATION CRITERIA:
 1. Contact Information (10 pts): Name, email, phone, location, LinkedIn/GitHub
@@ -16,21 +22,32 @@ EVALUATION CRITERIA:
 7. Keywords & Optimization (10 pts): Industry keywords, action verbs, no graphics/tables
 8. Achievements & Impact (5 pts): Specific metrics, results, numbers
 
+CV TEXT:
+---
+"""
+
+CV_PROMPT_PREFIX = ANALYSIS_PREAMBLE + """{cv_text}
+---
+"""
+
+ATS_SCORE_PROMPT = CV_PROMPT_PREFIX + """
+TASK: Score the CV above based on the evaluation criteria.
+
+CRITICAL: You MUST output EXACTLY in this format without any additional text, markdown, or thinking blocks:
+
+SCORE: [number between 0-100]
+SUMMARY: [2-3 sentences explaining the main strengths and weaknesses that affected the score]
+
 SCORING GUIDE:
 90-100: Exceptional - Ready for any ATS
 80-89: Strong - Minor improvements needed
 70-79: Good - Several areas need work
 60-69: Average - Significant improvements needed
 Below 60: Poor - Major overhaul required
-
-CV TEXT:
----
-{cv_text}
----
 """
 
-IMPROVEMENT_RECOMMENDATIONS_PROMPT = """
-You are an expert CV/Resume coach specializing in ATS optimization. Based on the CV below, provide 5 SPECIFIC and ACTIONABLE recommendations to improve this CV for Applicant Tracking Systems and human recruiters.
+IMPROVEMENT_RECOMMENDATIONS_PROMPT = CV_PROMPT_PREFIX + """
+TASK: Provide 5 SPECIFIC and ACTIONABLE recommendations to improve the CV above for Applicant Tracking Systems and human recruiters.
 
 CRITICAL: 
 - Start DIRECTLY with numbered list 1. 2. 3. etc.
@@ -44,9 +61,82 @@ IMPORTANT: Recommendations should address:
 - Enhancing clarity and impact of work experience
 - Formatting and structural improvements
 - Content gaps and missing information
+"""
 
-CV TEXT:
----
-{cv_text}
----
-"""
\ No newline at end of file
+
+FUSED_ANALYSIS_PROMPT = CV_PROMPT_PREFIX + """
+TASK: Score the CV above based on the evaluation criteria and give improvement recommendations in a single answer.
+
+CRITICAL: You MUST output EXACTLY in this format without any additional text, markdown, or thinking blocks:
+
+SCORE: [number between 0-100]
+SUMMARY: [2-3 sentences explaining the main strengths and weaknesses that affected the score]
+RECOMMENDATIONS:
+1. [specific, actionable recommendation]
+2. [specific, actionable recommendation]
+3. [specific, actionable recommendation]
+4. [specific, actionable recommendation]
+5. [specific, actionable recommendation]
+
+Recommendations must be SPECIFIC to this CV's content and focus on metrics, keywords, clarity of experience, structure, and missing information.
+"""
+
+
+JSON_ANALYSIS_PROMPT = CV_PROMPT_PREFIX + """
+TASK: Score the CV above based on the evaluation criteria and give improvement recommendations.
+
+Respond with a single JSON object with exactly these keys:
+- "score": integer between 0 and 100
+- "summary": 2-3 sentences explaining the main strengths and weaknesses that affected the score
+- "recommendations": list of 5 specific, actionable recommendations for this CV
+"""
+
+FIELD_RETRY_PROMPT = CV_PROMPT_PREFIX + """
+You evaluated the CV above, but the "{field}" field of your answer was invalid: {problem}.
+
+Respond with a JSON object containing only the key "{field}": {field_spec}.
+"""
+
+# Used by JSON mode both to describe fields in follow-up prompts and to
+# constrain Ollama's output through its `format` option.
+FIELD_DESCRIPTIONS = {
+    "score": "an integer between 0 and 100 rating how well the CV performs in ATS systems and human review",
+    "summary": "2-3 sentences explaining the main strengths and weaknesses that affected the score",
+    "recommendations": "a list of 5 specific, actionable recommendations to improve this CV",
+}
+
+ANALYSIS_JSON_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score": {"type": "integer", "minimum": 0, "maximum": 100},
+        "summary": {"type": "string"},
+        "recommendations": {"type": "array", "items": {"type": "string"}, "minItems": 1, "maxItems": 5},
+    },
+    "required": ["score", "summary", "recommendations"],
+}
+
+
+def _fingerprint_templates(templates: dict) -> str:
+    """
+    Hashes every prompt template, output schema and field description so
+    that editing any of them produces a new version and invalidates analysis
+    results cached under the old wording.
+    """
+    digest = hashlib.sha256()
+    for name in sorted(templates):
+        value = templates[name]
+        if not isinstance(value, str):
+            value = json.dumps(value, sort_keys=True)
+        digest.update(name.encode("utf-8"))
+        digest.update(value.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+# Keep this at the bottom of the module so every template above is included.
+PROMPT_VERSION = _fingerprint_templates(
+    {
+        name: value
+        for name, value in dict(globals()).items()
+        if name.endswith(("_PROMPT", "_PREFIX", "_PREAMBLE", "_SCHEMA", "_DESCRIPTIONS"))
+    }
+)
@@ -1,99 +1,883 @@
+import asyncio
+import os
+import queue
 import re
-from langchain_community.chat_models import ChatOllama
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from . import prompt_templates
+from .ats_rules import RuleScore, RuleScorer, get_rule_scorer
+from .cache import TieredCache, analysis_cache_key, get_analysis_cache
+from .compaction import CompactionResult, compact_cv_text, estimate_tokens
+from .llm_client import LLMMetricsCallback, PooledChatOllama, ollama_base_url, ollama_keep_alive
+from .metrics import RequestTrace
+from .ollama_router import OllamaRouter, get_ollama_router
+from .section_matcher import SectionMatch, SectionMatcher, get_section_matcher
+from .streaming import AnalysisStreamParser, parse_score
+from .structured_output import STRUCTURED_FIELDS, StructuredOutputStats, field_schema, run_structured_analysis
+
+# Supported generation strategies, see LLMGenerator.generate_cv_analysis.
+ANALYSIS_MODES = ("concurrent", "sequential", "fused", "json", "fast")
+DEFAULT_TIMEOUT_SECONDS = 120.0
+# Follow-up requests allowed per invalid field in "json" mode.
+DEFAULT_FIELD_RETRIES = 2
+
+DEFAULT_MODEL = "deepseek-r1:1.5b"
+# Model calls that can be mapped to their own model (see task_models_from_env);
+# JSON-mode field retries use the "json" model.
+MODEL_TASKS = ("scoring", "recommendations", "fused", "json")
+DEFAULT_MODEL_PARAMS = {
+    "temperature": 0.3,
+    "top_k": 40,
+    "top_p": 0.9,
+    "num_ctx": 2048,
+}
+
+# Text shown when no line of the CV matched a section, and how many matched
+# lines are displayed per section.
+SECTION_PLACEHOLDERS = {
+    "education": "No education information found in the CV",
+    "experience": "No work experience information found in the CV",
+    "projects": "No projects information found in the CV",
+    "skills": "No skills information found in the CV",
+}
+SECTION_LINE_LIMITS = {"skills": 8}
+
+# Context window accounting for CV compaction: tokens kept free for the
+# model's answer, and a floor so tiny num_ctx values still send some CV.
+RESERVED_OUTPUT_TOKENS = 512
+MIN_CV_TOKENS = 256
+_PROMPT_OVERHEAD_TOKENS = max(
+    estimate_tokens(template)
+    for template in (
+        prompt_templates.ATS_SCORE_PROMPT,
+        prompt_templates.IMPROVEMENT_RECOMMENDATIONS_PROMPT,
+        prompt_templates.FUSED_ANALYSIS_PROMPT,
+        prompt_templates.JSON_ANALYSIS_PROMPT,
+    )
+)
 
 class LLMGenerator:
     """
     Handles the generation of CV analysis using a local Ollama model.
     """
-    def __init__(self):
+    def __init__(
+        self,
+        cache: Optional[TieredCache] = None,
+        model: str = DEFAULT_MODEL,
+        section_matcher: Optional[SectionMatcher] = None,
+        base_url: Optional[str] = None,
+        keep_alive: Optional[Union[int, str]] = None,
+        router: Optional[OllamaRouter] = None,
+        task_models: Optional[Dict[str, str]] = None,
+        **model_params,
+    ):
         """
-        Initializes the ChatOllama model.
+        Initializes the ChatOllama model and builds the analysis chains once.
+
+        Args:
+            cache: Cache for analysis results. Defaults to the process-wide
+                analysis cache.
+            model: The Ollama model name, used for every task without an
+                entry in task_models.
+            section_matcher: Classifier for CV sections. Defaults to the
+                process-wide matcher built from the configured taxonomy.
+            base_url: The Ollama server URL. Defaults to OLLAMA_HOST /
+                OLLAMA_PORT, see llm_client.ollama_base_url.
+            keep_alive: How long Ollama keeps the model loaded between
+                requests. Defaults to SMART_CV_KEEP_ALIVE, see
+                llm_client.ollama_keep_alive.
+            router: Spreads requests over several Ollama servers. Defaults
+                to the router configured by SMART_CV_OLLAMA_ENDPOINTS unless
+                base_url is given, see ollama_router.
+            task_models: Model per task in MODEL_TASKS, e.g. a small model
+                for "scoring". Defaults to task_models_from_env().
+            **model_params: Overrides for DEFAULT_MODEL_PARAMS.
         """
-        self.llm = ChatOllama(
-            model="deepseek-r1:1.5b",
-            temperature=0.3,
-            top_k=40,
-            top_p=0.9,
-            num_ctx=2048
+        self.cache = cache if cache is not None else get_analysis_cache()
+        self.section_matcher = section_matcher if section_matcher is not None else get_section_matcher()
+        self.rule_scorer = RuleScorer(section_matcher) if section_matcher is not None else get_rule_scorer()
+        self.router = router if router is not None or base_url is not None else get_ollama_router()
+        self.base_url = base_url or (self.router.urls()[0] if self.router is not None else ollama_base_url())
+        self.keep_alive = keep_alive if keep_alive is not None else ollama_keep_alive()
+        self.max_field_retries = DEFAULT_FIELD_RETRIES
+        self.structured_stats = StructuredOutputStats()
+        self._lock = threading.Lock()
+        self._configure(
+            model,
+            {**DEFAULT_MODEL_PARAMS, **model_params},
+            task_models if task_models is not None else task_models_from_env(),
         )
-        print("LLMGenerator initialized with model 'deepseek-r1:1.5b'.")
+        print(f"LLMGenerator initialized with model '{self.model_spec}'.")
 
-    def _create_analysis_chain(self, prompt_template: str):
+    def _configure(self, model: str, model_params: dict, task_models: Dict[str, str]) -> None:
+        """
+        Builds the model clients and all chains, then swaps them in together
+        so that in-flight calls keep using a consistent configuration.
+        """
+        unknown = set(model_params) - set(DEFAULT_MODEL_PARAMS)
+        if unknown:
+            raise ValueError(f"Unsupported model parameters: {sorted(unknown)}")
+        unknown = set(task_models) - set(MODEL_TASKS)
+        if unknown:
+            raise ValueError(f"Unsupported model tasks: {sorted(unknown)}. Expected some of {MODEL_TASKS}.")
+        # Tasks mapped to the default model are dropped so they do not change the cache key.
+        task_models = {task: name for task, name in sorted(task_models.items()) if name and name != model}
+
+        # One client per distinct model.
+        llms: Dict[str, PooledChatOllama] = {}
+
+        def llm_for(task: str) -> PooledChatOllama:
+            name = task_models.get(task, model)
+            if name not in llms:
+                llms[name] = PooledChatOllama(
+                    model=name, base_url=self.base_url, keep_alive=self.keep_alive, router=self.router, **model_params
+                )
+            return llms[name]
+
+        # The default model's client always exists, even if every task is mapped elsewhere.
+        llm_for("default")
+        chains = {
+            name: self._create_analysis_chain(llm_for(name), template)
+            for name, template in (
+                ("scoring", prompt_templates.ATS_SCORE_PROMPT),
+                ("recommendations", prompt_templates.IMPROVEMENT_RECOMMENDATIONS_PROMPT),
+                ("fused", prompt_templates.FUSED_ANALYSIS_PROMPT),
+            )
+        }
+        # JSON mode: Ollama's `format` option constrains the output to the
+        # schema; follow-up chains ask for one field at a time.
+        chains["json"] = self._create_analysis_chain(
+            llm_for("json").bind(format=prompt_templates.ANALYSIS_JSON_SCHEMA), prompt_templates.JSON_ANALYSIS_PROMPT
+        )
+        for field in STRUCTURED_FIELDS:
+            chains[f"json_field:{field}"] = self._create_analysis_chain(
+                llm_for("json").bind(format=field_schema(field)), prompt_templates.FIELD_RETRY_PROMPT
+            )
+        with self._lock:
+            self.model = model
+            self.model_params = dict(model_params)
+            self.task_models = task_models
+            # Identifies the whole model setup in cache keys and traces.
+            self.model_spec = model + "".join(f" {task}={name}" for task, name in task_models.items())
+            self.llm = llms[model]
+            self.llms = llms
+            self.chains = chains
+
+    def reconfigure(self, model: Optional[str] = None, task_models: Optional[Dict[str, str]] = None,
+                    **model_params) -> None:
+        """
+        Changes the model, the per-task models and/or sampling parameters
+        (temperature, top_k, top_p, num_ctx) without restarting the process.
+        """
+        with self._lock:
+            new_model = model or self.model
+            new_task_models = task_models if task_models is not None else self.task_models
+            new_params = {**self.model_params, **model_params}
+            unchanged = (new_model == self.model and new_params == self.model_params
+                         and new_task_models == self.task_models)
+        if unchanged:
+            return
+        self._configure(new_model, new_params, new_task_models)
+        print(f"LLMGenerator reconfigured with model '{self.model_spec}' and params {self.model_params}.")
+
+    def warm_up(self, timeout: float = DEFAULT_TIMEOUT_SECONDS) -> float:
+        """
+        Loads each configured model into Ollama (on every endpoint of the
+        router) and evaluates the shared prompt preamble, so the first
+        analysis neither waits for a model to load nor evaluates the
+        preamble. The requests use the same options (notably num_ctx) as the
+        analyses; different options would make Ollama reload the model on
+        the next call.
+
+        Returns:
+            The seconds the warm-up took.
+        """
+        with self._lock:
+            model, llms = self.model_spec, list(self.llms.values())
+        urls = self.router.urls() if self.router is not None else [self.base_url]
+        # Evaluates only the preamble and stops after one token.
+        chains = [
+            self._create_analysis_chain(
+                llm.model_copy(update={"base_url": url, "router": None}).bind(num_predict=1),
+                prompt_templates.ANALYSIS_PREAMBLE,
+            )
+            for llm in llms
+            for url in urls
+        ]
+        start = time.perf_counter()
+        with RequestTrace("warm_up", model=model) as trace, \
+                ThreadPoolExecutor(max_workers=len(chains), thread_name_prefix="model-warm-up") as executor:
+            list(executor.map(
+                lambda chain: self._invoke_with_timeout(chain, {}, timeout, self._chain_config(trace, "warm_up")),
+                chains,
+            ))
+        seconds = time.perf_counter() - start
+        print(f"Model '{model}' warmed up in {seconds:.2f}s (keep_alive={self.keep_alive}).")
+        return seconds
+
+    def warm_up_in_background(self) -> threading.Thread:
+        """Runs warm_up on a daemon thread; failures are logged, not raised."""
+        def run() -> None:
+            try:
+                self.warm_up()
+            except Exception as e:
+                print(f"Model warm-up failed: {e}")
+
+        thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _snapshot(self) -> Tuple[str, dict, dict]:
+        """Returns the current (model_spec, model_params, chains) as one consistent view."""
+        with self._lock:
+            return self.model_spec, self.model_params, self.chains
+
+    @staticmethod
+    def _create_analysis_chain(llm, prompt_template: str):
         """
         Creates a LangChain chain for a given prompt template.
         """
         prompt = ChatPromptTemplate.from_template(prompt_template)
-        chain = prompt | self.llm | StrOutputParser()
+        chain = prompt | llm | StrOutputParser()
         return chain
 
-    def generate_cv_analysis(self, cv_text: str) -> dict:
+    def _cache_key(self, cv_text: str, mode: str, model: str, model_params: dict) -> str:
+        """
+        Key for the analysis cache. Includes the prompt version so that
+        editing a template invalidates results produced by the old one.
+        """
+        return analysis_cache_key(
+            cv_text,
+            prompt_templates.PROMPT_VERSION,
+            model,
+            {**model_params, "mode": mode},
+        )
+
+    def analysis_key(self, cv_text: str, mode: str = "concurrent") -> str:
+        """
+        Identifies an analysis request under the current configuration:
+        requests with the same key produce the same result. Used as the
+        cache key and to de-duplicate in-flight jobs.
+        """
+        model, model_params, _ = self._snapshot()
+        return self._cache_key(cv_text, mode, model, model_params)
+
+    @staticmethod
+    def _chain_config(trace: RequestTrace, name: str) -> dict:
+        """Run config that records the model call of chain `name` into the trace."""
+        return {"callbacks": [LLMMetricsCallback(trace, name)], "run_name": name}
+
+    def _cached_analysis(self, cache_key: Optional[str], trace: RequestTrace) -> Optional[dict]:
+        """Looks the analysis up in the cache and notes the result on the trace."""
+        if cache_key is None:
+            trace.set(cache="disabled")
+            return None
+        with trace.stage("cache_lookup"):
+            cached = self.cache.get(cache_key)
+        trace.set(cache="hit" if cached is not None else "miss")
+        return cached
+
+    def _prepare_cv_text(self, cv_text: str, model_params: dict, trace: RequestTrace) -> CompactionResult:
+        """
+        Compacts the CV text so the prompt fits the context window, leaving
+        room for the longest prompt template and the model's answer.
+        """
+        token_budget = max(model_params["num_ctx"] - _PROMPT_OVERHEAD_TOKENS - RESERVED_OUTPUT_TOKENS, MIN_CV_TOKENS)
+        with trace.stage("compaction"):
+            compaction = compact_cv_text(cv_text, token_budget)
+        trace.set(cv_tokens=compaction.original_tokens, compacted_tokens=compaction.compacted_tokens)
+        print(
+            f"CV compacted from {compaction.original_tokens} to {compaction.compacted_tokens} tokens "
+            f"({compaction.tokens_saved} saved, budget {token_budget})."
+        )
+        return compaction
+
+    def _run_chains(self, chains: dict, cv_text: str, mode: str, timeout: float,
+                    trace: RequestTrace) -> Tuple[str, str]:
+        """
+        Runs the generation step for the given mode and returns the raw
+        (score and summary, recommendations) model outputs.
+        """
+        inputs = {"cv_text": cv_text}
+
+        if mode == "fused":
+            return self._split_fused_output(
+                self._invoke_with_timeout(chains["fused"], inputs, timeout, self._chain_config(trace, "fused"))
+            )
+
+        scoring_chain = chains["scoring"]
+        recommendations_chain = chains["recommendations"]
+        scoring_config = self._chain_config(trace, "scoring")
+        recommendations_config = self._chain_config(trace, "recommendations")
+
+        if mode == "sequential":
+            return (
+                self._invoke_with_timeout(scoring_chain, inputs, timeout, scoring_config),
+                self._invoke_with_timeout(recommendations_chain, inputs, timeout, recommendations_config),
+            )
+
+        # Concurrent: send both prompts at once and wait for both results.
+        # Threads cannot be interrupted, so on timeout the pending futures are
+        # cancelled and the executor is released without waiting for them.
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cv-analysis")
+        try:
+            scoring_future = executor.submit(scoring_chain.invoke, inputs, config=scoring_config)
+            recommendations_future = executor.submit(recommendations_chain.invoke, inputs, config=recommendations_config)
+            deadline = time.monotonic() + timeout
+            score_and_summary_output = scoring_future.result(timeout=max(deadline - time.monotonic(), 0))
+            recommendations_output = recommendations_future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            raise TimeoutError(f"CV analysis did not finish within {timeout:.0f} seconds.")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return score_and_summary_output, recommendations_output
+
+    async def _arun_chains(self, chains: dict, cv_text: str, mode: str, timeout: float,
+                           trace: RequestTrace) -> Tuple[str, str]:
+        """
+        Async counterpart of _run_chains built on ainvoke. Each call gets its
+        own timeout, and timing out cancels the in-flight request.
+        """
+        inputs = {"cv_text": cv_text}
+
+        if mode == "fused":
+            fused_chain = chains["fused"]
+            output = await asyncio.wait_for(fused_chain.ainvoke(inputs, config=self._chain_config(trace, "fused")), timeout)
+            return self._split_fused_output(output)
+
+        scoring_chain = chains["scoring"]
+        recommendations_chain = chains["recommendations"]
+        scoring_config = self._chain_config(trace, "scoring")
+        recommendations_config = self._chain_config(trace, "recommendations")
+
+        if mode == "sequential":
+            score_and_summary_output = await asyncio.wait_for(scoring_chain.ainvoke(inputs, config=scoring_config), timeout)
+            recommendations_output = await asyncio.wait_for(
+                recommendations_chain.ainvoke(inputs, config=recommendations_config), timeout
+            )
+            return score_and_summary_output, recommendations_output
+
+        # gather cancels the sibling call as soon as one of them fails.
+        score_and_summary_output, recommendations_output = await asyncio.gather(
+            asyncio.wait_for(scoring_chain.ainvoke(inputs, config=scoring_config), timeout),
+            asyncio.wait_for(recommendations_chain.ainvoke(inputs, config=recommendations_config), timeout),
+        )
+        return score_and_summary_output, recommendations_output
+
+    def rule_score(self, cv_text: str) -> dict:
+        """
+        The deterministic ATS score and per-criterion breakdown of the CV
+        (see ats_rules), available in milliseconds before any model call.
+        """
+        return self.rule_scorer.score(cv_text).as_dict()
+
+    def _scored_rules(self, cv_text: str, trace: RequestTrace) -> dict:
+        with trace.stage("rule_scoring"):
+            rule_score = self.rule_score(cv_text)
+        trace.set(rule_score=rule_score["score"])
+        return rule_score
+
+    def _fast_analysis(self, cv_text: str, trace: RequestTrace) -> dict:
+        """
+        The analysis of "fast" mode, from the rule engine alone: the summary
+        and recommendations come from the criteria that lost the most points.
+        """
+        with trace.stage("rule_scoring"):
+            section_match = self.section_matcher.classify(cv_text)
+            rule_score = self.rule_scorer.score(cv_text, section_match)
+        trace.set(rule_score=rule_score.score)
+        return self._rule_analysis(rule_score, section_match)
+
+    def fast_analyses(self, cv_texts: Sequence[str]) -> List[dict]:
+        """
+        "fast" mode analyses of several CVs, scored together with one matrix
+        product (RuleScorer.score_many). Used by the batch command.
+        """
+        with RequestTrace("analysis", mode="fast", cvs=len(cv_texts)) as trace:
+            with trace.stage("rule_scoring"):
+                section_matches = [self.section_matcher.classify(cv_text) for cv_text in cv_texts]
+                rule_scores = self.rule_scorer.score_many(cv_texts, section_matches)
+            return [self._rule_analysis(rule_score, match) for rule_score, match in zip(rule_scores, section_matches)]
+
+    def _rule_analysis(self, rule_score: RuleScore, section_match: SectionMatch) -> dict:
+        advice = rule_score.advice()
+        return {
+            "score": rule_score.score,
+            "summary": rule_score.summary(),
+            "recommendations": "\n".join(f"{index}. {text}" for index, text in enumerate(advice, start=1)),
+            "sections": self._format_sections(section_match),
+            "section_scores": section_match.scores,
+            "rule_score": rule_score.as_dict(),
+        }
+
+    @staticmethod
+    def _with_rule_score(analysis: dict, rule_score: dict) -> dict:
+        """Adds the rule score to a cached analysis stored before it existed."""
+        return analysis if "rule_score" in analysis else {**analysis, "rule_score": rule_score}
+
+    def _check_mode(self, mode: str) -> None:
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unsupported analysis mode '{mode}'. Expected one of {ANALYSIS_MODES}.")
+
+    def generate_cv_analysis(
+        self,
+        cv_text: str,
+        use_cache: bool = True,
+        mode: str = "concurrent",
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> dict:
         """
         Generates a complete analysis of the given CV text with robust parsing.
+
+        Results are served from the analysis cache when the same CV was
+        already analyzed with the same prompts, model and sampling params.
+
+        Args:
+            cv_text: The extracted CV text.
+            use_cache: Whether to read from and write to the analysis cache.
+            mode: "concurrent" sends the scoring and recommendations prompts
+                at the same time (two Ollama slots, each evaluating the CV),
+                "sequential" sends them one after the other (the second reuses
+                the first one's cached CV prefix), "fused" asks for everything in a single generation, and
+                "json" asks for a schema-constrained JSON answer and re-asks
+                only for fields that come back missing or invalid. "fast"
+                skips the model and returns the rule-based analysis.
+            timeout: Maximum seconds to wait for each model call.
         """
-        print("Generating CV analysis...")
-        
-        # Truncate CV text if too long to avoid context issues
-        if len(cv_text) > 2500:
-            cv_text = cv_text[:2500] + "... [truncated]"
-        
-        scoring_chain = self._create_analysis_chain(prompt_templates.ATS_SCORE_PROMPT)
-        recommendations_chain = self._create_analysis_chain(prompt_templates.IMPROVEMENT_RECOMMENDATIONS_PROMPT)
+        self._check_mode(mode)
+        model, model_params, chains = self._snapshot()
+        with RequestTrace("analysis", mode=mode, model=model) as trace:
+            if mode == "fast":
+                return self._fast_analysis(cv_text, trace)
+            rule_score = self._scored_rules(cv_text, trace)
+            cache_key = self._cache_key(cv_text, mode, model, model_params) if use_cache else None
+            cached = self._cached_analysis(cache_key, trace)
+            if cached is not None:
+                print("CV analysis served from cache.")
+                return self._with_rule_score(cached, rule_score)
+
+            print(f"Generating CV analysis ({mode} mode)...")
+            start = time.perf_counter()
+
+            compaction = self._prepare_cv_text(cv_text, model_params, trace)
+            cv_text = compaction.text
+            if mode == "json":
+                with trace.stage("generation"):
+                    analysis = self._run_structured(chains, cv_text, timeout, trace)
+            else:
+                with trace.stage("generation"):
+                    score_and_summary_output, recommendations_output = self._run_chains(
+                        chains, cv_text, mode, timeout, trace
+                    )
+                with trace.stage("output_parsing"):
+                    analysis = self._build_analysis(cv_text, score_and_summary_output, recommendations_output)
+            analysis["compaction"] = compaction.stats()
+            analysis["rule_score"] = rule_score
 
-        score_and_summary_output = scoring_chain.invoke({"cv_text": cv_text})
-        recommendations_output = recommendations_chain.invoke({"cv_text": cv_text})
+            print(f"CV analysis completed successfully in {time.perf_counter() - start:.1f}s.")
+            if cache_key is not None:
+                self.cache.set(cache_key, analysis)
+            return analysis
+
+    async def agenerate_cv_analysis(
+        self,
+        cv_text: str,
+        use_cache: bool = True,
+        mode: str = "concurrent",
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> dict:
+        """
+        Async version of generate_cv_analysis. See that method for arguments.
+        """
+        self._check_mode(mode)
+        model, model_params, chains = self._snapshot()
+        with RequestTrace("analysis", mode=mode, model=model) as trace:
+            if mode == "fast":
+                return self._fast_analysis(cv_text, trace)
+            rule_score = self._scored_rules(cv_text, trace)
+            cache_key = self._cache_key(cv_text, mode, model, model_params) if use_cache else None
+            cached = self._cached_analysis(cache_key, trace)
+            if cached is not None:
+                print("CV analysis served from cache.")
+                return self._with_rule_score(cached, rule_score)
+
+            print(f"Generating CV analysis ({mode} mode, async)...")
+            start = time.perf_counter()
+
+            compaction = self._prepare_cv_text(cv_text, model_params, trace)
+            cv_text = compaction.text
+            if mode == "json":
+                with trace.stage("generation"):
+                    analysis = await asyncio.to_thread(self._run_structured, chains, cv_text, timeout, trace)
+            else:
+                with trace.stage("generation"):
+                    score_and_summary_output, recommendations_output = await self._arun_chains(
+                        chains, cv_text, mode, timeout, trace
+                    )
+                with trace.stage("output_parsing"):
+                    analysis = self._build_analysis(cv_text, score_and_summary_output, recommendations_output)
+            analysis["compaction"] = compaction.stats()
+            analysis["rule_score"] = rule_score
+
+            print(f"CV analysis completed successfully in {time.perf_counter() - start:.1f}s.")
+            if cache_key is not None:
+                self.cache.set(cache_key, analysis)
+            return analysis
+
+    def _stream_sources(self, chains: dict, mode: str) -> List[Tuple[str, object]]:
+        """Returns the (section, chain) pairs to stream for the given mode."""
+        if mode == "fused":
+            return [("fused", chains["fused"])]
+        return [("scoring", chains["scoring"]), ("recommendations", chains["recommendations"])]
+
+    def replay_events(self, analysis: dict, cached: bool = True) -> Iterator[dict]:
+        """
+        Emits the events of a finished analysis (cached, or from JSON mode
+        which cannot be parsed incrementally) so callers need one code path.
+        """
+        yield {"type": "score", "score": analysis["score"]}
+        yield {"type": "summary_token", "text": analysis["summary"]}
+        for index, line in enumerate(filter(None, analysis["recommendations"].split('\n')), start=1):
+            yield {"type": "recommendation", "index": index, "text": re.sub(r'^\d+\.\s*', '', line)}
+        yield {"type": "done", "analysis": analysis, "cached": cached}
 
-        # Parse outputs
+    def _finish_stream(self, parsers: Dict[str, AnalysisStreamParser], cv_text: str) -> dict:
+        """Builds the final analysis from the complete raw outputs."""
+        if "fused" in parsers:
+            score_and_summary_output, recommendations_output = self._split_fused_output(parsers["fused"].raw_output)
+        else:
+            score_and_summary_output = parsers["scoring"].raw_output
+            recommendations_output = parsers["recommendations"].raw_output
+        return self._build_analysis(cv_text, score_and_summary_output, recommendations_output)
+
+    def stream_cv_analysis(
+        self,
+        cv_text: str,
+        use_cache: bool = True,
+        mode: str = "concurrent",
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> Iterator[dict]:
+        """
+        Streams the analysis as incremental events instead of waiting for the
+        full generations to finish.
+
+        <think> blocks are dropped on the fly. The score is emitted as soon as
+        the SCORE: line is complete, followed by summary tokens and each
+        recommendation as its line finishes. The last event is
+        {"type": "done", "analysis": dict} holding the same result that
+        generate_cv_analysis would return.
+
+        Args:
+            See generate_cv_analysis. In "concurrent" mode events from both
+            prompts are interleaved as they arrive.
+        """
+        self._check_mode(mode)
+        snapshot = self._snapshot()
+        with RequestTrace("stream", mode=mode, model=snapshot[0]) as trace:
+            for event in self._stream_events(snapshot, cv_text, use_cache, mode, timeout, trace):
+                if event["type"] == "rule_score":
+                    trace.mark("rule_score_seconds")
+                elif event["type"] == "score":
+                    trace.mark("first_score_seconds")
+                yield event
+
+    def _stream_events(self, snapshot: Tuple[str, dict, dict], cv_text: str, use_cache: bool, mode: str,
+                       timeout: float, trace: RequestTrace) -> Iterator[dict]:
+        """Produces the events of stream_cv_analysis from the request's _snapshot()."""
+        if mode == "fast":
+            analysis = self._fast_analysis(cv_text, trace)
+            yield {"type": "rule_score", **analysis["rule_score"]}
+            yield from self.replay_events(analysis, cached=False)
+            return
+        rule_score = self._scored_rules(cv_text, trace)
+        yield {"type": "rule_score", **rule_score}
+
+        model, model_params, chains = snapshot
+        cache_key = self._cache_key(cv_text, mode, model, model_params) if use_cache else None
+        cached = self._cached_analysis(cache_key, trace)
+        if cached is not None:
+            yield from self.replay_events(self._with_rule_score(cached, rule_score))
+            return
+
+        compaction = self._prepare_cv_text(cv_text, model_params, trace)
+        cv_text = compaction.text
+
+        if mode == "json":
+            with trace.stage("generation"):
+                analysis = self._run_structured(chains, cv_text, timeout, trace)
+            analysis["compaction"] = compaction.stats()
+            analysis["rule_score"] = rule_score
+            if cache_key is not None:
+                self.cache.set(cache_key, analysis)
+            yield from self.replay_events(analysis, cached=False)
+            return
+
+        inputs = {"cv_text": cv_text}
+        sources = self._stream_sources(chains, mode)
+        parsers = {section: AnalysisStreamParser(section) for section, _ in sources}
+        deadline = time.monotonic() + timeout
+
+        if mode != "concurrent":
+            for section, chain in sources:
+                parser = parsers[section]
+                for chunk in chain.stream(inputs, config=self._chain_config(trace, section)):
+                    yield from parser.feed(chunk)
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"CV analysis did not finish within {timeout:.0f} seconds.")
+                yield from parser.finish()
+        else:
+            # Each chain is consumed on its own thread; events are merged
+            # through a queue. Setting `stop` makes the producers close their
+            # streams, which aborts the HTTP requests to Ollama.
+            events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+            stop = threading.Event()
+
+            def produce(section: str, chain) -> None:
+                try:
+                    for chunk in chain.stream(inputs, config=self._chain_config(trace, section)):
+                        if stop.is_set():
+                            return
+                        events.put(("chunk", (section, chunk)))
+                    events.put(("end", section))
+                except Exception as e:
+                    events.put(("error", e))
+
+            for section, chain in sources:
+                threading.Thread(target=produce, args=(section, chain), daemon=True).start()
+
+            remaining = len(sources)
+            try:
+                while remaining:
+                    try:
+                        kind, payload = events.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        raise TimeoutError(f"CV analysis did not finish within {timeout:.0f} seconds.")
+                    if kind == "error":
+                        raise payload
+                    if kind == "end":
+                        remaining -= 1
+                        yield from parsers[payload].finish()
+                    else:
+                        section, chunk = payload
+                        yield from parsers[section].feed(chunk)
+            finally:
+                stop.set()
+
+        with trace.stage("output_parsing"):
+            analysis = self._finish_stream(parsers, cv_text)
+        analysis["compaction"] = compaction.stats()
+        analysis["rule_score"] = rule_score
+        if cache_key is not None:
+            self.cache.set(cache_key, analysis)
+        yield {"type": "done", "analysis": analysis, "cached": False}
+
+    async def astream_cv_analysis(
+        self,
+        cv_text: str,
+        use_cache: bool = True,
+        mode: str = "concurrent",
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> AsyncIterator[dict]:
+        """
+        Async version of stream_cv_analysis built on astream. Pending streams
+        are cancelled if the consumer stops early or the timeout expires.
+        """
+        self._check_mode(mode)
+        snapshot = self._snapshot()
+        with RequestTrace("stream", mode=mode, model=snapshot[0]) as trace:
+            events = self._astream_events(snapshot, cv_text, use_cache, mode, timeout, trace)
+            try:
+                async for event in events:
+                    if event["type"] == "rule_score":
+                        trace.mark("rule_score_seconds")
+                    elif event["type"] == "score":
+                        trace.mark("first_score_seconds")
+                    yield event
+            finally:
+                await events.aclose()
+
+    async def _astream_events(self, snapshot: Tuple[str, dict, dict], cv_text: str, use_cache: bool, mode: str,
+                              timeout: float, trace: RequestTrace) -> AsyncIterator[dict]:
+        """Produces the events of astream_cv_analysis from the request's _snapshot()."""
+        if mode == "fast":
+            analysis = self._fast_analysis(cv_text, trace)
+            yield {"type": "rule_score", **analysis["rule_score"]}
+            for event in self.replay_events(analysis, cached=False):
+                yield event
+            return
+        rule_score = self._scored_rules(cv_text, trace)
+        yield {"type": "rule_score", **rule_score}
+
+        model, model_params, chains = snapshot
+        cache_key = self._cache_key(cv_text, mode, model, model_params) if use_cache else None
+        cached = self._cached_analysis(cache_key, trace)
+        if cached is not None:
+            for event in self.replay_events(self._with_rule_score(cached, rule_score)):
+                yield event
+            return
+
+        compaction = self._prepare_cv_text(cv_text, model_params, trace)
+        cv_text = compaction.text
+
+        if mode == "json":
+            with trace.stage("generation"):
+                analysis = await asyncio.to_thread(self._run_structured, chains, cv_text, timeout, trace)
+            analysis["compaction"] = compaction.stats()
+            analysis["rule_score"] = rule_score
+            if cache_key is not None:
+                self.cache.set(cache_key, analysis)
+            for event in self.replay_events(analysis, cached=False):
+                yield event
+            return
+
+        inputs = {"cv_text": cv_text}
+        sources = self._stream_sources(chains, mode)
+        parsers = {section: AnalysisStreamParser(section) for section, _ in sources}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def produce(section: str, chain) -> None:
+            try:
+                async for chunk in chain.astream(inputs, config=self._chain_config(trace, section)):
+                    await events.put(("chunk", (section, chunk)))
+                await events.put(("end", section))
+            except Exception as e:
+                await events.put(("error", e))
+
+        if mode == "concurrent":
+            tasks = [asyncio.create_task(produce(section, chain)) for section, chain in sources]
+        else:
+            async def produce_in_order() -> None:
+                for section, chain in sources:
+                    await produce(section, chain)
+            tasks = [asyncio.create_task(produce_in_order())]
+
+        remaining = len(sources)
+        try:
+            while remaining:
+                try:
+                    kind, payload = await asyncio.wait_for(events.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"CV analysis did not finish within {timeout:.0f} seconds.")
+                if kind == "error":
+                    raise payload
+                if kind == "end":
+                    remaining -= 1
+                    for event in parsers[payload].finish():
+                        yield event
+                else:
+                    section, chunk = payload
+                    for event in parsers[section].feed(chunk):
+                        yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        with trace.stage("output_parsing"):
+            analysis = self._finish_stream(parsers, cv_text)
+        analysis["compaction"] = compaction.stats()
+        analysis["rule_score"] = rule_score
+        if cache_key is not None:
+            self.cache.set(cache_key, analysis)
+        yield {"type": "done", "analysis": analysis, "cached": False}
+
+    def _build_analysis(self, cv_text: str, score_and_summary_output: str, recommendations_output: str) -> dict:
+        """
+        Parses the raw model outputs into the analysis result dictionary.
+        """
         score, summary = self._parse_score_and_summary(score_and_summary_output)
         recommendations = self._clean_recommendations_output(recommendations_output)
-        
-        # Extract key sections from CV - SIMPLIFIED AND RELIABLE
-        sections = self._extract_cv_sections_simple(cv_text)
+        return self._assemble_analysis(cv_text, score, summary, recommendations)
 
-        print("CV analysis completed successfully.")
-        
-        analysis = {
+    def _assemble_analysis(self, cv_text: str, score: int, summary: str, recommendations: str) -> dict:
+        """
+        Combines the parsed model fields with the section breakdown.
+        """
+        # Extract key sections from CV with the compiled keyword matcher
+        section_match = self.section_matcher.classify(cv_text)
+        sections = self._format_sections(section_match)
+
+        return {
             "score": score,
             "summary": summary,
             "recommendations": recommendations,
-            "sections": sections
+            "sections": sections,
+            "section_scores": section_match.scores
         }
+
+    def _invoke_with_timeout(self, chain, inputs: dict, timeout: float, config: Optional[dict] = None) -> str:
+        """Invokes a chain, giving up after timeout seconds."""
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cv-analysis")
+        try:
+            return executor.submit(chain.invoke, inputs, config=config).result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"CV analysis did not finish within {timeout:.0f} seconds.")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_structured(self, chains: dict, cv_text: str, timeout: float, trace: RequestTrace) -> dict:
+        """
+        JSON mode: one schema-constrained generation, then short follow-up
+        requests for just the fields that failed validation, instead of
+        rerunning the whole analysis.
+        """
+        values, report = run_structured_analysis(
+            lambda name, inputs: self._invoke_with_timeout(chains[name], inputs, timeout, self._chain_config(trace, name)),
+            cv_text,
+            self.max_field_retries,
+            self.structured_stats,
+        )
+        if report["retries"]:
+            print(f"JSON mode needed {report['retries']} field retries ({', '.join(report['retried_fields'])}).")
+
+        if values.get("recommendations"):
+            numbered = "\n".join(f"{index}. {item}" for index, item in enumerate(values["recommendations"], start=1))
+            recommendations = self._clean_recommendations_output(numbered)
+        else:
+            recommendations = "Model could not generate improvement recommendations for this CV."
+
+        analysis = self._assemble_analysis(
+            cv_text,
+            values.get("score", 0),
+            values.get("summary", "Could not parse summary from model output."),
+            recommendations,
+        )
+        analysis["structured_output"] = report
         return analysis
 
+    def _split_fused_output(self, output: str) -> Tuple[str, str]:
+        """
+        Splits a fused model output into its score/summary part and its
+        recommendations part, so each can go through the regular parsers.
+        """
+        clean_output = re.sub(r'<think>.*?</think>', '', output, flags=re.DOTALL)
+        parts = re.split(r'RECOMMENDATIONS:', clean_output, maxsplit=1, flags=re.IGNORECASE)
+        if len(parts) == 2:
+            return parts[0], parts[1]
+        return clean_output, clean_output
+
     def _parse_score_and_summary(self, output: str) -> tuple:
         """
         Parse score and summary from the model output.
         """
-        score = 0
         summary = "Could not parse summary from model output."
         
         # Remove thinking blocks
         clean_output = re.sub(r'<think>.*?</think>', '', output, flags=re.DOTALL)
         clean_output = re.sub(r'</?think>', '', clean_output)
         
-        # Extract score
-        score_patterns = [
-            r'SCORE:\s*(\d+)',
-            r'Score:\s*(\d+)',
-            r'ATS Score:\s*(\d+)',
-            r'(\d+)\s*\/\s*100'
-        ]
-        
-        for pattern in score_patterns:
-            match = re.search(pattern, clean_output, re.IGNORECASE)
-            if match:
-                try:
-                    score = int(match.group(1))
-                    break
-                except ValueError:
-                    continue
+        # Extract score, the same way the streamed score is
+        score = parse_score(clean_output) or 0
         
         # Extract summary
         summary_patterns = [
-            r'SUMMARY:\s*(.*?)(?=CRITERIA:|KEYWORDS:|SCORE:|$)',
-            r'Summary:\s*(.*?)(?=CRITERIA:|KEYWORDS:|SCORE:|$)',
+            r'SUMMARY:\s*(.*?)(?=CRITERIA:|KEYWORDS:|SCORE:|RECOMMENDATIONS:|$)',
+            r'Summary:\s*(.*?)(?=CRITERIA:|KEYWORDS:|SCORE:|RECOMMENDATIONS:|$)',
             r'SUMMARY:\s*(.*)'
         ]
         
@@ -150,53 +934,68 @@ class LLMGenerator:
         """
         SIMPLIFIED and RELIABLE section extraction that actually works.
         """
-        # Initialize sections with empty content
-        sections = {
-            "education": "No education information found in the CV",
-            "experience": "No work experience information found in the CV", 
-            "projects": "No projects information found in the CV",
-            "skills": "No skills information found in the CV"
-        }
-        
-        # Split into lines
-        lines = [line.strip() for line in cv_text.split('\n') if line.strip()]
-        
-        # SIMPLE keyword-based content extraction
-        education_content = []
-        experience_content = []
-        projects_content = []
-        skills_content = []
-        
-        for line in lines:
-            line_lower = line.lower()
-            
-            # Education keywords
-            if any(keyword in line_lower for keyword in ['university', 'college', 'degree', 'bachelor', 'master', 'phd', 'gpa', 'education', 'faculty']):
-                education_content.append(line)
-            
-            # Experience keywords  
-            elif any(keyword in line_lower for keyword in ['experience', 'work', 'employment', 'intern', 'engineer', 'developer', 'analyst', 'manager', 'position', 'role']):
-                experience_content.append(line)
-            
-            # Projects keywords
-            elif any(keyword in line_lower for keyword in ['project', 'developed', 'created', 'built', 'implemented', 'system', 'application', 'portfolio']):
-                projects_content.append(line)
-            
-            # Skills keywords
-            elif any(keyword in line_lower for keyword in ['skill', 'python', 'java', 'sql', 'machine learning', 'deep learning', 'computer vision', 'nlp', 'tensorflow', 'pytorch', 'programming', 'framework']):
-                skills_content.append(line)
-        
-        # Format the sections with found content
-        if education_content:
-            sections["education"] = "• " + "\n• ".join(education_content[:6])
-        
-        if experience_content:
-            sections["experience"] = "• " + "\n• ".join(experience_content[:6])
-        
-        if projects_content:
-            sections["projects"] = "• " + "\n• ".join(projects_content[:6])
-        
-        if skills_content:
-            sections["skills"] = "• " + "\n• ".join(skills_content[:8])
-        
-        return sections
\ No newline at end of file
+        return self._format_sections(self.section_matcher.classify(cv_text))
+
+    def _format_sections(self, section_match: SectionMatch) -> dict:
+        """
+        Formats the lines matched for each section as bullet lists for display.
+        """
+        sections = {}
+        for section, lines in section_match.lines.items():
+            if lines:
+                limit = SECTION_LINE_LIMITS.get(section, 6)
+                sections[section] = "• " + "\n• ".join(lines[:limit])
+            else:
+                sections[section] = SECTION_PLACEHOLDERS.get(
+                    section, f"No {section} information found in the CV"
+                )
+        return sections
+
+
+def task_models_from_env() -> Dict[str, str]:
+    """
+    Reads per-task models from SMART_CV_<TASK>_MODEL, e.g.
+    SMART_CV_SCORING_MODEL=deepseek-r1:1.5b and
+    SMART_CV_RECOMMENDATIONS_MODEL=deepseek-r1:7b.
+    """
+    task_models = {}
+    for task in MODEL_TASKS:
+        name = os.getenv(f"SMART_CV_{task.upper()}_MODEL", "").strip()
+        if name:
+            task_models[task] = name
+    return task_models
+
+
+_shared_generator: Optional[LLMGenerator] = None
+_shared_generator_lock = threading.Lock()
+_warm_up_started = False
+
+
+def get_llm_generator() -> LLMGenerator:
+    """
+    Returns the process-wide LLMGenerator, creating it on first use.
+
+    Sharing one instance across Streamlit sessions means the client, the
+    compiled chains and the pooled HTTP connections are set up only once.
+    Use LLMGenerator.reconfigure to change the model at runtime.
+    """
+    global _shared_generator
+    with _shared_generator_lock:
+        if _shared_generator is None:
+            _shared_generator = LLMGenerator()
+        return _shared_generator
+
+
+def warm_up_on_startup() -> Optional[threading.Thread]:
+    """
+    Startup hook: warms up the process-wide generator's model in the
+    background, once per process. Disabled with SMART_CV_WARMUP=0.
+    """
+    global _warm_up_started
+    if os.getenv("SMART_CV_WARMUP", "1").strip().lower() in ("0", "false", "no", "off"):
+        return None
+    with _shared_generator_lock:
+        if _warm_up_started:
+            return None
+        _warm_up_started = True
+    return get_llm_generator().warm_up_in_background()
@@ -0,0 +1,133 @@
+"""
+Exportable reports of a finished analysis: JSON, and a plain text PDF
+written directly (Helvetica, A4) so no PDF library is needed. Both are
+built from the stored analysis; nothing is sent to the model again.
+"""
+import json
+import textwrap
+import zlib
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+# Average Helvetica glyph width as a share of the font size, for line wrapping.
+_AVERAGE_CHAR_WIDTH = 0.5
+
+SECTION_TITLES = {
+    "education": "Education",
+    "experience": "Work Experience",
+    "projects": "Projects & Achievements",
+    "skills": "Skills & Competencies",
+}
+# Characters outside WinAnsiEncoding that analyses commonly contain.
+_PDF_SUBSTITUTES = str.maketrans({"−": "-", "→": "->", "✓": "v", "\t": "    "})
+
+
+def build_report(analysis: dict, file_name: str, file_hash: str, mode: str, generated_at: Optional[str] = None) -> dict:
+    """
+    Wraps an analysis with what it was produced from.
+
+    Args:
+        analysis: The analysis dict (score, summary, recommendations, sections, ...).
+        file_name: Name of the uploaded file.
+        file_hash: SHA-256 of the uploaded file.
+        mode: The analysis mode it ran in.
+        generated_at: ISO timestamp; defaults to now (UTC).
+
+    Returns:
+        The report dict that report_json and report_pdf export.
+    """
+    return {
+        "file_name": file_name,
+        "file_hash": file_hash,
+        "mode": mode,
+        "generated_at": generated_at or datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "analysis": analysis,
+    }
+
+
+def report_json(report: dict) -> bytes:
+    """The report as indented UTF-8 JSON."""
+    return json.dumps(report, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _report_lines(report: dict) -> List[Tuple[str, int, str]]:
+    """The report as (font, size, text) lines, before wrapping."""
+    analysis = report["analysis"]
+    lines = [
+        ("F2", 18, "CV Analysis Report"),
+        ("F1", 10, f"File: {report['file_name']}"),
+        ("F1", 10, f"Analyzed: {report['generated_at']} ({report['mode']} mode)"),
+        ("F1", 10, ""),
+        ("F2", 14, f"ATS Score: {analysis['score']}/100"),
+        ("F1", 10, ""),
+        ("F2", 13, "Executive Summary"),
+    ]
+    lines += [("F1", 10, line) for line in analysis["summary"].split("\n")]
+    lines += [("F1", 10, ""), ("F2", 13, "Recommendations")]
+    lines += [("F1", 10, line) for line in analysis["recommendations"].split("\n") if line.strip()]
+
+    rule_score = analysis.get("rule_score")
+    if rule_score:
+        lines += [("F1", 10, ""), ("F2", 13, f"Rule-Based Check: {rule_score['score']}/100")]
+        for criterion in rule_score["criteria"].values():
+            lines.append(("F1", 10, f"{criterion['label']}: {criterion['points']:g}/{criterion['max_points']}"))
+
+    for section, text in analysis.get("sections", {}).items():
+        lines += [("F1", 10, ""), ("F2", 13, SECTION_TITLES.get(section, section.title()))]
+        lines += [("F1", 10, line) for line in text.split("\n")]
+    return lines
+
+
+def _pdf_string(text: str) -> bytes:
+    encoded = text.translate(_PDF_SUBSTITUTES).encode("cp1252", errors="replace")
+    return b"(" + encoded.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _paginate(lines: List[Tuple[str, int, str]]) -> List[bytes]:
+    """Wraps the lines to the page width and returns one content stream per page."""
+    pages: List[List[bytes]] = [[]]
+    y = PAGE_HEIGHT - MARGIN
+    for font, size, text in lines:
+        width = int((PAGE_WIDTH - 2 * MARGIN) / (size * _AVERAGE_CHAR_WIDTH))
+        leading = size * 1.4
+        for wrapped in textwrap.wrap(text, width, subsequent_indent="  ") or [""]:
+            if y - leading < MARGIN:
+                pages.append([])
+                y = PAGE_HEIGHT - MARGIN
+            y -= leading
+            pages[-1].append(b"BT /%s %d Tf %d %.1f Td %s Tj ET" % (
+                font.encode(), size, MARGIN, y, _pdf_string(wrapped)))
+    return [b"\n".join(commands) for commands in pages]
+
+
+def report_pdf(report: dict) -> bytes:
+    """The report as a PDF document."""
+    contents = _paginate(_report_lines(report))
+    first_page = 5
+    page_ids = [first_page + 2 * index for index in range(len(contents))]
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % page for page in page_ids), len(page_ids)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    for page, content in zip(page_ids, contents):
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % (PAGE_WIDTH, PAGE_HEIGHT, page + 1)
+        )
+        stream = zlib.compress(content)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    output = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
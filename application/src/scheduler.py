@@ -0,0 +1,495 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .metrics import JOBS, JOBS_RUNNING, QUEUE_DEPTH, QUEUE_WAIT_SECONDS
+from .rag_pipeline import ANALYSIS_MODES, DEFAULT_TIMEOUT_SECONDS, LLMGenerator, get_llm_generator
+
+# Lower values are served first; jobs of equal priority are served in order.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+# Ollama requests in flight at once. Match it to what the Ollama server runs
+# in parallel (OLLAMA_NUM_PARALLEL); more only make every job slower.
+DEFAULT_WORKERS = int(os.getenv("SMART_CV_WORKERS") or os.getenv("OLLAMA_NUM_PARALLEL") or 2)
+# Ollama requests a job of each mode has in flight at once; 1 if not listed.
+# Concurrent mode sends the scoring and recommendations prompts together.
+MODE_SLOTS = {"concurrent": 2}
+# Jobs allowed to wait; beyond this new jobs are rejected right away.
+DEFAULT_MAX_QUEUE = int(os.getenv("SMART_CV_MAX_QUEUE", 32))
+# Service time assumed for ETAs until a job of that mode has finished.
+INITIAL_SERVICE_SECONDS = 30.0
+# Weight of the latest job in the moving average of service times.
+SERVICE_TIME_SMOOTHING = 0.3
+# Jobs remembered for lookup by id (e.g. by the HTTP API) after they ended.
+JOB_HISTORY = int(os.getenv("SMART_CV_JOB_HISTORY", 1000))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class QueueFullError(RuntimeError):
+    """Raised by JobScheduler.submit when the queue is at its maximum depth."""
+    def __init__(self, depth: int, retry_after: float):
+        super().__init__(f"The analysis queue is full ({depth} jobs waiting). Try again in about {max(retry_after, 1):.0f}s.")
+        self.depth = depth
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    One analysis request as seen by its callers.
+
+    The worker publishes the stream events of the analysis as they are
+    produced; every subscriber (including those attached by de-duplication)
+    replays them from the start with iter_events.
+    """
+    def __init__(self, scheduler: "JobScheduler", key: str, cv_text: str, mode: str,
+                 priority: int, use_cache: bool, timeout: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.cv_text: Optional[str] = cv_text
+        self.mode = mode
+        self.priority = priority
+        self.use_cache = use_cache
+        self.timeout = timeout
+        self.status = QUEUED
+        self.result: Optional[dict] = None
+        # The rule-based score (see ats_rules), set on submit so callers can
+        # show it while the job waits for a worker.
+        self.rule_score: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+        self.subscribers = 1
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._scheduler = scheduler
+        self._events: List[dict] = []
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def _set_running(self) -> None:
+        with self._cond:
+            self.status = RUNNING
+            self.started_at = time.monotonic()
+            self._cond.notify_all()
+
+    def _publish(self, event: dict) -> None:
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def _finish(self, status: str, result: Optional[dict] = None, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = time.monotonic()
+            self.cv_text = None
+            self._cond.notify_all()
+
+    def wait_started(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until a worker picked the job up (or it ended). Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.status != QUEUED, timeout)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job has ended. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+    def iter_events(self, heartbeat: Optional[float] = None) -> Iterator[Optional[dict]]:
+        """
+        Yields the analysis events from the beginning, blocking for new ones
+        until the job ends.
+
+        Args:
+            heartbeat: If set, yields None after this many seconds without a
+                new event, so the consumer can check whether it still has a
+                reader.
+
+        Raises:
+            The analysis error if the job failed, or CancelledError.
+        """
+        index = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: index < len(self._events) or self.done, heartbeat):
+                    pending, finished = None, False
+                else:
+                    pending = self._events[index:]
+                    finished = self.done
+            if pending is None:
+                yield None
+                continue
+            for event in pending:
+                yield event
+            index += len(pending)
+            if finished and index >= len(self._events):
+                break
+        if self.error is not None:
+            raise self.error
+
+    def position(self) -> Optional[int]:
+        """Jobs ahead of this one in the queue (0 = next), or None once it has started."""
+        return self._scheduler.position(self)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Estimated seconds until the result is ready, or None once the job has ended."""
+        return self._scheduler.eta_seconds(self)
+
+    def cancel(self) -> bool:
+        """Withdraws this caller's interest; see JobScheduler.cancel."""
+        return self._scheduler.cancel(self)
+
+
+class JobScheduler:
+    """
+    Process-wide admission control in front of the LLM.
+
+    Worker threads run analyses from a priority queue while their model
+    calls fit in `workers` Ollama slots (a concurrent-mode job takes two, see
+    MODE_SLOTS), so the Ollama server never sees more requests than it can
+    serve. A job that does not fit yet holds the head of the queue until
+    enough slots are free, so jobs still start in priority order.
+    Identical requests that are already queued or running share one job,
+    cached results bypass the queue, and once max_queue jobs are waiting new
+    submissions are rejected with QueueFullError instead of piling up and
+    timing out.
+    """
+    def __init__(self, generator: Optional[LLMGenerator] = None,
+                 workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self._generator = generator
+        self.workers = workers
+        self.max_queue = max_queue
+        self._heap: List[Tuple[int, int, Job]] = []
+        self._queued = 0
+        self._sequence = itertools.count()
+        self._inflight: Dict[str, Job] = {}
+        self._running: Set[Job] = set()
+        self._slots_in_use = 0
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._service_seconds: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    @property
+    def generator(self) -> LLMGenerator:
+        return self._generator if self._generator is not None else get_llm_generator()
+
+    def _remember(self, job: Job) -> None:
+        # Called with the lock held. Forgets the oldest ended jobs first.
+        self._jobs[job.id] = job
+        excess = len(self._jobs) - JOB_HISTORY
+        for job_id in [job_id for job_id, old in self._jobs.items() if old.done][:max(excess, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns a queued, running or recently ended job by id."""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def _start_workers(self) -> None:
+        # Called with the lock held; threads start on the first real job.
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f"cv-job-worker-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(
+        self,
+        cv_text: str,
+        mode: str = "concurrent",
+        priority: int = PRIORITY_NORMAL,
+        use_cache: bool = True,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> Job:
+        """
+        Queues an analysis and returns its job immediately.
+
+        Args:
+            cv_text: The extracted CV text.
+            mode: The analysis mode, see LLMGenerator.generate_cv_analysis.
+            priority: PRIORITY_HIGH, PRIORITY_NORMAL or PRIORITY_LOW.
+            use_cache: Whether to read from and write to the analysis cache.
+            timeout: Maximum seconds for each model call once running.
+
+        Returns:
+            The job; an existing one when the same analysis is in flight.
+
+        Raises:
+            QueueFullError: If max_queue jobs are already waiting.
+            RuntimeError: If the scheduler has been shut down.
+        """
+        if mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unsupported analysis mode '{mode}'. Expected one of {ANALYSIS_MODES}.")
+        generator = self.generator
+        key = generator.analysis_key(cv_text, mode)
+
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("The scheduler has been shut down.")
+            existing = self._inflight.get(key)
+            if existing is not None:
+                existing.subscribers += 1
+                JOBS.inc(outcome="deduplicated")
+                return existing
+
+        job = Job(self, key, cv_text, mode, priority, use_cache, timeout)
+        if mode == "fast":
+            # No model call: the rule-based analysis takes milliseconds, so it
+            # runs on the caller's thread like a cache hit.
+            analysis = generator.generate_cv_analysis(cv_text, mode=mode)
+            job.rule_score = analysis["rule_score"]
+            job._publish({"type": "rule_score", **job.rule_score})
+            job._set_running()
+            for event in generator.replay_events(analysis, cached=False):
+                job._publish(event)
+            job._finish(DONE, result=analysis)
+            JOBS.inc(outcome="rules")
+            with self._cond:
+                self._remember(job)
+            return job
+
+        job.rule_score = generator.rule_score(cv_text)
+        job._publish({"type": "rule_score", **job.rule_score})
+        cached = generator.cache.get(key) if use_cache else None
+        if cached is not None:
+            # Nothing to schedule: replay the stored result on the caller's thread.
+            if "rule_score" not in cached:
+                cached = {**cached, "rule_score": job.rule_score}
+            job._set_running()
+            for event in generator.replay_events(cached):
+                job._publish(event)
+            job._finish(DONE, result=cached)
+            JOBS.inc(outcome="cached")
+            with self._cond:
+                self._remember(job)
+            return job
+
+        with self._cond:
+            # Checked again with the push: shutdown may have run since, and
+            # its workers would never pick this job up.
+            if self._closed:
+                raise RuntimeError("The scheduler has been shut down.")
+            existing = self._inflight.get(key)
+            if existing is not None:
+                existing.subscribers += 1
+                JOBS.inc(outcome="deduplicated")
+                return existing
+            if self._queued >= self.max_queue:
+                JOBS.inc(outcome="rejected")
+                raise QueueFullError(self._queued, self._service_estimate(mode) * _slots(mode) / self.workers)
+            heapq.heappush(self._heap, (priority, next(self._sequence), job))
+            self._queued += 1
+            self._inflight[key] = job
+            self._remember(job)
+            QUEUE_DEPTH.set(self._queued)
+            self._start_workers()
+            self._cond.notify()
+        return job
+
+    def _can_start(self) -> bool:
+        # Called with the lock held. Drops cancelled jobs from the head of the
+        # queue, then checks whether the next job fits in the free slots. A
+        # job that needs more slots than there are runs once nothing else does.
+        while self._heap and self._heap[0][2].status == CANCELLED:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return False
+        return not self._running or self._slots_in_use + _slots(self._heap[0][2].mode) <= self.workers
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._can_start() or (self._closed and not self._heap))
+                if not self._heap:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                self._queued -= 1
+                QUEUE_DEPTH.set(self._queued)
+                self._running.add(job)
+                self._slots_in_use += _slots(job.mode)
+                job._set_running()
+            QUEUE_WAIT_SECONDS.observe(job.started_at - job.submitted_at)
+            JOBS_RUNNING.inc()
+            try:
+                self._run(job)
+            finally:
+                JOBS_RUNNING.dec()
+                with self._cond:
+                    self._running.discard(job)
+                    self._slots_in_use -= _slots(job.mode)
+                    self._cond.notify_all()
+                    if self._inflight.get(job.key) is job:
+                        del self._inflight[job.key]
+                    if job.status == DONE:
+                        self._record_service_time(job.mode, job.finished_at - job.started_at)
+
+    def _run(self, job: Job) -> None:
+        analysis = None
+        try:
+            for event in self.generator.stream_cv_analysis(
+                job.cv_text, use_cache=job.use_cache, mode=job.mode, timeout=job.timeout
+            ):
+                if event["type"] == "rule_score":
+                    # Already published on submit.
+                    continue
+                if event["type"] == "done":
+                    analysis = event["analysis"]
+                job._publish(event)
+        except Exception as e:
+            print(f"Analysis job {job.id} failed: {e}")
+            job._finish(FAILED, error=e)
+            JOBS.inc(outcome="failed")
+            return
+        job._finish(DONE, result=analysis)
+        JOBS.inc(outcome="completed")
+
+    def _record_service_time(self, mode: str, seconds: float) -> None:
+        previous = self._service_seconds.get(mode)
+        self._service_seconds[mode] = seconds if previous is None else (
+            SERVICE_TIME_SMOOTHING * seconds + (1 - SERVICE_TIME_SMOOTHING) * previous
+        )
+
+    def _service_estimate(self, mode: str) -> float:
+        if mode in self._service_seconds:
+            return self._service_seconds[mode]
+        if self._service_seconds:
+            return sum(self._service_seconds.values()) / len(self._service_seconds)
+        return INITIAL_SERVICE_SECONDS
+
+    def _ahead_of(self, job: Job) -> List[Job]:
+        # Called with the lock held.
+        mine = next(((priority, sequence) for priority, sequence, queued in self._heap if queued is job), None)
+        if mine is None:
+            return []
+        return [queued for priority, sequence, queued in self._heap
+                if (priority, sequence) < mine and queued.status == QUEUED]
+
+    def position(self, job: Job) -> Optional[int]:
+        with self._cond:
+            if job.status != QUEUED:
+                return None
+            return len(self._ahead_of(job))
+
+    def eta_seconds(self, job: Job) -> Optional[float]:
+        """
+        Simulates the queue: running jobs free their slots after their
+        estimated remaining time, then each job ahead waits for as many free
+        slots as its mode needs and holds them for one average service time.
+        """
+        now = time.monotonic()
+        with self._cond:
+            if job.done:
+                return None
+            if job.status == RUNNING:
+                return max(self._service_estimate(job.mode) - (now - job.started_at), 0.0)
+            free_at: List[float] = []
+            for running in self._running:
+                remaining = max(self._service_estimate(running.mode) - (now - running.started_at), 0.0)
+                free_at += [remaining] * _slots(running.mode)
+            free_at += [0.0] * (self.workers - len(free_at))
+            heapq.heapify(free_at)
+            for ahead in self._ahead_of(job):
+                _occupy(free_at, _slots(ahead.mode), self._service_estimate(ahead.mode))
+            return _occupy(free_at, _slots(job.mode), self._service_estimate(job.mode))
+
+    def cancel(self, job: Job) -> bool:
+        """
+        Withdraws one subscriber. The job itself is cancelled only when no
+        subscriber is left and it has not started yet; running jobs finish
+        so their result still lands in the cache.
+
+        Returns:
+            True if the job was removed from the queue.
+        """
+        with self._cond:
+            if job.subscribers > 1:
+                job.subscribers -= 1
+                return False
+            if job.status != QUEUED:
+                return False
+            job.subscribers = 0
+            # Marked under the lock so no worker can pick the job up.
+            job.status = CANCELLED
+            self._queued -= 1
+            QUEUE_DEPTH.set(self._queued)
+            if self._inflight.get(job.key) is job:
+                del self._inflight[job.key]
+            # A cancelled head may have kept a smaller job behind it waiting.
+            self._cond.notify_all()
+        # The heap entry is skipped by the workers.
+        job._finish(CANCELLED, error=CancelledError(f"Analysis job {job.id} was cancelled."))
+        JOBS.inc(outcome="cancelled")
+        return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queued": self._queued,
+                "running": len(self._running),
+                "slots_in_use": self._slots_in_use,
+                "service_seconds": {mode: round(seconds, 2) for mode, seconds in self._service_seconds.items()},
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stops the workers after the queued jobs have been processed."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = list(self._threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+
+def _slots(mode: str) -> int:
+    return MODE_SLOTS.get(mode, 1)
+
+
+def _occupy(free_at: List[float], slots: int, seconds: float) -> float:
+    """
+    Takes the `slots` earliest free slots from the heap of free times (all of
+    them if there are fewer), keeps them busy for `seconds` once the last of
+    them is free, and returns when the job ends.
+    """
+    taken = [heapq.heappop(free_at) for _ in range(min(slots, len(free_at)))]
+    end = max(taken) + seconds
+    for _ in taken:
+        heapq.heappush(free_at, end)
+    return end
+
+
+_shared_scheduler: Optional[JobScheduler] = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> JobScheduler:
+    """
+    Returns the process-wide scheduler shared by all Streamlit sessions,
+    sized by SMART_CV_WORKERS (or OLLAMA_NUM_PARALLEL) and SMART_CV_MAX_QUEUE.
+    """
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = JobScheduler()
+        return _shared_scheduler
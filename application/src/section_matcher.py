@@ -0,0 +1,154 @@
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+# Keyword taxonomy used to classify CV lines. Order matters: when a line
+# matches several sections it is assigned to the first one listed.
+DEFAULT_TAXONOMY: Dict[str, List[str]] = {
+    "education": ["university", "college", "degree", "bachelor", "master", "phd", "gpa", "education", "faculty"],
+    "experience": ["experience", "work", "employment", "intern", "engineer", "developer", "analyst", "manager", "position", "role"],
+    "projects": ["project", "developed", "created", "built", "implemented", "system", "application", "portfolio"],
+    "skills": ["skill", "python", "java", "sql", "machine learning", "deep learning", "computer vision", "nlp", "tensorflow", "pytorch", "programming", "framework"],
+}
+
+
+@dataclass
+class SectionMatch:
+    """Lines assigned to each section plus the number of keyword hits per section."""
+    lines: Dict[str, List[str]] = field(default_factory=dict)
+    scores: Dict[str, int] = field(default_factory=dict)
+
+
+def _trie_pattern(keywords: List[str]) -> str:
+    """
+    Builds a regex alternation shaped like a prefix trie, e.g. ["java",
+    "javascript", "sql"] -> "(?:java(?:script)?|sql)". Each branch starts
+    with a distinct literal, so the regex engine rejects a position after
+    one character comparison instead of trying every keyword in turn.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        is_end = "" in node
+        branches = [
+            (r"\s+" if char == " " else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        # Optional groups are greedy, so the longest keyword wins.
+        return "(?:" + "|".join(branches) + ")" + ("?" if is_end else "")
+
+    return build(trie)
+
+
+class SectionMatcher:
+    """
+    Classifies CV lines into sections in a single pass over each line.
+
+    All keywords of the taxonomy are compiled once into one trie-shaped
+    regex; a match is mapped back to its section with a dictionary lookup.
+    Matching is word-boundary aware: keywords match at word starts and may
+    be followed by more word characters ("skill" matches "skills", "work"
+    does not match "network"). Keywords that start with a symbol, such as
+    ".net", match wherever they occur ("asp.net"). Multi-word keywords such
+    as "machine learning" match across any whitespace.
+    """
+    def __init__(self, taxonomy: Optional[Dict[str, List[str]]] = None):
+        self.taxonomy = {section: list(keywords) for section, keywords in (taxonomy or DEFAULT_TAXONOMY).items()}
+        self.sections = list(self.taxonomy)
+        self._priority = {section: index for index, section in enumerate(self.sections)}
+        # keyword -> section. When a keyword is listed under several sections
+        # the first one wins.
+        self._keywords: Dict[str, str] = {}
+        for section in self.sections:
+            for keyword in self.taxonomy[section]:
+                keyword = " ".join(keyword.lower().split())
+                if keyword:
+                    self._keywords.setdefault(keyword, section)
+        if self._keywords:
+            # Not \b, which fails before a keyword such as ".net" that starts
+            # with a non-word character. A match must not continue a word;
+            # only symbol-led keywords may (".net" in "asp.net"), and that
+            # check costs about twice as much, so it is added only when needed.
+            start = r"(?<!\w)"
+            if any(not (keyword[0].isalnum() or keyword[0] == "_") for keyword in self._keywords):
+                start = r"(?:(?<!\w)|(?!\w))"
+            # The rest of the word is skipped, unless the keyword ended in a
+            # symbol ("c#"): what follows it then starts a word of its own.
+            self._pattern = re.compile(start + "(" + _trie_pattern(list(self._keywords)) + r")(?:(?<=\w)\w+)?")
+        else:
+            self._pattern = re.compile(r"(?!)")
+
+    def match_line(self, line: str) -> Dict[str, int]:
+        """Returns the keyword hit count per section for one line."""
+        hits: Dict[str, int] = {}
+        for match in self._pattern.finditer(line.lower()):
+            keyword = match.group(1)
+            section = self._keywords.get(keyword) or self._keywords[" ".join(keyword.split())]
+            hits[section] = hits.get(section, 0) + 1
+        return hits
+
+    def classify(self, cv_text: str) -> SectionMatch:
+        """
+        Assigns every non-empty line to the highest-priority section it has
+        a keyword for, and totals keyword hits per section.
+        """
+        result = SectionMatch(
+            lines={section: [] for section in self.sections},
+            scores={section: 0 for section in self.sections},
+        )
+        for line in cv_text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            hits = self.match_line(line)
+            if not hits:
+                continue
+            for section, count in hits.items():
+                result.scores[section] += count
+            best = min(hits, key=self._priority.__getitem__)
+            result.lines[best].append(line)
+        return result
+
+
+def load_taxonomy(path: str) -> Dict[str, List[str]]:
+    """
+    Loads a taxonomy from a JSON file mapping section names to keyword
+    lists, e.g. {"education": ["university", ...], ...}.
+    """
+    with open(path, encoding="utf-8") as taxonomy_file:
+        taxonomy = json.load(taxonomy_file)
+    if not isinstance(taxonomy, dict) or not all(
+        isinstance(keywords, list) and all(isinstance(k, str) for k in keywords)
+        for keywords in taxonomy.values()
+    ):
+        raise ValueError(f"Invalid section taxonomy in {path}: expected an object of keyword lists.")
+    return taxonomy
+
+
+_default_matcher: Optional[SectionMatcher] = None
+_default_matcher_lock = threading.Lock()
+
+
+def get_section_matcher() -> SectionMatcher:
+    """
+    Returns the process-wide matcher, compiled once. The taxonomy is read
+    from the JSON file named by SMART_CV_SECTION_TAXONOMY when set.
+    """
+    global _default_matcher
+    with _default_matcher_lock:
+        if _default_matcher is None:
+            taxonomy_path = os.getenv("SMART_CV_SECTION_TAXONOMY")
+            _default_matcher = SectionMatcher(load_taxonomy(taxonomy_path) if taxonomy_path else None)
+        return _default_matcher
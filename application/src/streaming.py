@@ -0,0 +1,199 @@
+import re
+from typing import List, Optional
+
+# Number of trailing characters held back from summary tokens so that a
+# section marker split across two chunks is never streamed to the UI.
+_MARKER_HOLDBACK = len("RECOMMENDATIONS:")
+_SUMMARY_END = re.compile(r'RECOMMENDATIONS:|CRITERIA:|KEYWORDS:', re.IGNORECASE)
+_RECOMMENDATIONS_MARKER = re.compile(r'RECOMMENDATIONS:', re.IGNORECASE)
+_MAX_RECOMMENDATIONS = 5
+# The labelled score the prompts ask for ("SCORE: 72", also "ATS Score: 72"),
+# then the bare "72/100" some models write instead.
+_SCORE_PATTERN = re.compile(r'SCORE:\s*(\d+)', re.IGNORECASE)
+_SCORE_FALLBACK_PATTERN = re.compile(r'(\d+)\s*/\s*100(?!\d)')
+
+
+def parse_score(text: str, final: bool = True) -> Optional[int]:
+    """
+    Extracts the 0-100 score from a model output with think blocks removed.
+
+    Args:
+        text: The output, or the part of it received so far.
+        final: Whether the output is complete. Before that only a labelled
+            score followed by another character counts, so a partial number
+            or a "/100" that a later "SCORE:" line overrides is never
+            reported.
+
+    Returns:
+        The score, capped at 100, or None if the output has none.
+    """
+    if final:
+        match = _SCORE_PATTERN.search(text) or _SCORE_FALLBACK_PATTERN.search(text)
+    else:
+        match = re.search(_SCORE_PATTERN.pattern + r'(?=\D)', text, re.IGNORECASE)
+    return min(int(match.group(1)), 100) if match else None
+
+
+class ThinkFilter:
+    """
+    Removes <think>...</think> blocks from a token stream on the fly.
+
+    Tags may be split across chunks, so any trailing text that could be the
+    start of a tag is held back until the next chunk arrives.
+    """
+    OPEN = "<think>"
+    CLOSE = "</think>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._inside = False
+
+    def feed(self, chunk: str) -> str:
+        """Consumes a chunk and returns the visible text it completes."""
+        self._buffer += chunk
+        visible: List[str] = []
+        while True:
+            if self._inside:
+                index = self._buffer.find(self.CLOSE)
+                if index < 0:
+                    keep = self._partial_tag_length(self._buffer, self.CLOSE)
+                    self._buffer = self._buffer[len(self._buffer) - keep:]
+                    break
+                self._buffer = self._buffer[index + len(self.CLOSE):]
+                self._inside = False
+                continue
+
+            open_index = self._buffer.find(self.OPEN)
+            close_index = self._buffer.find(self.CLOSE)
+            if close_index >= 0 and (open_index < 0 or close_index < open_index):
+                # A stray closing tag: drop it and keep the text around it.
+                visible.append(self._buffer[:close_index])
+                self._buffer = self._buffer[close_index + len(self.CLOSE):]
+                continue
+            if open_index >= 0:
+                visible.append(self._buffer[:open_index])
+                self._buffer = self._buffer[open_index + len(self.OPEN):]
+                self._inside = True
+                continue
+
+            keep = max(
+                self._partial_tag_length(self._buffer, self.OPEN),
+                self._partial_tag_length(self._buffer, self.CLOSE),
+            )
+            visible.append(self._buffer[:len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:]
+            break
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """Returns any held-back visible text at the end of the stream."""
+        rest = "" if self._inside else self._buffer
+        self._buffer = ""
+        return rest
+
+    @staticmethod
+    def _partial_tag_length(text: str, tag: str) -> int:
+        """Length of the longest suffix of text that is a proper prefix of tag."""
+        for length in range(min(len(tag) - 1, len(text)), 0, -1):
+            if text.endswith(tag[:length]):
+                return length
+        return 0
+
+
+class AnalysisStreamParser:
+    """
+    Incrementally turns one model output stream into analysis events.
+
+    Args:
+        section: "scoring" for the score/summary prompt, "recommendations"
+            for the recommendations prompt, or "fused" for the combined one.
+
+    Events are dictionaries with a "type" key:
+        {"type": "score", "score": int}
+        {"type": "summary_token", "text": str}
+        {"type": "recommendation", "index": int, "text": str}
+    """
+    def __init__(self, section: str):
+        self.section = section
+        self._filter = ThinkFilter()
+        self._raw: List[str] = []
+        self._text = ""
+        self._score_sent = section == "recommendations"
+        self._summary_pos: Optional[int] = None
+        self._summary_done = section == "recommendations"
+        self._recommendations_pos: Optional[int] = 0 if section == "recommendations" else None
+        self._recommendation_count = 0
+
+    @property
+    def raw_output(self) -> str:
+        """The unfiltered model output received so far."""
+        return "".join(self._raw)
+
+    def feed(self, chunk: str) -> List[dict]:
+        self._raw.append(chunk)
+        self._text += self._filter.feed(chunk)
+        return self._events(final=False)
+
+    def finish(self) -> List[dict]:
+        self._text += self._filter.flush()
+        return self._events(final=True)
+
+    def _events(self, final: bool) -> List[dict]:
+        events: List[dict] = []
+        if not self._score_sent:
+            score = parse_score(self._text, final)
+            if score is not None:
+                events.append({"type": "score", "score": score})
+                self._score_sent = True
+
+        if not self._summary_done:
+            events.extend(self._summary_events(final))
+
+        if self._recommendations_pos is not None:
+            events.extend(self._recommendation_events(final))
+        return events
+
+    def _summary_events(self, final: bool) -> List[dict]:
+        if self._summary_pos is None:
+            match = re.search(r'SUMMARY:\s*', self._text, re.IGNORECASE)
+            if match is None:
+                return []
+            self._summary_pos = match.end()
+
+        end = _SUMMARY_END.search(self._text, self._summary_pos)
+        if end is not None:
+            stop = end.start()
+            self._summary_done = True
+            if self.section == "fused" and _RECOMMENDATIONS_MARKER.match(self._text, end.start()):
+                self._recommendations_pos = end.end()
+        elif final:
+            stop = len(self._text)
+            self._summary_done = True
+        else:
+            stop = max(self._summary_pos, len(self._text) - _MARKER_HOLDBACK)
+
+        delta = self._text[self._summary_pos:stop]
+        self._summary_pos = stop
+        return [{"type": "summary_token", "text": delta}] if delta else []
+
+    def _recommendation_events(self, final: bool) -> List[dict]:
+        events: List[dict] = []
+        pending = self._text[self._recommendations_pos:]
+        lines = pending.split('\n')
+        complete = lines if final else lines[:-1]
+        for line in complete:
+            self._recommendations_pos += len(line) + 1
+            if self._recommendation_count >= _MAX_RECOMMENDATIONS:
+                continue
+            line = line.strip()
+            if not re.match(r'^(\d+\.|-|\*)', line):
+                continue
+            clean_line = re.sub(r'^(\d+\.|-|\*)\s*', '', line)
+            clean_line = re.sub(r'\*\*(.*?)\*\*', r'\1', clean_line)
+            clean_line = re.sub(r'\*(.*?)\*', r'\1', clean_line).strip()
+            if len(clean_line) > 3:
+                self._recommendation_count += 1
+                events.append({"type": "recommendation", "index": self._recommendation_count, "text": clean_line})
+        if final:
+            self._recommendations_pos = len(self._text)
+        return events
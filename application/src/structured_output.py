@@ -0,0 +1,169 @@
+import json
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import prompt_templates
+
+STRUCTURED_FIELDS = ("score", "summary", "recommendations")
+
+
+def field_schema(field: str) -> dict:
+    """JSON schema for a single-field follow-up answer, e.g. {"score": 72}."""
+    return {
+        "type": "object",
+        "properties": {field: prompt_templates.ANALYSIS_JSON_SCHEMA["properties"][field]},
+        "required": [field],
+    }
+
+
+def parse_json_object(output: str) -> Optional[dict]:
+    """
+    Parses the model output as a JSON object. Tolerates thinking blocks and
+    text around the object; returns None when no object can be decoded.
+    """
+    clean_output = re.sub(r'<think>.*?</think>', '', output, flags=re.DOTALL).strip()
+    try:
+        data = json.loads(clean_output)
+    except json.JSONDecodeError:
+        start, end = clean_output.find("{"), clean_output.rfind("}")
+        if start < 0 or end <= start:
+            return None
+        try:
+            data = json.loads(clean_output[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def validate_fields(data: dict) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Validates the analysis fields of a decoded response.
+
+    Returns:
+        (valid values by field, problem description by invalid/missing field)
+    """
+    values: Dict[str, Any] = {}
+    problems: Dict[str, str] = {}
+
+    if "score" in data:
+        score = data["score"]
+        try:
+            score = round(float(score))
+        except (TypeError, ValueError):
+            problems["score"] = f"expected an integer, got {score!r}"
+        else:
+            if 0 <= score <= 100:
+                values["score"] = int(score)
+            else:
+                problems["score"] = f"expected a value between 0 and 100, got {score}"
+    else:
+        problems["score"] = "the field was missing"
+
+    summary = data.get("summary")
+    if isinstance(summary, str) and len(summary.strip()) >= 10:
+        values["summary"] = re.sub(r'\s+', ' ', summary).strip()
+    else:
+        problems["summary"] = "the field was missing or empty" if not summary else "expected 2-3 sentences of text"
+
+    recommendations = data.get("recommendations")
+    if isinstance(recommendations, str):
+        recommendations = [line for line in recommendations.split('\n')]
+    if isinstance(recommendations, list):
+        items = [item.strip() for item in recommendations if isinstance(item, str) and len(item.strip()) > 3]
+        if items:
+            values["recommendations"] = items
+        else:
+            problems["recommendations"] = "expected a list of non-empty strings"
+    else:
+        problems["recommendations"] = "the field was missing"
+
+    return values, problems
+
+
+class StructuredOutputStats:
+    """
+    Thread-safe counters for JSON mode: how often the first response parsed
+    cleanly, and how many follow-up field requests were needed.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "responses": 0,
+            "parsed_first_try": 0,
+            "field_retries": 0,
+            "fields_recovered": 0,
+            "fields_failed": 0,
+        }
+
+    def record(self, first_try_ok: bool, retries: int, recovered: int, failed: int) -> None:
+        with self._lock:
+            self._counters["responses"] += 1
+            self._counters["parsed_first_try"] += int(first_try_ok)
+            self._counters["field_retries"] += retries
+            self._counters["fields_recovered"] += recovered
+            self._counters["fields_failed"] += failed
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+        responses = stats["responses"]
+        stats["parse_success_rate"] = stats["parsed_first_try"] / responses if responses else 0.0
+        stats["retries_per_response"] = stats["field_retries"] / responses if responses else 0.0
+        return stats
+
+
+def run_structured_analysis(
+    invoke: Callable[[str, dict], str],
+    cv_text: str,
+    max_field_retries: int,
+    stats: Optional[StructuredOutputStats] = None,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Requests the full analysis as JSON, then re-asks only for the fields
+    that were missing or invalid with a short follow-up prompt.
+
+    Args:
+        invoke: Calls a named chain ("json" or "json_field:<field>") with the
+            given inputs and returns the raw model output.
+        cv_text: The (compacted) CV text.
+        max_field_retries: Follow-up attempts allowed per field.
+        stats: Counters to update.
+
+    Returns:
+        (valid values by field, report with retries and failed fields)
+    """
+    data = parse_json_object(invoke("json", {"cv_text": cv_text})) or {}
+    values, problems = validate_fields(data)
+    first_try_ok = not problems
+    retries = 0
+    retried_fields: List[str] = []
+
+    for field in STRUCTURED_FIELDS:
+        attempt = 0
+        while field in problems and attempt < max_field_retries:
+            attempt += 1
+            retries += 1
+            output = invoke(f"json_field:{field}", {
+                "cv_text": cv_text,
+                "field": field,
+                "problem": problems[field],
+                "field_spec": prompt_templates.FIELD_DESCRIPTIONS[field],
+            })
+            field_values, field_problems = validate_fields(parse_json_object(output) or {})
+            if field in field_values:
+                values[field] = field_values[field]
+                del problems[field]
+            else:
+                problems[field] = field_problems[field]
+        if attempt:
+            retried_fields.append(field)
+
+    failed_fields = sorted(problems)
+    if stats is not None:
+        # Fields can fail without being retried (max_field_retries=0), so count
+        # the recovered ones rather than subtracting the failures.
+        recovered = sum(1 for field in retried_fields if field not in problems)
+        stats.record(first_try_ok, retries, recovered, len(failed_fields))
+    report = {"retries": retries, "retried_fields": retried_fields, "failed_fields": failed_fields}
+    return values, report
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# The shared caches are created under SMART_CV_CACHE_DIR when first used;
+# keep them, and the per-request log, out of the user's environment.
+os.environ.setdefault("SMART_CV_CACHE_DIR", tempfile.mkdtemp(prefix="smart-cv-tests-"))
+os.environ.setdefault("SMART_CV_REQUEST_LOG", "off")
@@ -0,0 +1,141 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from benchmarks.corpus import make_docx, make_pdf, synthetic_cv_text
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from src import api, cv_index, near_duplicates, ollama_router, scheduler
+from src.cache import MemoryCache, TieredCache
+from src.cv_index import CVIndex
+from src.near_duplicates import NearDuplicateDetector
+from src.rag_pipeline import LLMGenerator
+from src.scheduler import JobScheduler
+
+
+@pytest.fixture(scope="module")
+def server():
+    with FakeOllamaServer(FakeOllamaConfig(latency_ms=5, tokens_per_second=5000)) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server, monkeypatch):
+    """An API client whose shared scheduler, index and duplicate detector are private to the test."""
+    generator = LLMGenerator(cache=TieredCache("test", MemoryCache()), base_url=server.url)
+    jobs = JobScheduler(generator, workers=2)
+    monkeypatch.setattr(scheduler, "_shared_scheduler", jobs)
+    monkeypatch.setattr(cv_index, "_shared_index", CVIndex())
+    monkeypatch.setattr(near_duplicates, "_shared_detector", NearDuplicateDetector())
+    monkeypatch.setattr(ollama_router, "_shared_router", None)
+    monkeypatch.setattr(ollama_router, "_shared_router_loaded", True)
+    yield TestClient(api.app)
+    jobs.shutdown()
+
+
+def _upload(client, data: bytes, name: str = "cv.pdf", **form):
+    return client.post("/v1/analyses", files={"file": (name, data)}, data=form)
+
+
+def test_analysis_round_trip(client):
+    response = _upload(client, make_pdf([synthetic_cv_text(0)]), mode="sequential")
+    assert response.status_code == 202
+    job = response.json()
+    assert job["links"]["result"] == f"/v1/analyses/{job['job_id']}/result"
+    assert job["rule_score"]["score"] >= 0
+
+    result = client.get(job["links"]["result"], params={"wait": 10})
+    assert result.status_code == 200
+    analysis = result.json()["analysis"]
+    assert 0 <= analysis["score"] <= 100 and analysis["recommendations"]
+
+    status = client.get(job["links"]["self"]).json()
+    assert (status["status"], status["position"], status["eta_seconds"]) == ("done", None, None)
+
+
+def test_event_stream(client):
+    job = _upload(client, make_docx(synthetic_cv_text(1)), name="cv.docx", mode="fused").json()
+    with client.stream("GET", job["links"]["events"]) as response:
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+    types = [event["type"] for event in events]
+    assert types[0] == "rule_score" and types[-1] == "done"
+    assert "score" in types and "recommendation" in types
+
+
+def test_identical_upload_is_served_from_the_cache(client):
+    data = make_pdf([synthetic_cv_text(2)])
+    first = _upload(client, data, mode="sequential").json()
+    assert client.get(first["links"]["result"], params={"wait": 10}).status_code == 200
+    again = _upload(client, data, mode="sequential")
+    assert again.status_code == 200
+    assert again.json()["status"] == "done"
+    assert again.json()["cv_id"] == first["cv_id"]
+
+
+def test_near_duplicate_upload_is_reported(client):
+    original = synthetic_cv_text(3)
+    first = _upload(client, make_pdf([original]), mode="fast").json()
+    revised = _upload(client, make_pdf([original + "\nVolunteer mentor at a local coding club"]), mode="fast").json()
+    assert revised["cv_id"] != first["cv_id"]
+    assert revised["near_duplicate_of"]["cv_id"] == first["cv_id"]
+    assert "near_duplicate_of" not in first
+
+
+@pytest.mark.parametrize("form, data, name, status", [
+    ({"mode": "poetic"}, make_pdf(["Jane Doe"]), "cv.pdf", 422),
+    ({"priority": "urgent"}, make_pdf(["Jane Doe"]), "cv.pdf", 422),
+    ({}, b"plain text CV", "cv.txt", 415),
+    ({}, make_pdf([""]), "cv.pdf", 422),
+])
+def test_rejected_uploads(client, form, data, name, status):
+    assert _upload(client, data, name, **form).status_code == status
+
+
+def test_upload_size_limit(client, monkeypatch):
+    monkeypatch.setattr(api, "MAX_UPLOAD_BYTES", 100)
+    assert _upload(client, make_pdf([synthetic_cv_text(4)])).status_code == 413
+
+
+def test_full_queue_returns_429(client, monkeypatch):
+    jobs = scheduler.get_scheduler()
+    monkeypatch.setattr(jobs, "max_queue", 0)
+    response = _upload(client, make_pdf([synthetic_cv_text(5)]), mode="sequential", use_cache="false")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_unknown_job(client):
+    for path in ("/v1/analyses/nope", "/v1/analyses/nope/result", "/v1/analyses/nope/events"):
+        assert client.get(path).status_code == 404
+    assert client.delete("/v1/analyses/nope").status_code == 404
+
+
+def test_cancelled_job_result_is_gone(client, monkeypatch):
+    jobs = scheduler.get_scheduler()
+    # No worker may pick the job up before it is cancelled.
+    monkeypatch.setattr(jobs, "_start_workers", lambda: None)
+    job = _upload(client, make_pdf([synthetic_cv_text(6)]), mode="sequential").json()
+    assert job["status"] == "queued" and job["position"] == 0
+    cancelled = client.delete(job["links"]["self"]).json()
+    assert cancelled["cancelled"] and cancelled["status"] == "cancelled"
+    assert client.get(job["links"]["result"]).status_code == 410
+
+
+def test_search(client):
+    for seed in range(3):
+        _upload(client, make_pdf([synthetic_cv_text(seed)]), name=f"cv{seed}.pdf", mode="fast")
+    response = client.post("/v1/search", json={"job_description": "Python engineer", "top_k": 2})
+    results = response.json()["results"]
+    assert len(results) == 2
+    assert {result["metadata"]["file"] for result in results} <= {"cv0.pdf", "cv1.pdf", "cv2.pdf"}
+    assert client.post("/v1/search", json={"job_description": ""}).status_code == 422
+
+
+def test_health_and_metrics(client):
+    health = client.get("/healthz").json()
+    assert health["status"] == "ok" and health["queue"]["workers"] == 2
+    assert "ollama_endpoints" not in health
+    metrics = client.get("/metrics")
+    assert metrics.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "smart_cv_requests_total" in metrics.text
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from benchmarks.corpus import synthetic_cv_text
+from src.ats_rules import CRITERIA, FEATURE_NAMES, WEIGHTS, RuleScorer, score_features
+
+WEAK_CV = "John Smith\nI worked at a shop for some time and I am good with people."
+
+
+@pytest.fixture(scope="module")
+def scorer():
+    return RuleScorer()
+
+
+def _features(scorer, cv_text: str) -> dict:
+    return dict(zip(FEATURE_NAMES, scorer.features(cv_text)))
+
+
+def test_weights_add_up_to_the_prompt_points():
+    assert np.allclose(WEIGHTS.sum(axis=1), 1.0)
+    assert score_features(np.ones(len(FEATURE_NAMES)))[0].tolist() == [points for _, _, points in CRITERIA]
+    assert score_features(np.zeros(len(FEATURE_NAMES))).sum() == 0
+
+
+@pytest.mark.parametrize("text, feature, expected", [
+    ("Reach me at jane.doe+cv@mail.example.com", "email", 1.0),
+    ("Phone: +44 20 7946 0958", "phone", 1.0),
+    ("Backend Engineer, Acme (2019 - 2023)", "phone", 0.0),
+    ("linkedin.com/in/jane", "linkedin", 1.0),
+    ("linkedin.com/in/jane", "portfolio", 0.0),
+    ("https://github.com/jane", "portfolio", 1.0),
+    ("BSc Computer Science, Cairo University", "degree", 1.0),
+    ("BSc Computer Science, Cairo University", "institution", 1.0),
+])
+def test_feature_detection(scorer, text, feature, expected):
+    assert _features(scorer, text)[feature] == expected
+
+
+def test_features_are_normalized(scorer):
+    for cv_text in (synthetic_cv_text(0), WEAK_CV, "", "\ufffd" * 50):
+        features = scorer.features(cv_text)
+        assert ((features >= 0) & (features <= 1)).all()
+
+
+def test_complete_cv_outscores_a_weak_one(scorer):
+    strong = scorer.score(synthetic_cv_text(0))
+    weak = scorer.score(WEAK_CV)
+    assert strong.score >= 80
+    assert weak.score < 30
+    assert scorer.score("").score == 0
+    assert scorer.score(synthetic_cv_text(0)) == strong
+
+
+def test_breakdown_is_consistent(scorer):
+    result = scorer.score(WEAK_CV)
+    assert list(result.criteria) == [key for key, _, _ in CRITERIA]
+    assert sum(criterion["points"] for criterion in result.criteria.values()) == pytest.approx(result.score, abs=1)
+    for criterion in result.criteria.values():
+        lost = sum(item["points_lost"] for item in criterion["missing"])
+        assert criterion["points"] + lost == pytest.approx(criterion["max_points"], abs=0.3)
+
+
+def test_advice_follows_the_points_lost(scorer):
+    result = scorer.score(WEAK_CV)
+    advice = result.advice(limit=3)
+    assert len(advice) == 3
+    costs = {item["advice"]: item["points_lost"] for criterion in result.criteria.values() for item in criterion["missing"]}
+    assert [costs[item] for item in advice] == sorted((costs[item] for item in advice), reverse=True)
+    assert max(costs.values()) == costs[advice[0]]
+    assert result.summary().startswith("Rule-based ATS check. Strongest areas: ")
+    assert "Needs work: " in result.summary()
+
+
+def test_score_many_matches_score(scorer):
+    cv_texts = [synthetic_cv_text(seed) for seed in range(4)] + [WEAK_CV, ""]
+    assert scorer.score_many(cv_texts) == [scorer.score(cv_text) for cv_text in cv_texts]
+    assert scorer.score_many([]) == []
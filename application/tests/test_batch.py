@@ -0,0 +1,65 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.corpus import make_pdf, synthetic_cv_text
+from src import batch, pdf_extraction
+
+
+def test_parse_workers_use_a_single_extraction_process(tmp_path, monkeypatch):
+    pool_sizes = []
+
+    def no_pool(workers, max_memory_mb):
+        pool_sizes.append(workers)
+        raise RuntimeError("no workers in this test")
+
+    monkeypatch.setattr(pdf_extraction, "_get_pool", no_pool)
+    monkeypatch.setattr(pdf_extraction.os, "cpu_count", lambda: 8)
+    path = tmp_path / "long.pdf"
+    path.write_bytes(make_pdf([f"Page {index}\nPython engineer" for index in range(12)]))
+    parsed = batch._parse_file(str(path))
+    assert parsed["error"] is None
+    assert "Page 11" in parsed["cv_text"]
+    assert pool_sizes == [1]
+
+
+class FailingGenerator:
+    """Fails every analysis; the representative's analysis finishing is signalled."""
+    def __init__(self):
+        self.analyzed = []
+        self.finished = threading.Event()
+
+    def generate_cv_analysis(self, cv_text, use_cache=True, mode="concurrent", timeout=None):
+        self.analyzed.append(cv_text)
+        self.finished.set()
+        raise RuntimeError("model unavailable")
+
+
+def test_duplicate_of_a_failed_representative_is_analyzed(tmp_path, monkeypatch):
+    original = synthetic_cv_text(0)
+    representative, duplicate = tmp_path / "a.pdf", tmp_path / "b.pdf"
+    representative.write_bytes(make_pdf([original]))
+    duplicate.write_bytes(make_pdf([original + "\nVolunteer mentor at a local coding club"]))
+    generator = FailingGenerator()
+    parse_file = batch._parse_file
+
+    def parse_after_the_representative_failed(path):
+        if path == str(duplicate):
+            assert generator.finished.wait(10)
+        return parse_file(path)
+
+    # Threads instead of processes, so the parse order can be controlled.
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(batch, "_parse_file", parse_after_the_representative_failed)
+    monkeypatch.setattr(batch, "get_llm_generator", lambda: generator)
+    output = tmp_path / "results.jsonl"
+    writer = batch.ResultWriter(str(output), str(tmp_path / "results.checkpoint"))
+    try:
+        counts = batch.run_batch([str(representative), str(duplicate)], writer, parse_workers=2)
+    finally:
+        writer.close()
+    assert counts["analysis_failed"] == 2
+    assert len(generator.analyzed) == 2
+    assert sorted(json.loads(line)["file"] for line in output.read_text().splitlines()) == [
+        str(representative), str(duplicate)]
+    assert batch.load_checkpoint(str(tmp_path / "results.checkpoint")) == {str(representative), str(duplicate)}
@@ -0,0 +1,109 @@
+import hashlib
+
+import pytest
+
+from src import cache as cache_module
+from src.cache import MemoryCache, SQLiteCache, TieredCache, analysis_cache_key, hash_bytes, normalize_cv_text
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces time.time in the cache module with a settable clock."""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_hash_bytes():
+    assert hash_bytes(b"cv") == hashlib.sha256(b"cv").hexdigest()
+
+
+def test_normalize_cv_text_ignores_cosmetic_whitespace():
+    assert normalize_cv_text("  Jane \t Doe \r\n\n\nPython,  SQL  ") == "Jane Doe\nPython, SQL"
+
+
+def test_analysis_cache_key():
+    key = analysis_cache_key("Jane Doe\nPython", "v1", "model", {"temperature": 0.1, "num_ctx": 4096})
+    assert key == analysis_cache_key("Jane  Doe \n\nPython", "v1", "model", {"num_ctx": 4096, "temperature": 0.1})
+    assert key != analysis_cache_key("Jane Doe\nPython", "v2", "model", {"temperature": 0.1, "num_ctx": 4096})
+    assert key != analysis_cache_key("Jane Doe\nPython", "v1", "other", {"temperature": 0.1, "num_ctx": 4096})
+    assert key != analysis_cache_key("Jane Doe\nPython", "v1", "model", {"temperature": 0.2, "num_ctx": 4096})
+
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(max_entries=2)
+    memory.set("a", 1)
+    memory.set("b", 2)
+    assert memory.get("a") == 1
+    memory.set("c", 3)
+    assert memory.get("b") is None
+    assert (memory.get("a"), memory.get("c")) == (1, 3)
+    assert memory.evictions == 1
+
+
+def test_memory_cache_hands_out_copies():
+    memory = MemoryCache()
+    analysis = {"score": 72, "recommendations": ["Quantify results"]}
+    memory.set("a", analysis)
+    analysis["recommendations"].append("changed after set")
+    memory.get("a")["recommendations"].append("changed after get")
+    assert memory.get("a") == {"score": 72, "recommendations": ["Quantify results"]}
+
+
+def test_memory_cache_expires_entries(clock):
+    memory = MemoryCache(ttl_seconds=60)
+    memory.set("a", 1)
+    clock[0] += 59
+    assert memory.get("a") == 1
+    clock[0] += 2
+    assert memory.get("a") is None
+    assert len(memory) == 0
+
+
+def test_sqlite_cache_persists(tmp_path):
+    path = str(tmp_path / "cache" / "analysis.sqlite3")
+    SQLiteCache(path).set("key", {"score": 72, "recommendations": ["a", "b"]})
+    assert SQLiteCache(path).get("key") == {"score": 72, "recommendations": ["a", "b"]}
+
+
+def test_sqlite_cache_evicts_by_count_size_and_age(tmp_path, clock):
+    disk = SQLiteCache(str(tmp_path / "count.sqlite3"), max_entries=2)
+    for index, key in enumerate("abc"):
+        clock[0] += 1
+        disk.set(key, index)
+    assert (len(disk), disk.get("a"), disk.get("c")) == (2, None, 2)
+
+    disk = SQLiteCache(str(tmp_path / "size.sqlite3"), max_bytes=20)
+    disk.set("a", "x" * 10)
+    clock[0] += 1
+    disk.set("b", "y" * 10)
+    assert (disk.get("a"), disk.get("b")) == (None, "y" * 10)
+
+    disk = SQLiteCache(str(tmp_path / "ttl.sqlite3"), ttl_seconds=60)
+    disk.set("a", 1)
+    clock[0] += 61
+    assert disk.get("a") is None
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "parse.sqlite3")
+    TieredCache("test", MemoryCache(), SQLiteCache(path)).set("key", "text")
+
+    tiered = TieredCache("test", MemoryCache(), SQLiteCache(path))
+    assert tiered.get("key") == "text"
+    assert tiered.get("key") == "text"
+    assert tiered.get("missing") is None
+    stats = tiered.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+    assert (stats["memory_entries"], stats["disk_entries"]) == (1, 1)
+
+
+def test_get_or_compute_stores_only_values():
+    tiered = TieredCache("test", MemoryCache())
+    calls = []
+    assert tiered.get_or_compute("a", lambda: calls.append(1) or "value") == "value"
+    assert tiered.get_or_compute("a", lambda: calls.append(1) or "other") == "value"
+    assert tiered.get_or_compute("b", lambda: None) is None
+    assert len(calls) == 1
+    assert tiered.stats()["sets"] == 1
@@ -0,0 +1,64 @@
+import pytest
+
+from benchmarks.corpus import synthetic_cv_text
+from src.compaction import (
+    compact_cv_text,
+    estimate_tokens,
+    normalize_lines,
+    remove_repeated_lines,
+    split_sections,
+)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    # "hello" and "world" are two tokens each, the comma one.
+    assert estimate_tokens("hello, world") == 5
+    assert estimate_tokens("[...]") == 5
+
+
+def test_normalize_lines_drops_page_noise_and_blank_lines():
+    text = "Jane  Doe\n\nPage 1 of 2\n- 3 -\n2/3\nsoft\u00adware   engineer\n\t\n"
+    assert normalize_lines(text) == ["Jane Doe", "software engineer"]
+
+
+def test_remove_repeated_lines_keeps_first_occurrence():
+    lines = ["Jane Doe", "Experience", "Jane Doe", "Built APIs", "jane doe", "Education"]
+    assert remove_repeated_lines(lines) == ["Jane Doe", "Experience", "Built APIs", "Education"]
+
+
+def test_split_sections():
+    lines = ["Jane Doe", "jane@example.com", "Work Experience", "Engineer at Acme", "Skills:", "Python"]
+    assert split_sections(lines) == [
+        ("header", ["Jane Doe", "jane@example.com"]),
+        ("experience", ["Work Experience", "Engineer at Acme"]),
+        ("skills", ["Skills:", "Python"]),
+    ]
+
+
+def test_short_cv_is_only_normalized():
+    result = compact_cv_text("Jane Doe\n\nSkills\nPython,   SQL\nPage 2", token_budget=1000)
+    assert result.text == "Jane Doe\nSkills\nPython, SQL"
+    assert result.truncated_sections == []
+    assert result.compacted_tokens == estimate_tokens(result.text)
+
+
+@pytest.mark.parametrize("budget", [50, 100, 200, 400])
+@pytest.mark.parametrize("seed", range(5))
+def test_long_cv_fits_budget_and_keeps_every_section(seed, budget):
+    cv_text = synthetic_cv_text(seed, jobs=6, bullets_per_job=8)
+    full = compact_cv_text(cv_text, token_budget=10 ** 6)
+    result = compact_cv_text(cv_text, token_budget=budget)
+
+    assert result.compacted_tokens <= budget
+    assert result.tokens_saved == result.original_tokens - result.compacted_tokens
+    assert list(result.section_tokens) == list(full.section_tokens)
+    assert result.truncated_sections
+    assert result.text.count("[...]") == len(result.truncated_sections)
+
+
+def test_truncation_favours_experience():
+    cv_text = synthetic_cv_text(1, jobs=6, bullets_per_job=8)
+    result = compact_cv_text(cv_text, token_budget=300)
+    others = [tokens for section, tokens in result.section_tokens.items() if section != "experience"]
+    assert result.section_tokens["experience"] >= max(others)
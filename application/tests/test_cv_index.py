@@ -0,0 +1,147 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import synthetic_cv_text
+from src.cache import normalize_cv_text
+from src.cv_index import BM25_B, BM25_K1, CVIndex, tokenize
+
+JOB_DESCRIPTION = "Senior Python engineer with Docker, Kubernetes and PostgreSQL"
+
+CVS = {
+    "python": "Backend engineer\nPython, Django, PostgreSQL\nDocker and Kubernetes in production",
+    "java": "Java developer\nSpring Boot, Oracle\nMaven builds",
+    "data": "Data scientist\nPython, pandas, scikit-learn\nPostgreSQL reporting",
+    "frontend": "Frontend developer\nReact, TypeScript\nCSS animations",
+}
+
+
+@pytest.fixture(params=["memory", "disk"])
+def make_index(request, tmp_path):
+    """Builds in-memory or on-disk indexes; on disk, a second call reopens the same directory."""
+    def make(**kwargs) -> CVIndex:
+        return CVIndex(str(tmp_path / "index") if request.param == "disk" else None, **kwargs)
+    return make
+
+
+def naive_bm25(documents, query):
+    """Textbook BM25 over the live documents, by doc id."""
+    docs = {doc_id: tokenize(normalize_cv_text(text)) for doc_id, text in documents.items()}
+    avg_len = sum(len(tokens) for tokens in docs.values()) / len(docs)
+    scores = {}
+    for doc_id, tokens in docs.items():
+        counts = Counter(tokens)
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in docs.values())
+            tf = counts[term]
+            if not tf:
+                continue
+            idf = math.log1p((len(docs) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * len(tokens) / avg_len))
+        scores[doc_id] = score
+    return scores
+
+
+def _scores(index: CVIndex, query: str):
+    return {result.doc_id: result.bm25 for result in index.search(query, k=len(index))}
+
+
+def test_bm25_matches_reference(make_index):
+    index = make_index()
+    for doc_id, text in CVS.items():
+        index.add(doc_id, text)
+    expected = naive_bm25(CVS, JOB_DESCRIPTION)
+    actual = _scores(index, JOB_DESCRIPTION)
+    assert actual == pytest.approx(expected, rel=1e-5)
+    assert [result.doc_id for result in index.search(JOB_DESCRIPTION, k=2)] == ["python", "data"]
+
+
+def test_search_returns_metadata_and_normalized_scores(make_index):
+    index = make_index()
+    for doc_id, text in CVS.items():
+        index.add(doc_id, text, metadata={"file": f"{doc_id}.pdf"})
+    best = index.search(JOB_DESCRIPTION, k=1)[0]
+    assert best.as_dict() == {"id": "python", "score": 1.0, "bm25": round(best.bm25, 4), "metadata": {"file": "python.pdf"}}
+    assert index.search("", k=3)[0].score == 0.0
+    assert [result.doc_id for result in index.search(JOB_DESCRIPTION, k=10, doc_ids=["java", "data"])] == ["data", "java"]
+
+
+def test_symbol_terms_are_kept():
+    assert tokenize("C++, C# and Node.js.") == ["c++", "c#", "node.js"]
+
+
+def test_remove_replace_and_compact(make_index):
+    index = make_index()
+    for doc_id, text in CVS.items():
+        index.add(doc_id, text)
+    assert index.remove("python")
+    assert not index.remove("python")
+    index.add("data", CVS["java"])
+    remaining = {"java": CVS["java"], "data": CVS["java"], "frontend": CVS["frontend"]}
+    assert "python" not in index and len(index) == 3
+    assert _scores(index, JOB_DESCRIPTION + " java") == pytest.approx(naive_bm25(remaining, JOB_DESCRIPTION + " java"), rel=1e-5)
+
+    index.compact()
+    assert index.stats()["dead_postings"] == 0
+    assert _scores(index, JOB_DESCRIPTION + " java") == pytest.approx(naive_bm25(remaining, JOB_DESCRIPTION + " java"), rel=1e-5)
+
+
+def test_reopen_restores_the_index(tmp_path):
+    path = str(tmp_path / "index")
+    index = CVIndex(path)
+    for seed in range(20):
+        index.add(f"cv{seed}", synthetic_cv_text(seed), metadata={"seed": seed})
+    for seed in range(0, 20, 3):
+        index.remove(f"cv{seed}")
+    index.add("cv1", synthetic_cv_text(100))
+    expected = [result.as_dict() for result in index.search(JOB_DESCRIPTION, k=20)]
+
+    reopened = CVIndex(path)
+    assert len(reopened) == len(index)
+    assert [result.as_dict() for result in reopened.search(JOB_DESCRIPTION, k=20)] == expected
+    reopened.compact()
+    assert [result.as_dict() for result in CVIndex(path).search(JOB_DESCRIPTION, k=20)] == expected
+
+
+def test_reopen_ignores_a_torn_log_line(tmp_path):
+    path = tmp_path / "index"
+    index = CVIndex(str(path))
+    index.add("a", CVS["python"])
+    index.add("b", CVS["java"])
+    with open(path / "docs.jsonl", "a", encoding="utf-8") as log:
+        log.write('{"op": "add", "id": "c", "off')
+    reopened = CVIndex(str(path))
+    assert sorted(_scores(reopened, "python java")) == ["a", "b"]
+    # Rows added after the torn line must survive the next reopen.
+    reopened.add("c", CVS["data"])
+    assert sorted(_scores(CVIndex(str(path)), "python java")) == ["a", "b", "c"]
+
+
+def test_max_docs_removes_the_oldest(make_index):
+    index = make_index(max_docs=2)
+    index.add("python", CVS["python"])
+    index.add("java", CVS["java"])
+    index.add("python", CVS["python"])
+    index.add("data", CVS["data"])
+    assert len(index) == 2
+    assert "java" not in index
+    assert sorted(_scores(index, JOB_DESCRIPTION)) == ["data", "python"]
+
+
+def test_embeddings_are_blended():
+    vectors = {"python": [1.0, 0.0], "java": [0.0, 1.0], JOB_DESCRIPTION: [0.0, 1.0]}
+
+    def embedder(texts):
+        return np.array([vectors.get(text, [1.0, 1.0]) for text in texts], dtype=np.float32)
+
+    index = CVIndex(embedder=embedder, embedding_weight=1.0)
+    index.add("python", "python")
+    index.add("java", "java")
+    assert [result.doc_id for result in index.search(JOB_DESCRIPTION, k=2)] == ["java", "python"]
+
+    index.embedder = lambda texts: np.ones((len(texts), 3), dtype=np.float32)
+    with pytest.raises(ValueError):
+        index.add("other", "other")
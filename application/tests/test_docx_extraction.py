@@ -0,0 +1,81 @@
+import io
+import zipfile
+
+import docx
+import pytest
+
+from benchmarks.corpus import _docx_with_broken_xml, _zip_without_document, make_docx, make_template_docx, synthetic_cv_text
+from src.docx_extraction import DOCUMENT_PART, extract_docx
+
+
+def _save(document) -> bytes:
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_paragraphs_in_order():
+    cv_text = synthetic_cv_text(0)
+    result = extract_docx(make_docx(cv_text))
+    assert result.text == "\n".join(line for line in cv_text.split("\n") if line.strip())
+    assert result.parts == [DOCUMENT_PART]
+    assert (result.truncated, result.error) == (False, None)
+
+
+def test_data_rows_read_as_one_line():
+    result = extract_docx(make_docx("Skills", table_rows=3))
+    assert result.text.split("\n") == ["Skills", "Python | 1 years", "Java | 2 years", "SQL | 3 years"]
+
+
+def test_template_header_columns_and_text_box():
+    cv_text = synthetic_cv_text(1)
+    lines = cv_text.split("\n")
+    text = extract_docx(make_template_docx(cv_text)).text.split("\n")
+    # Contact details in the header come before the body.
+    assert text[:2] == lines[:2]
+    # The two-column layout row is read cell by cell, not joined with " | ".
+    assert text[2] == "Skills"
+    assert not any(" | Skills" in line or "Skills | " in line for line in text)
+    assert lines[2] in text and text.index(lines[2]) > text.index("Skills")
+    # The text box is read once, without its compatibility fallback copy.
+    assert text.count("Languages: Arabic (native), English (fluent)") == 1
+
+
+def test_repeated_header_and_footer_lines_are_kept_once():
+    document = docx.Document()
+    section = document.sections[0]
+    section.different_first_page_header_footer = True
+    section.header.paragraphs[0].text = "Jane Doe"
+    section.first_page_header.paragraphs[0].text = "Jane Doe"
+    section.footer.paragraphs[0].text = "References available on request"
+    document.add_paragraph("Experience")
+    result = extract_docx(_save(document))
+    assert result.text.split("\n") == ["Jane Doe", "Experience", "References available on request"]
+    assert result.parts[-1].startswith("word/footer")
+
+
+def test_max_chars_truncates():
+    cv_text = synthetic_cv_text(2, jobs=20)
+    result = extract_docx(make_docx(cv_text), max_chars=500)
+    assert result.truncated
+    assert len(result.text) == 500
+    assert result.text == extract_docx(make_docx(cv_text), max_chars=None).text[:500]
+
+
+def test_damaged_xml_keeps_what_was_read():
+    valid = make_docx(synthetic_cv_text(3))
+    result = extract_docx(_docx_with_broken_xml(valid))
+    assert result.error.startswith(f"{DOCUMENT_PART}: ")
+    assert result.text
+    assert extract_docx(valid).text.startswith(result.text.rsplit("\n", 1)[0])
+
+
+def test_sources_and_invalid_archives(tmp_path):
+    data = make_docx("Jane Doe")
+    path = tmp_path / "cv.docx"
+    path.write_bytes(data)
+    assert extract_docx(str(path)).text == extract_docx(path).text == extract_docx(io.BytesIO(data)).text == "Jane Doe"
+    with pytest.raises(KeyError):
+        extract_docx(_zip_without_document())
+    with pytest.raises(zipfile.BadZipFile):
+        extract_docx(b"not a zip file")
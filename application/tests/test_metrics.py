@@ -0,0 +1,110 @@
+import json
+import re
+import urllib.request
+
+import pytest
+
+from src import metrics
+from src.metrics import MetricsRegistry, RequestTrace, log_request, recent_requests, start_metrics_server
+
+# One sample line of the Prometheus text exposition format.
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_][a-zA-Z0-9_]*="([^"\\]|\\.)*",?)*\})? \S+$')
+
+
+def test_counter_and_gauge_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests", "Requests by outcome.", ("outcome",))
+    requests.inc(outcome="ok")
+    requests.inc(2, outcome='bad "quote"\n')
+    depth = registry.gauge("app_queue_depth", "Queued jobs.")
+    depth.inc(3)
+    depth.dec()
+    assert registry.render() == (
+        "# HELP app_requests Requests by outcome.\n"
+        "# TYPE app_requests counter\n"
+        'app_requests_total{outcome="bad \\"quote\\"\\n"} 2\n'
+        'app_requests_total{outcome="ok"} 1\n'
+        "# HELP app_queue_depth Queued jobs.\n"
+        "# TYPE app_queue_depth gauge\n"
+        "app_queue_depth 2\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    seconds = registry.histogram("app_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        seconds.observe(value, stage="parse")
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'app_seconds_bucket{stage="parse",le="0.1"} 2',
+        'app_seconds_bucket{stage="parse",le="1.0"} 3',
+        'app_seconds_bucket{stage="parse",le="+Inf"} 4',
+        'app_seconds_sum{stage="parse"} 3.65',
+        'app_seconds_count{stage="parse"} 4',
+    ]
+    assert seconds.summary(stage="parse")["mean"] == pytest.approx(3.65 / 4)
+
+
+def test_labels_must_match():
+    counter = MetricsRegistry().counter("app_events", "Events.", ("kind",))
+    with pytest.raises(ValueError):
+        counter.inc(other="x")
+
+
+def test_registering_twice_returns_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("app_events", "Events.") is registry.counter("app_events", "Events.")
+
+
+def test_global_registry_renders_valid_exposition():
+    with RequestTrace("test", mode="unit") as trace:
+        with trace.stage("parse_pdf"):
+            pass
+    for line in metrics.REGISTRY.render().splitlines():
+        assert line.startswith("# ") or SAMPLE_LINE.match(line), line
+
+
+def test_request_trace_records_and_counts():
+    before = metrics.REQUESTS.value(kind="test", mode="unit", outcome="error")
+    with pytest.raises(RuntimeError):
+        with RequestTrace("test", mode="unit") as trace:
+            trace.set(cache="miss")
+            raise RuntimeError("boom")
+    record = recent_requests()[-1]
+    assert (record["request_id"], record["outcome"], record["cache"]) == (trace.request_id, "error", "miss")
+    assert record["error"] == "RuntimeError: boom"
+    assert metrics.REQUESTS.value(kind="test", mode="unit", outcome="error") == before + 1
+    assert trace.finish() == {}
+
+
+def test_request_log_is_opt_in(monkeypatch, tmp_path, capsys):
+    monkeypatch.delenv("SMART_CV_REQUEST_LOG", raising=False)
+    log_request({"request_id": "a"})
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv("SMART_CV_REQUEST_LOG", "stdout")
+    log_request({"request_id": "b"})
+    assert json.loads(capsys.readouterr().out) == {"request_id": "b"}
+
+    path = tmp_path / "requests.jsonl"
+    monkeypatch.setenv("SMART_CV_REQUEST_LOG", str(path))
+    log_request({"request_id": "c"})
+    log_request({"request_id": "d"})
+    assert [json.loads(line)["request_id"] for line in path.read_text().splitlines()] == ["c", "d"]
+
+
+def test_metrics_server(monkeypatch):
+    monkeypatch.setattr(metrics, "_metrics_server", None)
+    monkeypatch.delenv("SMART_CV_METRICS_PORT", raising=False)
+    assert start_metrics_server() is None
+
+    port = start_metrics_server(0, host="127.0.0.1")
+    try:
+        assert start_metrics_server(0, host="127.0.0.1") == port
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "# TYPE smart_cv_requests_total counter" in response.read().decode()
+    finally:
+        metrics._metrics_server.shutdown()
+        metrics._metrics_server.server_close()
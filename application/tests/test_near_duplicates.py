@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from benchmarks.corpus import synthetic_cv_text
+from src.near_duplicates import NearDuplicateDetector, diff_cv_texts, minhash, shingles
+
+
+def _variant(cv_text: str, extra: str = "Volunteer mentor at a local coding club") -> str:
+    return cv_text.replace("\n", "\n\n", 3) + "\n" + extra
+
+
+def test_minhash_estimates_jaccard_similarity():
+    a = set(range(1000))
+    b = set(range(200, 1200))
+    signature_a = minhash(np.array(sorted(a), dtype=np.uint64))
+    signature_b = minhash(np.array(sorted(b), dtype=np.uint64))
+    jaccard = len(a & b) / len(a | b)
+    assert np.mean(signature_a == signature_b) == pytest.approx(jaccard, abs=0.12)
+
+
+def test_shingles_ignore_case_and_whitespace():
+    assert np.array_equal(shingles("Senior  Python\nEngineer at Acme"), shingles("senior python engineer AT acme"))
+    assert len(shingles("")) == 0
+    assert len(shingles("two words")) == 1
+
+
+def test_variant_joins_the_cluster_of_the_original():
+    detector = NearDuplicateDetector()
+    original = synthetic_cv_text(0)
+    assert not detector.add("original", original).is_duplicate
+    match = detector.add("variant", _variant(original))
+    assert match.is_duplicate
+    assert match.representative == "original"
+    assert match.similarity >= detector.threshold
+    assert not detector.add("other", synthetic_cv_text(1)).is_duplicate
+    assert detector.clusters() == {"original": ["original", "variant"], "other": ["other"]}
+
+
+def test_chained_variants_report_similarity_to_the_representative():
+    detector = NearDuplicateDetector()
+    original = synthetic_cv_text(2)
+    detector.add("original", original)
+    detector.add("first", _variant(original))
+    match = detector.add("second", _variant(original, "Fluent in Arabic and English"))
+    assert match.representative == "original"
+    assert match.similarity == pytest.approx(np.mean(minhash(shingles(original)) == minhash(shingles(
+        _variant(original, "Fluent in Arabic and English")))))
+
+
+def test_find_does_not_index_and_re_adding_keeps_the_cluster():
+    detector = NearDuplicateDetector()
+    original = synthetic_cv_text(3)
+    assert detector.find(original) is None
+    assert len(detector) == 0
+    detector.add("original", original)
+    assert detector.find(_variant(original))[0] == "original"
+    assert detector.add("original", original).representative == "original"
+    assert len(detector) == 1
+
+
+def test_max_entries_forgets_the_oldest():
+    detector = NearDuplicateDetector(max_entries=2)
+    original = synthetic_cv_text(4)
+    detector.add("original", original)
+    detector.add("variant", _variant(original))
+    detector.add("other", synthetic_cv_text(5))
+    assert len(detector) == 2
+    assert detector.find(original)[0] == "variant"
+    # The cluster's representative was forgotten; its remaining member takes over.
+    match = detector.add("again", _variant(original, "Certified Scrum Master"))
+    assert match.representative == "variant"
+    assert all(doc_id != "original" for band in detector._buckets for bucket in band.values() for doc_id in bucket)
+
+
+def test_diff_cv_texts():
+    original = "Jane Doe\nPython\nSQL"
+    variant = "Jane  Doe\nPython\nDocker"
+    assert diff_cv_texts(original, variant) == {"added": ["Docker"], "removed": ["SQL"]}
+    assert diff_cv_texts("", "\n".join(str(i) for i in range(50)), limit=3)["added"] == ["0", "1", "2"]
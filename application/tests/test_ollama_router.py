@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+import requests
+
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from src.llm_client import PooledChatOllama
+from src.metrics import HEDGED_REQUESTS
+from src.ollama_router import OllamaRouter, router_from_env
+
+# Nothing listens here, so connections are refused right away.
+DEAD_URL = "http://127.0.0.1:9"
+
+
+@pytest.fixture(scope="module")
+def fast_server():
+    with FakeOllamaServer(FakeOllamaConfig(latency_ms=5, tokens_per_second=2000)) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def slow_server():
+    with FakeOllamaServer(FakeOllamaConfig(latency_ms=1500, tokens_per_second=2000)) as server:
+        yield server
+
+
+def _router(urls, **kwargs) -> OllamaRouter:
+    """A router without the background health checks; tests call check_health themselves."""
+    router = OllamaRouter(urls, **kwargs)
+    router._start_health_checks = lambda: None
+    return router
+
+
+def _llm(router: OllamaRouter) -> PooledChatOllama:
+    return PooledChatOllama(model="fake", base_url=router.urls()[0], router=router)
+
+
+def _outstanding(router: OllamaRouter):
+    return [endpoint["outstanding"] for endpoint in router.stats()]
+
+
+def test_urls_are_normalized_and_deduplicated():
+    router = _router(["gpu1", "http://gpu1:11434", "gpu2:11500"])
+    assert router.urls() == ["http://gpu1:11434", "http://gpu2:11500"]
+    with pytest.raises(ValueError):
+        OllamaRouter([])
+
+
+def test_least_outstanding_endpoint_is_picked():
+    router = _router(["a", "b", "c"])
+    first, second, third = router.acquire(), router.acquire(), router.acquire()
+    assert len({first.url, second.url, third.url}) == 3
+    router.release(second)
+    assert router.acquire() is second
+    assert router.acquire(idle_only=True) is None
+    assert router.acquire(exclude=(first, second, third)) is None
+    assert _outstanding(router) == [1, 1, 1]
+
+
+def test_health_checks_take_endpoints_out_of_rotation(fast_server):
+    router = _router([DEAD_URL, fast_server.url])
+    router.check_health()
+    health = {endpoint["url"]: endpoint["healthy"] for endpoint in router.stats()}
+    assert health == {DEAD_URL: False, fast_server.url: True}
+    assert all(router.acquire().url == fast_server.url for _ in range(3))
+
+
+def test_connection_errors_fail_over(fast_server):
+    router = _router([DEAD_URL, fast_server.url])
+    assert _llm(router).invoke("Hello").content
+    stats = {endpoint["url"]: endpoint for endpoint in router.stats()}
+    assert (stats[DEAD_URL]["healthy"], stats[DEAD_URL]["failures"]) == (False, 1)
+    assert _outstanding(router) == [0, 0]
+
+    everything_down = _router([DEAD_URL])
+    with pytest.raises(requests.ConnectionError):
+        _llm(everything_down).invoke("Hello")
+
+
+def test_slow_requests_are_hedged(slow_server, fast_server):
+    router = _router([slow_server.url, fast_server.url], hedge_after=0.1)
+    hedges = HEDGED_REQUESTS.value(winner="hedge")
+    start = time.perf_counter()
+    assert _llm(router).invoke("Hello").content
+    assert time.perf_counter() - start < 1.0
+    assert HEDGED_REQUESTS.value(winner="hedge") == hedges + 1
+
+
+def test_async_requests_are_hedged(slow_server, fast_server):
+    router = _router([slow_server.url, fast_server.url], hedge_after=0.1)
+    hedges = HEDGED_REQUESTS.value(winner="hedge")
+    start = time.perf_counter()
+    assert asyncio.run(_llm(router).ainvoke("Hello")).content
+    assert time.perf_counter() - start < 1.0
+    assert HEDGED_REQUESTS.value(winner="hedge") == hedges + 1
+    # The slow copy was cancelled, not left running.
+    assert _outstanding(router) == [0, 0]
+
+
+def test_fast_async_requests_are_not_hedged(fast_server, slow_server):
+    router = _router([fast_server.url, slow_server.url], hedge_after=0.5)
+    before = HEDGED_REQUESTS.value(winner="primary") + HEDGED_REQUESTS.value(winner="hedge")
+    assert asyncio.run(_llm(router).ainvoke("Hello")).content
+    assert HEDGED_REQUESTS.value(winner="primary") + HEDGED_REQUESTS.value(winner="hedge") == before
+    assert router.stats()[0]["requests"] == 1 and router.stats()[1]["requests"] == 0
+
+
+def test_async_errors_release_the_endpoint():
+    router = _router([DEAD_URL, "http://127.0.0.1:19"], hedge_after=0.05)
+    with pytest.raises(aiohttp.ClientError):
+        asyncio.run(_llm(router).ainvoke("Hello"))
+    assert _outstanding(router) == [0, 0]
+
+
+def test_router_from_env(monkeypatch):
+    monkeypatch.delenv("SMART_CV_OLLAMA_ENDPOINTS", raising=False)
+    assert router_from_env() is None
+    monkeypatch.setenv("SMART_CV_OLLAMA_ENDPOINTS", "gpu1, gpu2:11500 ,")
+    monkeypatch.setenv("SMART_CV_HEDGE_AFTER_MS", "250")
+    router = router_from_env()
+    assert router.urls() == ["http://gpu1:11434", "http://gpu2:11500"]
+    assert router.hedge_after == 0.25
@@ -0,0 +1,75 @@
+import zipfile
+
+import pytest
+
+from benchmarks.corpus import make_docx, make_pdf
+from src import parser
+from src.cache import MemoryCache, TieredCache, hash_bytes
+from src.parser import PARSER_VERSION, detect_format, parse_cv, parse_cv_bytes, parse_cv_cached
+
+CV_TEXT = "Jane Doe\nBackend engineer\nPython, SQL"
+
+
+@pytest.fixture
+def parse_cache():
+    return TieredCache("test", MemoryCache())
+
+
+@pytest.mark.parametrize("data, expected", [
+    (make_pdf([CV_TEXT]), "pdf"),
+    (b"\n  %PDF-1.7 with leading whitespace", "pdf"),
+    (make_docx(CV_TEXT), "docx"),
+    (b"PK\x03\x04 a broken zip", None),
+    (b"plain text CV", None),
+])
+def test_detect_format(data, expected):
+    assert detect_format(data) == expected
+
+
+def test_detect_format_rejects_zips_without_a_document(tmp_path):
+    path = tmp_path / "archive.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/styles.xml", "<styles/>")
+    assert detect_format(path.read_bytes()) is None
+
+
+def test_content_wins_over_the_file_name():
+    assert "Backend engineer" in parse_cv_bytes(make_pdf([CV_TEXT]), "cv.docx")
+    assert "Backend engineer" in parse_cv_bytes(make_docx(CV_TEXT), "cv.pdf")
+
+
+def test_unsupported_content_raises():
+    with pytest.raises(ValueError):
+        parse_cv_bytes(b"plain text CV", "cv.txt")
+
+
+@pytest.mark.parametrize("data", [make_pdf([CV_TEXT]), make_docx(CV_TEXT)], ids=["pdf", "docx"])
+def test_parse_cv_accepts_paths_bytes_and_streams(tmp_path, data):
+    path = tmp_path / "cv.bin"
+    path.write_bytes(data)
+    with open(path, "rb") as stream:
+        texts = {parse_cv(str(path)), parse_cv(path), parse_cv(data), parse_cv(stream)}
+    assert len(texts) == 1
+    assert "Backend engineer" in texts.pop()
+
+
+def test_parse_cv_cached_keys_on_content_and_parser_version(parse_cache, monkeypatch):
+    data = make_pdf([CV_TEXT])
+    text = parse_cv_cached(data, "first.pdf", cache=parse_cache)
+    assert parse_cache.get(f"v{PARSER_VERSION}:{hash_bytes(data)}") == text
+
+    calls = []
+    monkeypatch.setattr(parser, "parse_cv_bytes", lambda *args: calls.append(args) or "reparsed")
+    # Same bytes under another name: served from the cache.
+    assert parse_cv_cached(data, "renamed.pdf", cache=parse_cache) == text
+    assert calls == []
+
+    monkeypatch.setattr(parser, "PARSER_VERSION", PARSER_VERSION + 1)
+    assert parse_cv_cached(data, "first.pdf", cache=parse_cache) == "reparsed"
+    assert len(calls) == 1
+
+
+def test_empty_extractions_are_not_cached(parse_cache):
+    data = make_pdf([""])
+    assert parse_cv_cached(data, "blank.pdf", cache=parse_cache).strip() == ""
+    assert parse_cache.get(f"v{PARSER_VERSION}:{hash_bytes(data)}") is None
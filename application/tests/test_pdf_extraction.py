@@ -0,0 +1,76 @@
+import pytest
+
+from benchmarks.corpus import make_pdf
+from src import pdf_extraction
+from src.pdf_extraction import PdfExtractionLimits, extract_pdf
+
+PAGES = [f"Page {index + 1}\nPython engineer at company {index}" for index in range(6)]
+
+
+def test_small_pdf_is_read_in_the_caller():
+    result = extract_pdf(make_pdf(PAGES))
+    assert (result.total_pages, result.pages_read, result.truncation_reason) == (6, 6, None)
+    assert "company 0" in result.text and "company 5" in result.text
+    assert len(result.page_seconds) == 6
+
+
+def test_max_pages():
+    result = extract_pdf(make_pdf(PAGES), PdfExtractionLimits(max_pages=2))
+    assert (result.total_pages, result.pages_read, result.truncation_reason) == (6, 2, "max_pages")
+    assert "company 1" in result.text and "company 2" not in result.text
+
+
+def test_char_budget_keeps_a_prefix():
+    result = extract_pdf(make_pdf(PAGES), PdfExtractionLimits(max_chars=40))
+    assert result.truncation_reason == "char_budget"
+    assert result.pages_read < 6
+    assert result.text.startswith("Page 1")
+
+
+def test_timeout():
+    result = extract_pdf(make_pdf(PAGES), PdfExtractionLimits(timeout_seconds=0))
+    assert (result.pages_read, result.truncation_reason) == (0, "timeout")
+
+
+def test_unreadable_input_is_reported_not_raised():
+    result = extract_pdf(b"%PDF-1.4 not really a pdf")
+    assert result.truncation_reason == "error"
+    assert result.text == ""
+    assert result.errors
+
+
+def test_isolated_extraction_matches_inline():
+    data = make_pdf(PAGES)
+    inline = extract_pdf(data, PdfExtractionLimits(isolate=False))
+    # Forces both the open and the page ranges into a single worker process.
+    isolated = extract_pdf(data, PdfExtractionLimits(inline_max_bytes=0, pages_per_chunk=4, max_workers=1))
+    assert not any(error.startswith("isolated extraction unavailable") for error in isolated.errors)
+    assert (isolated.text, isolated.pages_read, isolated.total_pages) == (inline.text, 6, 6)
+
+    limited = extract_pdf(data, PdfExtractionLimits(inline_max_bytes=0, pages_per_chunk=1, max_workers=1, max_pages=3))
+    assert (limited.pages_read, limited.truncation_reason) == (3, "max_pages")
+
+
+def test_falls_back_to_the_caller_without_worker_processes(monkeypatch):
+    def unavailable(workers, max_memory_mb):
+        raise RuntimeError("no workers here")
+
+    monkeypatch.setattr(pdf_extraction, "_get_pool", unavailable)
+    data = make_pdf(PAGES)
+    result = extract_pdf(data, PdfExtractionLimits(inline_max_bytes=0))
+    assert result.errors == ["isolated extraction unavailable: no workers here"]
+    assert result.text == extract_pdf(data, PdfExtractionLimits(isolate=False)).text
+    assert (result.pages_read, result.truncation_reason) == (6, None)
+
+
+@pytest.mark.parametrize("source", ["path", "stream"])
+def test_sources(tmp_path, source):
+    data = make_pdf(PAGES[:1])
+    path = tmp_path / "cv.pdf"
+    path.write_bytes(data)
+    if source == "path":
+        result = extract_pdf(str(path))
+    else:
+        with open(path, "rb") as stream:
+            result = extract_pdf(stream)
+    assert "company 0" in result.text
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from benchmarks.corpus import synthetic_cv_text
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from src.cache import MemoryCache, TieredCache
+from src.rag_pipeline import LLMGenerator
+
+
+@pytest.fixture(scope="module")
+def fast_server():
+    with FakeOllamaServer(FakeOllamaConfig(latency_ms=5, tokens_per_second=5000)) as server:
+        yield server
+
+
+def _generator(server: FakeOllamaServer) -> LLMGenerator:
+    return LLMGenerator(cache=TieredCache("test", MemoryCache()), base_url=server.url)
+
+
+@pytest.mark.parametrize("mode", ["concurrent", "sequential", "fused"])
+def test_every_mode_returns_an_analysis(fast_server, mode):
+    analysis = _generator(fast_server).generate_cv_analysis(synthetic_cv_text(0), use_cache=False, mode=mode)
+    assert 0 <= analysis["score"] <= 100
+    assert analysis["summary"]
+    assert analysis["recommendations"]
+
+
+@pytest.mark.parametrize("mode", ["concurrent", "sequential", "fused"])
+def test_every_mode_enforces_the_timeout(mode):
+    with FakeOllamaServer(FakeOllamaConfig(latency_ms=2000)) as server:
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            _generator(server).generate_cv_analysis(synthetic_cv_text(0), use_cache=False, mode=mode, timeout=0.2)
+        assert time.perf_counter() - start < 1.5
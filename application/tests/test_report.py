@@ -0,0 +1,62 @@
+import io
+import json
+
+import pypdf
+
+from benchmarks.corpus import synthetic_cv_text
+from src.ats_rules import RuleScorer
+from src.report import build_report, report_json, report_pdf
+
+ANALYSIS = {
+    "score": 72,
+    "summary": "Solid backend profile (5+ years).\nWeak on metrics − add numbers → impact.",
+    "recommendations": "1. Quantify results\n\n2. Add a projects section",
+    "sections": {"experience": "Backend Engineer - Acme (2019 - 2023)", "languages": "Arabic, English"},
+}
+
+
+def _report(analysis: dict = ANALYSIS) -> dict:
+    return build_report(analysis, "cv.pdf", "ab" * 32, "sequential", generated_at="2026-01-02T03:04:05+00:00")
+
+
+def _pdf_text(data: bytes) -> list:
+    reader = pypdf.PdfReader(io.BytesIO(data))
+    return [page.extract_text() for page in reader.pages]
+
+
+def test_json_report_round_trips():
+    report = _report()
+    assert json.loads(report_json(report)) == report
+    assert report["analysis"] is ANALYSIS
+    assert "−" in report_json(report).decode("utf-8")
+    assert build_report(ANALYSIS, "cv.pdf", "", "fast")["generated_at"].endswith("+00:00")
+
+
+def test_pdf_report_contains_the_analysis():
+    pages = _pdf_text(report_pdf(_report()))
+    assert len(pages) == 1
+    text = pages[0]
+    for expected in ("CV Analysis Report", "File: cv.pdf", "ATS Score: 72/100", "Solid backend profile (5+ years)",
+                     "add numbers -> impact", "1. Quantify results", "Work Experience", "Languages"):
+        assert expected in text, expected
+
+
+def test_pdf_report_includes_the_rule_score():
+    rule_score = RuleScorer().score(synthetic_cv_text(0)).as_dict()
+    text = _pdf_text(report_pdf(_report({**ANALYSIS, "rule_score": rule_score})))[0]
+    assert f"Rule-Based Check: {rule_score['score']}/100" in text
+    first = next(iter(rule_score["criteria"].values()))
+    assert first["label"] in text
+
+
+def test_long_reports_are_paginated_and_wrapped():
+    long_line = "word " * 400
+    analysis = {**ANALYSIS, "summary": "\n".join([long_line] + [f"Line {index}" for index in range(120)])}
+    data = report_pdf(_report(analysis))
+    assert data.startswith(b"%PDF-1.4") and data.rstrip().endswith(b"%%EOF")
+    pages = _pdf_text(data)
+    assert len(pages) > 1
+    assert "Line 119" in pages[-2] + pages[-1]
+    assert pages[-1].endswith("Arabic, English")
+    # Nothing runs off the right edge: the long line was wrapped onto many lines.
+    assert max(len(line) for page in pages for line in page.split("\n")) < 120
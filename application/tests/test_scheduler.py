@@ -0,0 +1,205 @@
+import threading
+import time
+
+import pytest
+
+from src.cache import MemoryCache, TieredCache
+from src.metrics import JOBS
+from src.rag_pipeline import LLMGenerator
+from src.scheduler import CANCELLED, DONE, QUEUED, RUNNING, JobScheduler, QueueFullError
+
+
+class BlockingAnalyses:
+    """Stands in for stream_cv_analysis: each CV's analysis runs until it is released."""
+    def __init__(self):
+        self.started = []
+        self._release = {}
+        self._released_all = False
+        self._lock = threading.Lock()
+
+    def _event(self, cv_text: str) -> threading.Event:
+        with self._lock:
+            event = self._release.setdefault(cv_text, threading.Event())
+            if self._released_all:
+                event.set()
+            return event
+
+    def release(self, cv_text: str) -> None:
+        self._event(cv_text).set()
+
+    def release_all(self) -> None:
+        with self._lock:
+            self._released_all = True
+            for event in self._release.values():
+                event.set()
+
+    def __call__(self, cv_text, use_cache=True, mode="concurrent", timeout=None):
+        self.started.append(cv_text)
+        if not self._event(cv_text).wait(10):
+            raise TimeoutError(cv_text)
+        yield {"type": "score", "score": 50}
+        yield {"type": "done", "analysis": {"score": 50, "cv": cv_text}}
+
+
+@pytest.fixture
+def analyses():
+    return BlockingAnalyses()
+
+
+@pytest.fixture
+def make_scheduler(analyses):
+    schedulers = []
+
+    def make(workers: int = 2, max_queue: int = 8) -> JobScheduler:
+        # Nothing is sent to this server: analyses are served by BlockingAnalyses.
+        generator = LLMGenerator(cache=TieredCache("test", MemoryCache()), base_url="http://127.0.0.1:9")
+        generator.stream_cv_analysis = analyses
+        scheduler = JobScheduler(generator, workers=workers, max_queue=max_queue)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    analyses.release_all()
+    for scheduler in schedulers:
+        scheduler.shutdown()
+
+
+def _wait_until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_concurrent_jobs_take_two_slots(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=2)
+    concurrent = scheduler.submit("cv concurrent", mode="concurrent")
+    assert concurrent.wait_started(5)
+    sequential = scheduler.submit("cv sequential", mode="sequential")
+    time.sleep(0.1)
+    assert sequential.status == QUEUED
+    assert scheduler.stats()["slots_in_use"] == 2
+
+    analyses.release("cv concurrent")
+    assert sequential.wait_started(5)
+    assert concurrent.wait(5) and concurrent.result["cv"] == "cv concurrent"
+    _wait_until(lambda: scheduler.stats()["slots_in_use"] == 1)
+    analyses.release("cv sequential")
+    assert sequential.wait(5) and sequential.status == DONE
+
+
+def test_sequential_jobs_share_the_slots(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=2)
+    first = scheduler.submit("cv 1", mode="sequential")
+    second = scheduler.submit("cv 2", mode="sequential")
+    assert first.wait_started(5) and second.wait_started(5)
+    assert scheduler.stats()["slots_in_use"] == 2
+
+
+def test_a_job_wider_than_the_pool_runs_alone(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=1)
+    job = scheduler.submit("cv", mode="concurrent")
+    assert job.wait_started(5)
+    analyses.release("cv")
+    assert job.wait(5) and job.status == DONE
+
+
+def test_a_waiting_wide_job_keeps_its_place(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=2)
+    running = scheduler.submit("cv running", mode="sequential")
+    assert running.wait_started(5)
+    wide = scheduler.submit("cv wide", mode="concurrent")
+    narrow = scheduler.submit("cv narrow", mode="sequential")
+    time.sleep(0.1)
+    # One slot is free, but the concurrent job at the head of the queue needs two.
+    assert (wide.status, narrow.status) == (QUEUED, QUEUED)
+    assert (wide.position(), narrow.position()) == (0, 1)
+
+    analyses.release("cv running")
+    assert wide.wait_started(5)
+    time.sleep(0.1)
+    assert narrow.status == QUEUED
+    analyses.release("cv wide")
+    analyses.release("cv narrow")
+    assert narrow.wait(5)
+    assert analyses.started == ["cv running", "cv wide", "cv narrow"]
+
+
+def test_identical_requests_share_a_job(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=1)
+    before = JOBS.value(outcome="deduplicated")
+    job = scheduler.submit("cv", mode="sequential")
+    same = scheduler.submit("cv  ", mode="sequential")
+    other_mode = scheduler.submit("cv", mode="fused")
+    assert same is job and other_mode is not job
+    assert job.subscribers == 2
+    assert JOBS.value(outcome="deduplicated") == before + 1
+
+    analyses.release("cv")
+    events = list(same.iter_events())
+    assert [event["type"] for event in events] == ["rule_score", "score", "done"]
+    assert list(job.iter_events()) == events
+
+
+def test_cancel_needs_every_subscriber(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=1)
+    running = scheduler.submit("cv running", mode="sequential")
+    assert running.wait_started(5)
+    queued = scheduler.submit("cv queued", mode="sequential")
+    assert scheduler.submit("cv queued", mode="sequential") is queued
+    assert not queued.cancel()
+    assert queued.status == QUEUED
+    assert queued.cancel()
+    assert queued.status == CANCELLED
+    assert scheduler.stats()["queued"] == 0
+    # A running job is never cancelled: its result still goes to the cache.
+    assert not running.cancel()
+    assert running.status == RUNNING
+
+
+def test_eta_counts_slots(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=2)
+    scheduler._record_service_time("concurrent", 10.0)
+    scheduler._record_service_time("sequential", 4.0)
+    running = scheduler.submit("cv running", mode="concurrent")
+    assert running.wait_started(5)
+    first = scheduler.submit("cv first", mode="sequential")
+    second = scheduler.submit("cv second", mode="sequential")
+    wide = scheduler.submit("cv wide", mode="concurrent")
+    # Both slots free at 10s; the sequential jobs run side by side until 14s,
+    # then the concurrent job needs both of them for another 10s.
+    assert running.eta_seconds() == pytest.approx(10, abs=0.5)
+    assert first.eta_seconds() == pytest.approx(14, abs=0.5)
+    assert second.eta_seconds() == pytest.approx(14, abs=0.5)
+    assert wide.eta_seconds() == pytest.approx(24, abs=0.5)
+
+
+def test_queue_limit(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=1, max_queue=1)
+    running = scheduler.submit("cv running", mode="sequential")
+    assert running.wait_started(5)
+    scheduler.submit("cv queued", mode="sequential")
+    with pytest.raises(QueueFullError) as error:
+        scheduler.submit("cv rejected", mode="sequential")
+    assert error.value.depth == 1
+
+
+def test_cached_and_fast_jobs_skip_the_queue(make_scheduler, analyses):
+    scheduler = make_scheduler(workers=1)
+    generator = scheduler.generator
+    analysis = {"score": 70, "summary": "Solid.", "recommendations": "1. Quantify results"}
+    generator.cache.set(generator.analysis_key("cv", "sequential"), analysis)
+    cached = scheduler.submit("cv", mode="sequential")
+    assert cached.status == DONE and cached.result["score"] == 70
+    assert "rule_score" in cached.result
+
+    fast = scheduler.submit("Jane Doe\nExperience\nPython", mode="fast")
+    assert fast.status == DONE
+    assert analyses.started == []
+
+
+def test_submit_after_shutdown_raises(make_scheduler):
+    scheduler = make_scheduler()
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("cv", mode="sequential")
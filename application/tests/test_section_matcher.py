@@ -0,0 +1,108 @@
+import random
+import re
+from typing import Dict, List
+
+import pytest
+
+from benchmarks.bench_section_matcher import SYMBOL_KEYWORDS, legacy_extract_sections, synthetic_cv
+from src.section_matcher import DEFAULT_TAXONOMY, SectionMatcher
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _occurs(text: str, keyword: str) -> bool:
+    """Whether keyword starts at a word start in text, or anywhere if it starts with a symbol."""
+    start = text.find(keyword)
+    while start >= 0:
+        if start == 0 or not _WORD_CHAR.match(text[start - 1]) or not _WORD_CHAR.match(keyword[0]):
+            return True
+        start = text.find(keyword, start + 1)
+    return False
+
+
+def naive_sections(cv_text: str, taxonomy: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Reference implementation: tries every keyword of every section on every line."""
+    result: Dict[str, List[str]] = {section: [] for section in taxonomy}
+    for line in cv_text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        text = " ".join(line.lower().split())
+        for section, keywords in taxonomy.items():
+            if any(_occurs(text, " ".join(keyword.lower().split())) for keyword in keywords):
+                result[section].append(line)
+                break
+    return result
+
+
+def _taxonomy_with_symbols() -> Dict[str, List[str]]:
+    taxonomy = {section: list(keywords) for section, keywords in DEFAULT_TAXONOMY.items()}
+    taxonomy["skills"].extend(SYMBOL_KEYWORDS)
+    return taxonomy
+
+
+def _fuzz_cv(seed: int, taxonomy: Dict[str, List[str]], lines: int = 300) -> str:
+    # Keywords glued to words and symbols on either side, so matches at and
+    # away from word starts are both exercised.
+    rng = random.Random(seed)
+    keywords = [keyword for section in taxonomy.values() for keyword in section]
+    pieces = keywords + ["net", "asp", "home", "team", "led", "x", "2020", "c", "node", "js"]
+    joiners = ["", " ", "  ", ".", "/", "-", "(", ")", ", ", "\t"]
+    out = []
+    for _ in range(lines):
+        parts = [rng.choice(pieces) for _ in range(rng.randint(1, 5))]
+        line = ""
+        for part in parts:
+            line += rng.choice(joiners) + (part.title() if rng.random() < 0.3 else part)
+        out.append(line)
+    return "\n".join(out)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_naive_reference(seed):
+    taxonomy = _taxonomy_with_symbols()
+    cv_text = _fuzz_cv(seed, taxonomy)
+    assert SectionMatcher(taxonomy).classify(cv_text).lines == naive_sections(cv_text, taxonomy)
+
+
+def test_matches_legacy_scan_without_nested_keywords():
+    # The benchmark CV leaves out keywords the legacy substring scan finds
+    # inside other words; on everything else both must agree.
+    taxonomy = _taxonomy_with_symbols()
+    cv_text = synthetic_cv(500, seed=3, taxonomy=taxonomy)
+    assert SectionMatcher(taxonomy).classify(cv_text).lines == legacy_extract_sections(cv_text, taxonomy)
+
+
+@pytest.mark.parametrize("line, hits", [
+    (".NET Core services", {"skills": 1}),
+    ("ASP.NET MVC", {"skills": 1}),
+    ("C# and C++", {"skills": 2}),
+    ("Node.js, CI/CD", {"skills": 2}),
+    ("C#/work", {"skills": 1, "experience": 1}),
+    ("C++Work", {"skills": 1, "experience": 1}),
+    ("Frameworks", {"skills": 1}),
+    ("Work history", {"experience": 1}),
+    ("Networking and homework", {}),
+    ("Magnet", {}),
+])
+def test_symbol_keywords_and_word_starts(line, hits):
+    matcher = SectionMatcher({"skills": SYMBOL_KEYWORDS + ["framework"], "experience": ["work"]})
+    assert matcher.match_line(line) == hits
+
+
+def test_multi_word_keywords_match_across_whitespace():
+    matcher = SectionMatcher()
+    assert matcher.match_line("Machine   learning\tand deep learning") == {"skills": 2}
+
+
+def test_line_goes_to_first_section_and_scores_count_every_hit():
+    match = SectionMatcher().classify("Software engineer at a university\n\nPython, SQL")
+    assert match.lines["education"] == ["Software engineer at a university"]
+    assert match.lines["experience"] == []
+    assert match.lines["skills"] == ["Python, SQL"]
+    assert match.scores == {"education": 1, "experience": 1, "projects": 0, "skills": 2}
+
+
+def test_empty_taxonomy_matches_nothing():
+    matcher = SectionMatcher({"skills": []})
+    assert matcher.classify("Python developer").lines == {"skills": []}
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from benchmarks.corpus import synthetic_cv_text
+from benchmarks.fake_ollama import FakeOllamaConfig, FakeOllamaServer
+from src.cache import MemoryCache, TieredCache
+from src.rag_pipeline import LLMGenerator
+from src.streaming import AnalysisStreamParser, ThinkFilter, parse_score
+
+FUSED_OUTPUT = (
+    "<think>The score should be 40, maybe SCORE: 40</think>"
+    "SCORE: 78\n"
+    "SUMMARY: Strong Python background, weak on metrics.\n"
+    "RECOMMENDATIONS:\n"
+    "1. **Quantify** achievements\n"
+    "- Add a skills section\n"
+    "not a list item\n"
+    "* ok\n"
+    "3. Tailor the summary to each role"
+)
+
+
+def _feed(parser, text: str, size: int):
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events + parser.finish()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_think_filter_handles_tags_split_across_chunks(size):
+    text = "a<think>hidden</think>b</think>c<thi"
+    think = ThinkFilter()
+    visible = "".join(think.feed(text[start:start + size]) for start in range(0, len(text), size)) + think.flush()
+    assert visible == "abc<thi"
+
+
+def test_think_filter_drops_an_unclosed_block():
+    think = ThinkFilter()
+    assert think.feed("answer<think>still thinking") == "answer"
+    assert think.flush() == ""
+
+
+@pytest.mark.parametrize("size", [1, 4, 13, 1000])
+def test_fused_stream_events(size):
+    events = _feed(AnalysisStreamParser("fused"), FUSED_OUTPUT, size)
+    assert events[0] == {"type": "score", "score": 78}
+    summary = "".join(event["text"] for event in events if event["type"] == "summary_token")
+    assert summary.strip() == "Strong Python background, weak on metrics."
+    assert [event["text"] for event in events if event["type"] == "recommendation"] == [
+        "Quantify achievements",
+        "Add a skills section",
+        "Tailor the summary to each role",
+    ]
+    assert [event["index"] for event in events if event["type"] == "recommendation"] == [1, 2, 3]
+
+
+def test_score_waits_for_the_whole_number():
+    parser = AnalysisStreamParser("scoring")
+    assert parser.feed("SCORE: 7") == []
+    assert parser.feed("5\n") == [{"type": "score", "score": 75}]
+    assert parser.raw_output == "SCORE: 75\n"
+
+
+def test_recommendations_are_capped():
+    output = "\n".join(f"{index}. Recommendation number {index}" for index in range(1, 9))
+    events = _feed(AnalysisStreamParser("recommendations"), output, 5)
+    assert [event["index"] for event in events] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("SCORE: 72", 72),
+    ("ats score: 64\nSUMMARY: ...", 64),
+    ("Overall I would rate this CV 81/100.", 81),
+    ("SCORE: 250", 100),
+    ("Rated 5 / 100 and later SCORE: 60", 60),
+    ("Costs 40/1000 and nothing else", None),
+    ("no score here", None),
+])
+def test_parse_score(text, expected):
+    assert parse_score(text) == expected
+
+
+def test_parse_score_while_streaming_only_trusts_a_finished_label():
+    assert parse_score("Rated 81/100 so far", final=False) is None
+    assert parse_score("SCORE: 8", final=False) is None
+    assert parse_score("SCORE: 85\n", final=False) == 85
+
+
+@pytest.mark.parametrize("output", ["SCORE: 140\nSUMMARY: Too good to be true.", "I give it 64/100.\nSUMMARY: Fine."])
+def test_streamed_score_matches_the_final_score(output):
+    # Nothing is sent to this server.
+    generator = LLMGenerator(cache=TieredCache("test", MemoryCache()), base_url="http://127.0.0.1:9")
+    streamed = _feed(AnalysisStreamParser("scoring"), output, 3)
+    final_score, _ = generator._parse_score_and_summary(output)
+    assert streamed[0] == {"type": "score", "score": final_score}
+
+
+def test_async_and_sync_streams_agree():
+    async def collect(generator, cv_text):
+        return [event async for event in generator.astream_cv_analysis(cv_text, use_cache=False, mode="fused")]
+
+    with FakeOllamaServer(FakeOllamaConfig(latency_ms=5, tokens_per_second=5000, think_tokens=20)) as server:
+        generator = LLMGenerator(cache=TieredCache("test", MemoryCache()), base_url=server.url)
+        cv_text = synthetic_cv_text(0)
+        events = list(generator.stream_cv_analysis(cv_text, use_cache=False, mode="fused"))
+        async_events = asyncio.run(collect(generator, cv_text))
+    done = events[-1]["analysis"]
+    assert [event["type"] for event in events] == [event["type"] for event in async_events]
+    assert next(event["score"] for event in events if event["type"] == "score") == done["score"]
+    assert done == async_events[-1]["analysis"]
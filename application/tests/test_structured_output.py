@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from src.structured_output import (
+    StructuredOutputStats,
+    field_schema,
+    parse_json_object,
+    run_structured_analysis,
+    validate_fields,
+)
+
+VALID = {
+    "score": 72,
+    "summary": "Solid backend experience, but achievements are not quantified.",
+    "recommendations": ["Quantify results", "Add a summary"],
+}
+
+
+def scripted(responses):
+    """An invoke function that answers each chain from a list of outputs, recording the calls."""
+    calls = []
+
+    def invoke(chain, inputs):
+        calls.append(chain)
+        return responses[chain].pop(0)
+    invoke.calls = calls
+    return invoke
+
+
+@pytest.mark.parametrize("output, expected", [
+    ('{"score": 72}', {"score": 72}),
+    ('<think>{"score": 1}</think>\n{"score": 72}', {"score": 72}),
+    ('Here you go: {"score": 72} Hope it helps', {"score": 72}),
+    ("[1, 2]", None),
+    ("no json", None),
+    ('{"score": ', None),
+])
+def test_parse_json_object(output, expected):
+    assert parse_json_object(output) == expected
+
+
+def test_field_schema():
+    assert field_schema("score") == {
+        "type": "object",
+        "properties": {"score": {"type": "integer", "minimum": 0, "maximum": 100}},
+        "required": ["score"],
+    }
+
+
+def test_validate_fields():
+    values, problems = validate_fields({**VALID, "score": "71.6", "recommendations": "Quantify results\n\nAdd a summary"})
+    assert values == {**VALID, "score": 72}
+    assert problems == {}
+
+    values, problems = validate_fields({"score": 140, "summary": "short", "recommendations": ["", 3]})
+    assert values == {}
+    assert set(problems) == {"score", "summary", "recommendations"}
+    assert "between 0 and 100" in problems["score"]
+
+
+def test_first_try_needs_no_retries():
+    stats = StructuredOutputStats()
+    invoke = scripted({"json": [json.dumps(VALID)]})
+    values, report = run_structured_analysis(invoke, "cv", max_field_retries=2, stats=stats)
+    assert values == VALID
+    assert report == {"retries": 0, "retried_fields": [], "failed_fields": []}
+    assert invoke.calls == ["json"]
+    assert stats.snapshot()["parse_success_rate"] == 1.0
+
+
+def test_only_invalid_fields_are_retried():
+    stats = StructuredOutputStats()
+    invoke = scripted({
+        "json": [json.dumps({**VALID, "score": "high"})],
+        "json_field:score": ["not json", '{"score": 65}'],
+    })
+    values, report = run_structured_analysis(invoke, "cv", max_field_retries=2, stats=stats)
+    assert values == {**VALID, "score": 65}
+    assert report == {"retries": 2, "retried_fields": ["score"], "failed_fields": []}
+    snapshot = stats.snapshot()
+    assert (snapshot["field_retries"], snapshot["fields_recovered"], snapshot["fields_failed"]) == (2, 1, 0)
+
+
+def test_fields_that_stay_invalid_are_reported():
+    stats = StructuredOutputStats()
+    invoke = scripted({
+        "json": ['{"summary": "Solid backend experience overall."}'],
+        "json_field:score": ['{"score": 65}'],
+        "json_field:recommendations": ["{}"],
+    })
+    values, report = run_structured_analysis(invoke, "cv", max_field_retries=1, stats=stats)
+    assert set(values) == {"score", "summary"}
+    assert report["failed_fields"] == ["recommendations"]
+    snapshot = stats.snapshot()
+    assert (snapshot["fields_recovered"], snapshot["fields_failed"]) == (1, 1)
+
+
+def test_recovered_count_is_never_negative_without_retries():
+    stats = StructuredOutputStats()
+    invoke = scripted({"json": ["nothing useful"]})
+    values, report = run_structured_analysis(invoke, "cv", max_field_retries=0, stats=stats)
+    assert values == {}
+    assert report["failed_fields"] == ["recommendations", "score", "summary"]
+    snapshot = stats.snapshot()
+    assert (snapshot["fields_recovered"], snapshot["fields_failed"], snapshot["field_retries"]) == (0, 3, 0)